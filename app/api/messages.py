@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
-from typing import List
+from typing import Optional
 
-from app.dependencies.auth_dependencies import get_current_user
+from app.dependencies.auth_dependencies import get_current_principal
 from app.dependencies.service_dependencies import get_chat_service
-from app.models.user import User
-from ..schemas.message import MessageCreateRequest, MessageResponse, PrivateMessageCreateRequest
+from app.utils.principal_cache import Principal
+from ..schemas.message import MessageCreateRequest, MessageHistoryResponse, MessageResponse, PrivateMessageCreateRequest
 from ..services.chat_service import ChatService
 
 router = APIRouter(prefix="/api/messages", tags=["messages"])
@@ -14,7 +14,7 @@ router = APIRouter(prefix="/api/messages", tags=["messages"])
 @router.post("", response_model=MessageResponse)
 async def send_message(
     request: MessageCreateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     chat_service: ChatService = Depends(get_chat_service)
 ):
     """
@@ -36,7 +36,7 @@ async def send_message(
 @router.post("/private", response_model=MessageResponse)
 async def send_private_message(
     request: PrivateMessageCreateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     chat_service: ChatService = Depends(get_chat_service)
 ):
     """
@@ -57,30 +57,33 @@ async def send_private_message(
         message_type=request.message_type,
     )
 
-@router.get("/rooms/{room_id}", response_model=List[MessageResponse])
+@router.get("/rooms/{room_id}", response_model=MessageHistoryResponse)
 async def get_room_messages(
     room_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     chat_service: ChatService = Depends(get_chat_service),
     limit: int = Query(50, ge=1, le=100, description="Number of messages to return"),
-    offset: int = Query(0, ge=0, description="Number of messages to skip")
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this position"),
+    after: Optional[str] = Query(None, description="Cursor: return messages newer than this position")
 ):
     """
-    Retrieve message history for a room.
+    Retrieve a page of message history for a room.
 
     Args:
         room_id: ID of the room
         current_user: Authenticated user details
         chat_service: Chat service instance
         limit: Number of messages to return
-        offset: Number of messages to skip
+        before: Opaque cursor for paging towards older messages
+        after: Opaque cursor for paging towards newer messages
 
     Returns:
-        List of MessageResponse objects
+        MessageHistoryResponse with messages in chronological order and the next cursor
     """
     return await chat_service.get_room_messages(
         user_id=current_user.id,
         room_id=room_id,
         limit=limit,
-        offset=offset,
+        before=before,
+        after=after,
     )
\ No newline at end of file
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.utils.metrics import CONTENT_TYPE, metrics
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Exposes this instance's metrics in the Prometheus text format.
+    Only mounted when `metrics_enabled` is set.
+    """
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
@@ -7,15 +7,15 @@ from app.models.room import Room
 from ..schemas.room import CreateRoomRequest, CreatePrivateRoomRequest, RoomResponse
 from ..services.room_service import RoomService
 from app.dependencies.service_dependencies import get_room_service
-from app.dependencies.auth_dependencies import get_current_user
-from app.models.user import User
+from app.dependencies.auth_dependencies import get_current_principal
+from app.utils.principal_cache import Principal
 
 router = APIRouter(prefix="/api/rooms", tags=["rooms"])
 
 @router.post("", response_model=RoomResponse)
 async def create_room(
     request: CreateRoomRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     room_service: RoomService = Depends(get_room_service)
 ):
     """
@@ -37,7 +37,7 @@ async def create_room(
 @router.post("/private", response_model=RoomResponse)
 async def create_private_room(
     request: CreatePrivateRoomRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     room_service: RoomService = Depends(get_room_service)
 ):
     """
@@ -66,7 +66,7 @@ async def create_private_room(
 @router.post("/{room_id}/join")
 async def join_room(
     room_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     room_service: RoomService = Depends(get_room_service)
 ):
     """
@@ -85,7 +85,7 @@ async def join_room(
 
 @router.get("", response_model=List[RoomResponse])
 async def get_user_rooms(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     room_service: RoomService = Depends(get_room_service)
 ):
     """
@@ -1,47 +1,91 @@
-import json
 from uuid import UUID
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status, HTTPException
+from sqlalchemy.orm import sessionmaker
 
 from app.dependencies.auth_dependencies import get_current_user_from_websocket
-from app.dependencies.service_dependencies import get_chat_service, get_websocket_manager
-from app.models.user import User
-from app.core.log_config import logger
-from app.services.chat_service import ChatService
+from app.dependencies.service_dependencies import (
+    chat_service_scope,
+    get_event_log,
+    get_receipt_batcher,
+    get_typing_aggregator,
+    get_websocket_manager,
+)
+from app.database.postgres import get_session_factory
+from app.utils.principal_cache import Principal
+from app.core.log_config import logger as app_logger
 from app.utils.websocket_manager import WebsocketManager
-from app.schemas.message import MessageCreateRequest, MessageType
+from app.utils.typing_aggregator import TypingAggregator
+from app.utils.receipt_batcher import ReceiptBatcher
+from app.utils.event_log import RoomEventLog, parse_resume_from
+from app.utils.serialization import dumps
+from app.utils.metrics import websocket_frames_received
+from app.utils.frames import MSGPACK_FRAMES, decode_frame, negotiate_frame_format
+from app.schemas.message import MessageCreateRequest, MessageStatus, MessageType
 
 router = APIRouter(prefix="/ws", tags=["websocket"])
+logger = app_logger.getChild("websocket")
+
+# Inbound message types handled below; anything else is counted as "other"
+INBOUND_TYPES = frozenset({
+    "send_message", "messages_delivered", "messages_seen", "join_room", "leave_room", "typing",
+})
 
 
 @router.websocket("")
 async def websocket_endpoint(
     websocket: WebSocket,
-    user: User = Depends(get_current_user_from_websocket),
+    user: Principal = Depends(get_current_user_from_websocket),
     manager: WebsocketManager = Depends(get_websocket_manager),
-    chat_service: ChatService = Depends(get_chat_service),
+    typing_aggregator: TypingAggregator = Depends(get_typing_aggregator),
+    receipt_batcher: ReceiptBatcher = Depends(get_receipt_batcher),
+    event_log: RoomEventLog = Depends(get_event_log),
+    session_factory: sessionmaker = Depends(get_session_factory),
 ):
+    # No database session is held for the lifetime of the socket. Each
+    # inbound operation opens its own ChatService scope and releases the
+    # pooled connection as soon as that operation completes.
     if user is None:
         logger.warning("WebSocket connection rejected: invalid token provided.")
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid token")
         return
 
-    await manager.connect(websocket, user.id)
-    logger.info(f"User {user.username} ({user.id}) connected via WebSocket.")
+    # JSON text frames unless the client offers the MessagePack subprotocol
+    frame_format, subprotocol = negotiate_frame_format(websocket.scope.get("subprotocols", []))
+    receive = websocket.receive_bytes if frame_format == MSGPACK_FRAMES else websocket.receive_text
+
+    # A reconnecting client names the last event it has per room; only what
+    # it missed since then is replayed, ahead of any live event.
+    resume_from = parse_resume_from(websocket.query_params.get("resume_from"))
+
+    async def missed_events():
+        async with chat_service_scope(session_factory, manager) as chat_service:
+            rooms = {}
+            for room_id, event_id in resume_from.items():
+                snapshot = await chat_service.room_service.get_room_snapshot(room_id)
+                if snapshot is not None and user.id in snapshot.member_ids:
+                    rooms[room_id] = event_id
+        return await event_log.replay(rooms)
+
+    await manager.connect(websocket, user.id, frame_format, subprotocol, missed_events if resume_from else None)
+    logger.info("User %s (%s) connected via WebSocket (%s frames).", user.username, user.id, frame_format)
     joined_rooms = set()
 
     try:
         while True:
-            data = await websocket.receive_text()
-            logger.debug(f"Data received from {user.username} ({user.id}): {data}")
+            data = await receive()
+            # Per-frame records are sampled, and only formatted on the logging thread
+            logger.debug("Data received from %s (%s): %s", user.username, user.id, data, extra={"sample": "frames"})
             
             try:
-                message_data = json.loads(data)
+                message_data = decode_frame(data, frame_format)
                 msg_type = message_data.get("type")
+                websocket_frames_received.inc(msg_type if msg_type in INBOUND_TYPES else "other")
                 if not msg_type:
-                    logger.warning(f"Message from {user.username} is missing 'type' field: {data}")
+                    logger.warning("Message from %s is missing 'type' field: %s", user.username, data)
                     continue
-            except json.JSONDecodeError:
-                logger.warning(f"Invalid JSON received from {user.username}: {data}")
+            except (ValueError, AttributeError):
+                websocket_frames_received.inc("invalid")
+                logger.warning("Invalid %s frame received from %s: %s", frame_format, user.username, data)
                 continue
 
             if msg_type == "send_message":
@@ -49,91 +93,88 @@ async def websocket_endpoint(
                 if not content:
                     continue
 
-                logger.info(f"Processing 'send_message' from {user.username}")
+                logger.debug("Processing 'send_message' from %s", user.username, extra={"sample": "frames"})
                 room_id_str = message_data.get("room_id")
                 target_user_id_str = message_data.get("target_user_id")
                 msg_type_enum = MessageType(message_data.get("message_type", "text"))
 
                 try:
-                    if room_id_str:
-                        create_request = MessageCreateRequest(
-                            room_id=UUID(room_id_str), content=content, message_type=msg_type_enum
-                        )
-                        await chat_service.send_message(user, create_request)
-                    elif target_user_id_str:
-                        await chat_service.send_private_message(
-                            sender=user,
-                            target_user_id=UUID(target_user_id_str),
-                            content=content,
-                            message_type=msg_type_enum,
-                        )
+                    async with chat_service_scope(session_factory, manager) as chat_service:
+                        if room_id_str:
+                            typing_aggregator.clear_user(UUID(room_id_str), user.id)
+                            create_request = MessageCreateRequest(
+                                room_id=UUID(room_id_str), content=content, message_type=msg_type_enum
+                            )
+                            await chat_service.send_message(user, create_request)
+                        elif target_user_id_str:
+                            await chat_service.send_private_message(
+                                sender=user,
+                                target_user_id=UUID(target_user_id_str),
+                                content=content,
+                                message_type=msg_type_enum,
+                            )
                 except HTTPException as e:
-                    logger.warning(f"HTTPException while sending message for {user.username}: {e.detail}")
+                    logger.warning("HTTPException while sending message for %s: %s", user.username, e.detail)
                     error_payload = {"type": "error", "data": {"detail": e.detail, "status_code": e.status_code}}
-                    await websocket.send_text(json.dumps(error_payload))
-
-            elif msg_type == "messages_delivered":
-                message_ids = [UUID(mid) for mid in message_data.get("message_ids", [])]
-                logger.debug(f"User {user.username} marked messages as delivered: {message_ids}")
-                if message_ids:
-                    await chat_service.mark_messages_as_delivered(message_ids, user.id)
+                    manager.send_to_connection(websocket, dumps(error_payload))
 
-            elif msg_type == "messages_seen":
+            elif msg_type in ("messages_delivered", "messages_seen"):
+                # Buffered and applied in batches by the receipt batcher
+                receipt_status = MessageStatus.DELIVERED if msg_type == "messages_delivered" else MessageStatus.SEEN
                 message_ids = [UUID(mid) for mid in message_data.get("message_ids", [])]
-                logger.debug(f"User {user.username} marked messages as seen: {message_ids}")
+                room_id_str = message_data.get("room_id")
+                logger.debug(
+                    "User %s marked messages as %s: %s", user.username, receipt_status.value, message_ids,
+                    extra={"sample": "receipts"},
+                )
                 if message_ids:
-                    await chat_service.mark_messages_as_seen(message_ids, user.id)
+                    receipt_batcher.add(user.id, receipt_status, message_ids, UUID(room_id_str) if room_id_str else None)
 
             elif msg_type == "join_room":
                 room_id = UUID(message_data.get("room_id"))
-                logger.info(f"User {user.username} joining room {room_id}")
+                logger.info("User %s joining room %s", user.username, room_id)
                 await manager.join_room(user.id, room_id)
                 joined_rooms.add(room_id)
                 join_payload = {
                     "type": "user_joined_room",
                     "data": {"room_id": str(room_id), "user_id": str(user.id), "username": user.username},
                 }
-                await manager.broadcast_to_room(room_id, json.dumps(join_payload))
+                await manager.broadcast_to_room(room_id, dumps(join_payload))
 
             elif msg_type == "leave_room":
                 room_id = UUID(message_data.get("room_id"))
                 if room_id in joined_rooms:
-                    logger.info(f"User {user.username} leaving room {room_id}")
+                    logger.info("User %s leaving room %s", user.username, room_id)
+                    typing_aggregator.clear_user(room_id, user.id)
                     await manager.leave_room(user.id, room_id)
                     joined_rooms.discard(room_id)
                     leave_payload = {
                         "type": "user_left_room",
                         "data": {"room_id": str(room_id), "user_id": str(user.id), "username": user.username},
                     }
-                    await manager.broadcast_to_room(room_id, json.dumps(leave_payload))
+                    await manager.broadcast_to_room(room_id, dumps(leave_payload))
 
             elif msg_type == "typing":
                 room_id = UUID(message_data.get("room_id"))
-                logger.debug(f"User {user.username} is typing in room {room_id}")
-                typing_payload = {
-                    "type": "typing_indicator",
-                    "data": {
-                        "room_id": str(room_id),
-                        "user_id": str(user.id),
-                        "username": user.username,
-                        "is_typing": message_data.get("is_typing", True),
-                    },
-                }
-                await manager.broadcast_to_room(room_id, json.dumps(typing_payload))
+                logger.debug("User %s is typing in room %s", user.username, room_id, extra={"sample": "typing"})
+                # Merged into one `typing_indicator` per room by the aggregator's flush task
+                typing_aggregator.update(room_id, user.id, user.username, message_data.get("is_typing", True))
 
     except WebSocketDisconnect as e:
-        logger.info(f"User {user.username} disconnected. Code: {e.code}, Reason: {e.reason}")
+        logger.info("User %s disconnected. Code: %s, Reason: %s", user.username, e.code, e.reason)
         for room_id in joined_rooms:
+            typing_aggregator.clear_user(room_id, user.id)
             await manager.leave_room(user.id, room_id)
             leave_payload = {
                 "type": "user_left_room",
                 "data": {"room_id": str(room_id), "user_id": str(user.id), "username": user.username},
             }
-            await manager.broadcast_to_room(room_id, json.dumps(leave_payload))
-        await manager.disconnect(user.id)
+            await manager.broadcast_to_room(room_id, dumps(leave_payload))
+        await manager.disconnect(user.id, websocket)
 
     except Exception as e:
-        logger.error(f"An unhandled error occurred in websocket for {user.username} ({user.id}): {e}", exc_info=True)
+        logger.error("An unhandled error occurred in websocket for %s (%s): %s", user.username, user.id, e, exc_info=True)
         for room_id in joined_rooms:
+            typing_aggregator.clear_user(room_id, user.id)
             await manager.leave_room(user.id, room_id)
-        await manager.disconnect(user.id)
\ No newline at end of file
+        await manager.disconnect(user.id, websocket)
\ No newline at end of file
@@ -9,6 +9,48 @@ class Settings(BaseSettings):
     jwt_secret: str
     jwt_algorithm: str = "HS256"
     jwt_expiry_hours: int = 24
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    fcm_service_account_file: str = "service_account_key.json"
+    fcm_base_url: str = "https://fcm.googleapis.com"
+    fcm_http2: bool = True
+    fcm_token_refresh_margin_seconds: int = 300
+    push_queue_maxsize: int = 10000
+    push_queue_concurrency: int = 16
+    push_max_retries: int = 3
+    push_retry_backoff_seconds: float = 0.5
+    membership_cache_size: int = 10000
+    membership_cache_ttl_seconds: float = 60.0
+    principal_cache_size: int = 50000
+    ws_outbound_queue_size: int = 256
+    ws_overflow_policy: str = "drop_typing,coalesce_status,disconnect"
+    presence_ttl_seconds: int = 60
+    json_serializer: str = "auto"
+    ws_compression: bool = True
+    ws_compression_min_size: int = 256
+    ws_compression_server_context_takeover: bool = True
+    ws_compression_client_context_takeover: bool = True
+    ws_compression_memory_kb: int = 64
+    ws_compression_level: int = 6
+    ws_compression_report_interval_seconds: float = 300.0
+    typing_window_seconds: float = 0.25
+    typing_ttl_seconds: float = 5.0
+    typing_min_interval_seconds: float = 1.0
+    receipt_batch_window_seconds: float = 0.2
+    receipt_max_batch_size: int = 500
+    event_log_max_len: int = 1000
+    event_log_ttl_seconds: int = 86400
+    event_log_max_replay: int = 200
+    event_log_replay_overlap_ms: int = 2000
+    metrics_enabled: bool = False
+    log_level: str = "INFO"
+    log_levels: str = ""
+    log_format: str = "text"
+    log_file: str = "logs/app_logs.log"
+    log_sample_rates: str = "frames=100,typing=100,receipts=100"
 
     class Config:
         env_file = ".env"
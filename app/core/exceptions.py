@@ -92,9 +92,14 @@ class MessageNotSentException(BaseAPIException):
 ##############################################################################
 
 class NotificationFailedException(BaseAPIException):
-    """Exception raised when a notification fails to send."""
-    def __init__(self, detail="Notification could not be sent"):
+    """
+    Exception raised when a notification fails to send. `retryable` is False
+    when FCM rejected it for good (e.g. every token was invalid), so sending
+    it again cannot succeed.
+    """
+    def __init__(self, detail="Notification could not be sent", retryable: bool = True):
         super().__init__(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail)
+        self.retryable = retryable
 
 class WebSocketConnectionException(BaseAPIException):
     """Exception raised when a WebSocket connection fails."""
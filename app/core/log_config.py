@@ -1,19 +1,175 @@
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+LOG_FORMATS = ("text", "json")
 
 logger = logging.getLogger("app_logger")
-logger.setLevel(logging.DEBUG)
 
-file_handler = RotatingFileHandler("logs/app_logs.log", maxBytes=10**6, backupCount=3)
-file_handler.setLevel(logging.DEBUG)
 
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.DEBUG)
+def parse_log_levels(levels: str) -> Dict[str, int]:
+    """Parses per-logger levels, e.g. "app_logger.websocket=DEBUG,sqlalchemy.engine=WARNING"."""
+    parsed = {}
+    for pair in levels.split(","):
+        if not pair.strip():
+            continue
+        name, _, level = pair.partition("=")
+        level_number = logging.getLevelName(level.strip().upper())
+        if not name.strip() or not isinstance(level_number, int):
+            raise ValueError(f"Invalid log level setting: {pair.strip()!r}")
+        parsed[name.strip()] = level_number
+    return parsed
+
+
+def parse_sample_rates(rates: str) -> Dict[str, int]:
+    """Parses sampling rates, e.g. "typing=100,receipts=20" keeps 1 in 100 typing records."""
+    parsed = {}
+    for pair in rates.split(","):
+        if not pair.strip():
+            continue
+        key, _, rate = pair.partition("=")
+        if not key.strip() or not rate.strip().isdigit() or int(rate) < 1:
+            raise ValueError(f"Invalid log sample rate: {pair.strip()!r}")
+        parsed[key.strip()] = int(rate)
+    return parsed
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps 1 in N records of each high-frequency event. Records opt in with
+    `extra={"sample": "<event>"}`; events without a configured rate, and
+    records without the key, always pass.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self.seen: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        rate = self.rates.get(key) if key is not None else None
+        if rate is None or rate == 1:
+            return True
+        count = self.seen.get(key, 0)
+        self.seen[key] = count + 1
+        return count % rate == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and exception, if any."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread as they are. Unlike QueueHandler it
+    does not format them first, so the message is only built (off the event
+    loop) for records that are actually written; arguments must therefore
+    not be mutated after logging. When the queue is full the record is
+    dropped rather than blocking the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_leveled_loggers: List[str] = []
+
+
+def configure_logging(
+    level: str = "INFO",
+    levels: str = "",
+    log_format: str = "text",
+    log_file: str = "logs/app_logs.log",
+    sample_rates: str = "",
+    queue_size: int = 10000,
+) -> NonBlockingQueueHandler:
+    """
+    Routes `app_logger` and its children (e.g. `app_logger.websocket`)
+    through a bounded queue to a listener thread that does the formatting,
+    file rotation and stdout writes, so the event loop never blocks on log
+    I/O. `levels` overrides the level of individual loggers. Replaces any
+    configuration applied before.
+    """
+    global _listener, _leveled_loggers
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format {log_format!r}, expected one of {', '.join(LOG_FORMATS)}")
+    stop_logging()
+
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        handlers.append(RotatingFileHandler(log_file, maxBytes=10**6, backupCount=3))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(sample_rates)))
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+    logger.setLevel(level.upper())
+    for name in _leveled_loggers:
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    _leveled_loggers = []
+    for name, logger_level in parse_log_levels(levels).items():
+        logging.getLogger(name).setLevel(logger_level)
+        _leveled_loggers.append(name)
+
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return queue_handler
+
+
+def stop_logging():
+    """Writes out the records still queued and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
 
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+configure_logging(
+    level=settings.log_level,
+    levels=settings.log_levels,
+    log_format=settings.log_format,
+    log_file=settings.log_file,
+    sample_rates=settings.log_sample_rates,
+)
+atexit.register(stop_logging)
@@ -0,0 +1,80 @@
+# app/database/migrations/__init__.py
+"""
+Versioned schema migrations.
+
+Each migration is a module in this package named `v<NNNN>_<description>.py`
+exposing an `upgrade(conn)` function that receives a synchronous SQLAlchemy
+Connection. Applied versions are recorded in the `schema_migrations` table,
+and pending migrations run in version order inside a single transaction.
+"""
+import importlib
+import pkgutil
+import re
+from dataclasses import dataclass
+from types import ModuleType
+from typing import List
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, insert, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+_MODULE_PATTERN = re.compile(r"^v(\d{4})_\w+$")
+
+# Arbitrary constant key for pg_advisory_xact_lock so that concurrently
+# starting workers apply migrations one at a time.
+_ADVISORY_LOCK_KEY = 746_183_301
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    module: ModuleType
+
+    def upgrade(self, conn: Connection):
+        self.module.upgrade(conn)
+
+
+def load_migrations() -> List[Migration]:
+    """Returns every migration in this package, ordered by version."""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        if _MODULE_PATTERN.match(module_info.name):
+            module = importlib.import_module(f"{__name__}.{module_info.name}")
+            migrations.append(Migration(version=module_info.name, module=module))
+    return sorted(migrations, key=lambda m: m.version)
+
+
+def _apply_pending(conn: Connection) -> List[str]:
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+
+    _metadata.create_all(conn, checkfirst=True)
+    applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    newly_applied = []
+    for migration in load_migrations():
+        if migration.version in applied:
+            continue
+        migration.upgrade(conn)
+        conn.execute(insert(schema_migrations).values(version=migration.version))
+        newly_applied.append(migration.version)
+    return newly_applied
+
+
+async def run_migrations(engine: AsyncEngine) -> List[str]:
+    """
+    Applies all pending migrations. Safe to run at every startup.
+
+    Returns:
+        The versions applied by this call
+    """
+    async with engine.begin() as conn:
+        return await conn.run_sync(_apply_pending)
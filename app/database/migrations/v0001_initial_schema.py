@@ -0,0 +1,81 @@
+# app/database/migrations/v0001_initial_schema.py
+"""
+Baseline schema, frozen as it was created by `Base.metadata.create_all`
+before migrations existed. Uses checkfirst, so databases that were created
+that way are simply stamped with this version.
+"""
+import uuid
+
+from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, MetaData, String, Table, Text, func
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.engine import Connection
+
+from app.schemas.message import MessageStatus, MessageType
+from app.schemas.room import RoomType
+
+metadata = MetaData()
+
+
+def _id_column() -> Column:
+    return Column("id", PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+
+
+Table(
+    "users",
+    metadata,
+    Column("username", String(50), unique=True, nullable=False),
+    Column("display_name", String(50), nullable=False),
+    Column("email", String(100), unique=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("is_active", Boolean, default=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    _id_column(),
+)
+
+Table(
+    "fcm_tokens",
+    metadata,
+    Column("user_id", PG_UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("token", String, nullable=False, unique=True),
+    Column("device_type", String, default="web"),
+    _id_column(),
+)
+
+Table(
+    "rooms",
+    metadata,
+    Column("name", String(100), nullable=True),
+    Column("room_type", Enum(RoomType), default=RoomType.GROUP),
+    Column("created_by", PG_UUID(as_uuid=True), ForeignKey("users.id"), nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    _id_column(),
+)
+
+Table(
+    "messages",
+    metadata,
+    Column("content", Text, nullable=False),
+    Column("message_type", Enum(MessageType), default=MessageType.TEXT),
+    Column("status", Enum(MessageStatus), default=MessageStatus.SENT),
+    Column("sender_id", PG_UUID(as_uuid=True), ForeignKey("users.id"), nullable=False),
+    Column("room_id", PG_UUID(as_uuid=True), ForeignKey("rooms.id"), nullable=True),
+    Column("recipient_id", PG_UUID(as_uuid=True), ForeignKey("users.id"), nullable=True),
+    Column("is_private", Boolean, default=False),
+    Column("is_edited", Boolean, default=False),
+    Column("is_deleted", Boolean, default=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), onupdate=func.now()),
+    _id_column(),
+)
+
+Table(
+    "room_memberships",
+    metadata,
+    Column("user_id", PG_UUID(as_uuid=True), ForeignKey("users.id"), nullable=False),
+    Column("room_id", PG_UUID(as_uuid=True), ForeignKey("rooms.id"), nullable=False),
+    _id_column(),
+)
+
+
+def upgrade(conn: Connection):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,43 @@
+# app/database/migrations/v0002_hot_path_indexes.py
+"""
+Indexes for the hot query paths (message send, member fan-out, room list,
+unread counts and history paging). Mirrors the indexes declared in the
+models' __table_args__.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+INDEXES = [
+    # Room history paging and last-message-per-room lookups
+    "CREATE INDEX IF NOT EXISTS ix_messages_room_id_created_at_id "
+    "ON messages (room_id, created_at, id)",
+    # Unread counts only ever look at messages that are not yet seen
+    "CREATE INDEX IF NOT EXISTS ix_messages_room_id_unseen "
+    "ON messages (room_id, sender_id) WHERE status != 'SEEN'",
+    # Membership checks and member fan-out by room; also forbids duplicate memberships
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_room_memberships_room_id_user_id "
+    "ON room_memberships (room_id, user_id)",
+    # Rooms of a user
+    "CREATE INDEX IF NOT EXISTS ix_room_memberships_user_id "
+    "ON room_memberships (user_id)",
+]
+
+
+def _remove_duplicate_memberships(conn: Connection):
+    duplicates = conn.execute(text(
+        "SELECT room_id, user_id FROM room_memberships "
+        "GROUP BY room_id, user_id HAVING COUNT(*) > 1"
+    )).all()
+    for room_id, user_id in duplicates:
+        ids = conn.execute(
+            text("SELECT id FROM room_memberships WHERE room_id = :room_id AND user_id = :user_id"),
+            {"room_id": room_id, "user_id": user_id},
+        ).scalars().all()
+        for membership_id in ids[1:]:
+            conn.execute(text("DELETE FROM room_memberships WHERE id = :id"), {"id": membership_id})
+
+
+def upgrade(conn: Connection):
+    _remove_duplicate_memberships(conn)
+    for statement in INDEXES:
+        conn.execute(text(statement))
@@ -0,0 +1,44 @@
+# app/database/migrations/v0003_read_cursors.py
+"""
+Per-member read cursors. `room_memberships` gains last_read_message_id and
+last_read_at, so reading a room advances one membership row instead of
+flipping the shared `messages.status` of every message to SEEN.
+
+Existing memberships are backfilled from the old model: the cursor starts at
+the newest message of the room that was either SEEN or sent by the member.
+The partial index on unseen messages is dropped; unread counts now seek
+ix_messages_room_id_created_at_id from the cursor instead.
+"""
+from sqlalchemy import DateTime, inspect, text
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.engine import Connection
+
+
+def _add_column(conn: Connection, name: str, column_type):
+    existing = {column["name"] for column in inspect(conn).get_columns("room_memberships")}
+    if name not in existing:
+        type_sql = column_type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE room_memberships ADD COLUMN {name} {type_sql}"))
+
+
+def _backfill(conn: Connection):
+    conn.execute(text(
+        "UPDATE room_memberships SET last_read_message_id = ("
+        " SELECT m.id FROM messages m"
+        " WHERE m.room_id = room_memberships.room_id"
+        " AND (m.status = 'SEEN' OR m.sender_id = room_memberships.user_id)"
+        " ORDER BY m.created_at DESC, m.id DESC LIMIT 1"
+        ") WHERE last_read_message_id IS NULL"
+    ))
+    conn.execute(text(
+        "UPDATE room_memberships SET last_read_at = ("
+        " SELECT m.created_at FROM messages m WHERE m.id = room_memberships.last_read_message_id"
+        ") WHERE last_read_message_id IS NOT NULL AND last_read_at IS NULL"
+    ))
+
+
+def upgrade(conn: Connection):
+    _add_column(conn, "last_read_message_id", PG_UUID(as_uuid=True))
+    _add_column(conn, "last_read_at", DateTime(timezone=True))
+    _backfill(conn)
+    conn.execute(text("DROP INDEX IF EXISTS ix_messages_room_id_unseen"))
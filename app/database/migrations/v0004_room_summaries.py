@@ -0,0 +1,86 @@
+# app/database/migrations/v0004_room_summaries.py
+"""
+Materialized room list. `room_summaries` holds each room's last message and
+message count, and `room_memberships` gains unread_count; both are kept up to
+date on the send and read paths, so listing rooms no longer ranks every
+message of every room or counts unread messages.
+
+Existing rooms are backfilled from the messages table: the newest message
+and the message count per room, and per member the messages from others
+after their read cursor.
+"""
+import uuid
+
+from sqlalchemy import DateTime, bindparam, inspect, text
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.engine import Connection
+
+# Characters of the last message kept for the room list, as of this migration
+PREVIEW_LENGTH = 200
+
+
+def _create_table(conn: Connection):
+    uuid_sql = PG_UUID(as_uuid=True).compile(dialect=conn.dialect)
+    timestamp_sql = DateTime(timezone=True).compile(dialect=conn.dialect)
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS room_summaries ("
+        f" id {uuid_sql} NOT NULL PRIMARY KEY,"
+        f" room_id {uuid_sql} NOT NULL REFERENCES rooms (id),"
+        f" last_message_id {uuid_sql},"
+        f" last_message_preview VARCHAR({PREVIEW_LENGTH}),"
+        f" last_message_at {timestamp_sql},"
+        f" last_sender_id {uuid_sql},"
+        " message_count INTEGER NOT NULL"
+        ")"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_room_summaries_id ON room_summaries (id)"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_room_summaries_room_id ON room_summaries (room_id)"))
+
+
+def _backfill_summaries(conn: Connection):
+    latest = conn.execute(text(
+        "SELECT room_id, id, sender_id, content, created_at, message_count FROM ("
+        " SELECT room_id, id, sender_id, content, created_at,"
+        " ROW_NUMBER() OVER (PARTITION BY room_id ORDER BY created_at DESC, id DESC) AS row_num,"
+        " COUNT(*) OVER (PARTITION BY room_id) AS message_count"
+        " FROM messages WHERE room_id IS NOT NULL"
+        ") ranked WHERE row_num = 1"
+    )).all()
+    conn.execute(text("DELETE FROM room_summaries"))
+    insert = text(
+        "INSERT INTO room_summaries"
+        " (id, room_id, last_message_id, last_message_preview, last_message_at, last_sender_id, message_count)"
+        " VALUES (:id, :room_id, :message_id, :preview, :created_at, :sender_id, :message_count)"
+    ).bindparams(bindparam("id", type_=PG_UUID(as_uuid=True)))
+    for room_id, message_id, sender_id, content, created_at, message_count in latest:
+        conn.execute(insert, {
+            "id": uuid.uuid4(),
+            "room_id": room_id,
+            "message_id": message_id,
+            "preview": content[:PREVIEW_LENGTH],
+            "created_at": created_at,
+            "sender_id": sender_id,
+            "message_count": message_count,
+        })
+
+
+def _backfill_unread_counts(conn: Connection):
+    conn.execute(text(
+        "UPDATE room_memberships SET unread_count = ("
+        " SELECT COUNT(*) FROM messages m"
+        " WHERE m.room_id = room_memberships.room_id"
+        " AND m.sender_id != room_memberships.user_id"
+        " AND (room_memberships.last_read_at IS NULL"
+        " OR m.created_at > room_memberships.last_read_at"
+        " OR (m.created_at = room_memberships.last_read_at AND m.id > room_memberships.last_read_message_id))"
+        ")"
+    ))
+
+
+def upgrade(conn: Connection):
+    _create_table(conn)
+    existing = {column["name"] for column in inspect(conn).get_columns("room_memberships")}
+    if "unread_count" not in existing:
+        conn.execute(text("ALTER TABLE room_memberships ADD COLUMN unread_count INTEGER NOT NULL DEFAULT 0"))
+    _backfill_summaries(conn)
+    _backfill_unread_counts(conn)
@@ -1,19 +1,55 @@
 # app/database/postgres.py
+import time
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
-from app.models.base import Base
+from app.database.migrations import run_migrations
+from app.utils.metrics import db_pool_checkout_wait, metrics
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default async pool, recording in `db_pool_checkout_wait_seconds` how
+    long each checkout waited for a connection (including opening a new one
+    while the pool is below its size). Only used while metrics are enabled,
+    and skips the timing if they are switched off at runtime.
+    """
+
+    def _do_get(self):
+        if not metrics.enabled:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - started)
+
 
 engine = create_async_engine(
     settings.database_url,
     echo=False,
+    poolclass=TimedQueuePool if settings.metrics_enabled else AsyncAdaptedQueuePool,
     pool_pre_ping=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
 )
 
 async_session = sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
 )
 
+def get_session_factory() -> sessionmaker:
+    """
+    Provide the session factory for dependency injection.
+
+    Long-lived connections (WebSockets) use this instead of `get_db_session`
+    so they can open a short session per operation rather than holding one
+    pooled connection for their whole lifetime.
+    """
+    return async_session
+
 async def get_db_session():
     """
     Provide a database session for dependency injection.
@@ -29,8 +65,9 @@ async def get_db_session():
 
 async def initialize_db():
     """
-    Initialize the database by creating all tables defined in SQLAlchemy models.
-    This method is idempotent and safe to run at startup.
+    Initialize the database by applying any pending schema migrations
+    (see app/database/migrations). This method is idempotent and safe to run at startup.
     """
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    applied = await run_migrations(engine)
+    if applied:
+        print(f"Applied database migrations: {', '.join(applied)}")
@@ -0,0 +1,146 @@
+# app/database/room_summaries.py
+"""
+Statements maintaining `room_summaries` and `room_memberships.unread_count`.
+
+The send path upserts the room's summary and increments the other members'
+counters in the same transaction as the message insert; advancing a read
+cursor decrements the reader's counter (see ChatService). `rebuild_room_summaries`
+recomputes both from the messages table, for backfills and repairs.
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import case, delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from app.models.message import Message
+from app.models.room_membership import RoomMembership
+from app.models.room_summary import PREVIEW_LENGTH, RoomSummary
+
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def summary_upsert(
+    dialect_name: str,
+    room_id: UUID,
+    message_id: UUID,
+    sender_id: UUID,
+    content: str,
+    created_at: datetime,
+):
+    """
+    INSERT ... ON CONFLICT (room_id) DO UPDATE recording a new message in its
+    room's summary. The count always grows; the last message only moves
+    forward, so a send that commits after a newer one cannot regress it.
+    """
+    if dialect_name not in _DIALECT_INSERTS:
+        raise ValueError(f"Room summaries do not support the {dialect_name} dialect")
+
+    summaries = RoomSummary.__table__
+    stmt = _DIALECT_INSERTS[dialect_name](summaries).values(
+        room_id=room_id,
+        last_message_id=message_id,
+        last_message_preview=content[:PREVIEW_LENGTH],
+        last_message_at=created_at,
+        last_sender_id=sender_id,
+        message_count=1,
+    )
+    is_newer = or_(
+        summaries.c.last_message_at.is_(None),
+        stmt.excluded.last_message_at >= summaries.c.last_message_at,
+    )
+    latest = {
+        column: case((is_newer, stmt.excluded[column]), else_=summaries.c[column])
+        for column in ("last_message_id", "last_message_preview", "last_message_at", "last_sender_id")
+    }
+    return stmt.on_conflict_do_update(
+        index_elements=[summaries.c.room_id],
+        set_={**latest, "message_count": summaries.c.message_count + 1},
+    )
+
+
+def unread_increment(room_id: UUID, sender_id: UUID):
+    """UPDATE giving every member of the room except the sender one more unread message."""
+    memberships = RoomMembership.__table__
+    return (
+        update(memberships)
+        .where(memberships.c.room_id == room_id, memberships.c.user_id != sender_id)
+        .values(unread_count=memberships.c.unread_count + 1)
+    )
+
+
+def unread_after_cursor(memberships, messages, until=None):
+    """
+    Scalar subquery counting the messages from others after a membership's
+    current read cursor (and up to `until`, a (created_at, id) position, if
+    given). Correlated to `memberships`; seeks ix_messages_room_id_created_at_id.
+    """
+    query = select(func.count()).select_from(messages).where(
+        messages.c.room_id == memberships.c.room_id,
+        messages.c.sender_id != memberships.c.user_id,
+        or_(
+            memberships.c.last_read_at.is_(None),
+            tuple_(messages.c.created_at, messages.c.id)
+            > tuple_(memberships.c.last_read_at, memberships.c.last_read_message_id),
+        ),
+    )
+    if until is not None:
+        query = query.where(tuple_(messages.c.created_at, messages.c.id) <= tuple_(*until))
+    return query.scalar_subquery()
+
+
+def rebuild_room_summaries(conn: Connection, room_ids: Optional[Iterable[UUID]] = None) -> int:
+    """
+    Recomputes the summaries and unread counters of the given rooms (all
+    rooms by default) from the messages table. Cost grows with the history
+    of the rooms; meant for migrations and repairs, not the request path.
+
+    Returns:
+        The number of rooms that have messages
+    """
+    summaries, messages, memberships = RoomSummary.__table__, Message.__table__, RoomMembership.__table__
+    room_ids = list(room_ids) if room_ids is not None else None
+
+    ranked = select(
+        messages.c.room_id,
+        messages.c.id,
+        messages.c.sender_id,
+        messages.c.content,
+        messages.c.created_at,
+        func.row_number().over(
+            partition_by=messages.c.room_id,
+            order_by=(messages.c.created_at.desc(), messages.c.id.desc()),
+        ).label("row_num"),
+        func.count().over(partition_by=messages.c.room_id).label("message_count"),
+    ).where(messages.c.room_id.isnot(None))
+    if room_ids is not None:
+        ranked = ranked.where(messages.c.room_id.in_(room_ids))
+    ranked = ranked.subquery()
+    latest = conn.execute(select(ranked).where(ranked.c.row_num == 1)).all()
+
+    clear = delete(summaries)
+    recount = update(memberships).values(unread_count=unread_after_cursor(memberships, messages))
+    if room_ids is not None:
+        clear = clear.where(summaries.c.room_id.in_(room_ids))
+        recount = recount.where(memberships.c.room_id.in_(room_ids))
+
+    conn.execute(clear)
+    if latest:
+        conn.execute(insert(summaries), [
+            {
+                "room_id": row.room_id,
+                "last_message_id": row.id,
+                "last_message_preview": row.content[:PREVIEW_LENGTH],
+                "last_message_at": row.created_at,
+                "last_sender_id": row.sender_id,
+                "message_count": row.message_count,
+            }
+            for row in latest
+        ])
+    conn.execute(recount)
+    return len(latest)
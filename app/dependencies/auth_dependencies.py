@@ -1,60 +1,112 @@
+from typing import Tuple
+from uuid import UUID
 from fastapi import Depends, HTTPException, status, Query, WebSocket
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database.postgres import get_db_session
+from sqlalchemy.orm import sessionmaker
+from app.database.postgres import get_db_session, get_session_factory
+from app.globals import principal_cache
 from app.models.user import User
 from app.core.security import verify_token
 from app.core.exceptions import UnauthorizedAccessException, InvalidTokenException
+from app.utils.principal_cache import Principal
 
 security = HTTPBearer()
 
-async def _get_user_from_token(token: str, db: AsyncSession) -> User:
+async def _authenticate(token: str, db: AsyncSession) -> Tuple[User, Principal]:
     """
     Internal helper to verify a token and fetch the corresponding user.
     This contains the core logic shared by HTTP and WebSocket auth.
+    Successful lookups of active users are added to the principal cache.
     """
     if not token:
         raise InvalidTokenException(detail="Token not provided")
-        
+
     try:
         payload = verify_token(token)
         user_id = payload.get("user_id")
         if user_id is None:
             raise InvalidTokenException()
-    except InvalidTokenException:
+        user_id = UUID(str(user_id))
+    except (InvalidTokenException, ValueError):
         raise InvalidTokenException()
-    
+
+    generation = principal_cache.generation(user_id)
     result = await db.execute(select(User).filter(User.id == user_id))
     user = result.scalar_one_or_none()
-    
+
     if user is None:
         raise UnauthorizedAccessException(detail="User not found")
-    
+    if user.is_active is False:
+        raise UnauthorizedAccessException(detail="User is deactivated")
+
+    principal = Principal(
+        id=user.id,
+        username=user.username,
+        display_name=user.display_name,
+        expires_at=float(payload["exp"]),
+    )
+    principal_cache.set(token, principal, generation)
+    return user, principal
+
+
+async def _get_user_from_token(token: str, db: AsyncSession) -> User:
+    user, _ = await _authenticate(token, db)
     return user
 
 
+async def _get_principal_from_token(token: str, session_factory: sessionmaker) -> Principal:
+    """
+    Resolves a token to its principal, from the cache when possible. Only a
+    cache miss verifies the JWT and opens a short-lived session for the lookup.
+    """
+    principal = principal_cache.get(token) if token else None
+    if principal is not None:
+        return principal
+
+    async with session_factory() as db:
+        _, principal = await _authenticate(token, db)
+    return principal
+
+
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    session_factory: sessionmaker = Depends(get_session_factory),
+) -> Principal:
+    """
+    Dependency for HTTP routes that only need the caller's identity. Served
+    from the principal cache without touching Postgres for known tokens.
+    """
+    return await _get_principal_from_token(credentials.credentials, session_factory)
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db_session)
 ) -> User:
     """
     Dependency for standard HTTP routes to get the current user from a Bearer token.
+    Loads the full ORM `User`; prefer `get_current_principal` where the id,
+    username and display name are enough.
     """
     return await _get_user_from_token(credentials.credentials, db)
 
 
 async def get_current_user_from_websocket(
     websocket: WebSocket,
-    token: str = Query(...), 
-    db: AsyncSession = Depends(get_db_session)
-) -> User | None:
+    token: str = Query(...),
+    session_factory: sessionmaker = Depends(get_session_factory)
+) -> Principal | None:
     """
-    Dependency for WebSocket routes to get the current user from a token
+    Dependency for WebSocket routes to get the current principal from a token
     in the query parameters. Returns None on failure to allow the endpoint
     to close the connection gracefully.
+
+    A cache miss uses its own short-lived session, which is released before
+    the handshake completes instead of living as long as the socket.
     """
     try:
-        return await _get_user_from_token(token, db)
+        return await _get_principal_from_token(token, session_factory)
     except (InvalidTokenException, UnauthorizedAccessException):
-        return None
\ No newline at end of file
+        return None
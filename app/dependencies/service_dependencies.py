@@ -1,8 +1,15 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
-from app.globals import websocket_manager 
+from app.globals import websocket_manager, fcm_sender, push_queue, membership_cache, principal_cache, typing_aggregator, receipt_batcher, event_log
 from app.utils.websocket_manager import WebsocketManager
+from app.utils.push_queue import PushNotificationQueue
+from app.utils.typing_aggregator import TypingAggregator
+from app.utils.receipt_batcher import ReceiptBatcher
+from app.utils.event_log import RoomEventLog
 
 from app.database.postgres import get_db_session
 from app.services.auth_service import AuthService
@@ -16,29 +23,61 @@ def get_websocket_manager() -> WebsocketManager:
     """
     return websocket_manager
 
-def get_auth_service(db: AsyncSession = Depends(get_db_session)) -> AuthService:
+def get_typing_aggregator() -> TypingAggregator:
     """
-    Dependency that provides an instance of AuthService with an active database session.
+    Dependency that provides the singleton TypingAggregator instance.
     """
-    return AuthService(db)
+    return typing_aggregator
 
-def get_room_service(db: AsyncSession = Depends(get_db_session)) -> RoomService:
+def get_receipt_batcher() -> ReceiptBatcher:
     """
-    Dependency that provides an instance of RoomService with an active database session.
+    Dependency that provides the singleton ReceiptBatcher instance.
     """
-    return RoomService(db)
+    return receipt_batcher
+
+def get_event_log() -> RoomEventLog:
+    """
+    Dependency that provides the singleton RoomEventLog instance.
+    """
+    return event_log
+
+def get_auth_service(
+    db: AsyncSession = Depends(get_db_session),
+    ws_manager: WebsocketManager = Depends(get_websocket_manager)
+) -> AuthService:
+    """
+    Dependency that provides an instance of AuthService with an active database session
+    and the shared principal cache.
+    """
+    return AuthService(db, principal_cache, ws_manager)
+
+def get_room_service(
+    db: AsyncSession = Depends(get_db_session),
+    ws_manager: WebsocketManager = Depends(get_websocket_manager)
+) -> RoomService:
+    """
+    Dependency that provides an instance of RoomService with an active database session
+    and the shared room membership cache.
+    """
+    return RoomService(db, membership_cache, ws_manager)
+
+def get_push_queue() -> PushNotificationQueue:
+    """
+    Dependency that provides the singleton background PushNotificationQueue.
+    """
+    return push_queue
 
 def get_notification_service(db: AsyncSession = Depends(get_db_session)) -> NotificationService:
     """
     Dependency that provides an instance of NotificationService with an active database session.
     """
-    return NotificationService(db)
+    return NotificationService(db, fcm_sender)
 
 def get_chat_service(
     room_service: RoomService = Depends(get_room_service),
     db: AsyncSession = Depends(get_db_session),
     ws_manager: WebsocketManager = Depends(get_websocket_manager),
-    notification_service: NotificationService = Depends(get_notification_service)
+    push_queue: PushNotificationQueue = Depends(get_push_queue)
 ) -> ChatService:
     """
     Dependency that provides an instance of ChatService with required dependencies.
@@ -47,5 +86,32 @@ def get_chat_service(
         room_service=room_service, 
         db=db, 
         websocket_manager=ws_manager,
-        notification_service=notification_service
-    )
\ No newline at end of file
+        push_queue=push_queue,
+        event_log=event_log
+    )
+
+@asynccontextmanager
+async def chat_service_scope(
+    session_factory: sessionmaker,
+    ws_manager: WebsocketManager,
+) -> AsyncIterator[ChatService]:
+    """
+    Provides a ChatService backed by its own short-lived database session.
+
+    Intended for long-lived connections such as WebSockets: each inbound
+    operation opens a scope, so a pooled connection is only held while that
+    operation runs. Commit/rollback semantics mirror `get_db_session`.
+    """
+    async with session_factory() as db:
+        try:
+            yield ChatService(
+                room_service=RoomService(db, membership_cache, ws_manager),
+                db=db,
+                websocket_manager=ws_manager,
+                push_queue=push_queue,
+                event_log=event_log
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
@@ -1,6 +1,125 @@
+from uuid import UUID
 from .utils.websocket_manager import WebsocketManager
+from .utils.connection_writer import parse_overflow_policy
+from .utils.serialization import configure_serializer
+from .utils.fcm import FCMSender
+from .utils.push_queue import PushNotificationQueue
+from .utils.membership_cache import RoomMembershipCache
+from .utils.principal_cache import PrincipalCache
+from .utils.typing_aggregator import TypingAggregator
+from .utils.receipt_batcher import ReceiptBatcher
+from .utils.event_log import RoomEventLog
+from .utils.metrics import (
+    membership_cache_hit_ratio,
+    metrics,
+    push_queue_jobs,
+    websocket_connections,
+    websocket_outbound_backlog,
+)
 from .core.config import settings
+from .database.postgres import async_session
+from .services.notification_service import build_push_delivery
+from .services.chat_service import build_receipt_flush
+from .services.room_service import MEMBERSHIP_CHANGED_EVENT
+from .services.auth_service import USER_DEACTIVATED_EVENT
+
+# JSON encoder for every WebSocket payload: "auto" (orjson if installed), "orjson", "pydantic" or "json"
+configure_serializer(settings.json_serializer)
 
 # This is the single, shared instance of the WebsocketManager.
 # It is created once when the module is first imported.
-websocket_manager = WebsocketManager(settings.redis_url)
\ No newline at end of file
+websocket_manager = WebsocketManager(
+    settings.redis_url,
+    outbound_queue_size=settings.ws_outbound_queue_size,
+    overflow_policy=parse_overflow_policy(settings.ws_overflow_policy),
+    presence_ttl_seconds=settings.presence_ttl_seconds,
+)
+
+# Metrics served on /metrics. Disabled, every instrumented call site returns
+# after one flag check; gauges like the socket count are computed per scrape.
+metrics.enabled = settings.metrics_enabled
+websocket_connections.set_function(
+    lambda: sum(len(sockets) for sockets in websocket_manager.active_connections.values())
+)
+
+
+def _outbound_backlog() -> dict:
+    depths = [stats["depth"] for stats in websocket_manager.connection_stats()]
+    return {("total",): sum(depths), ("max",): max(depths, default=0)}
+
+
+websocket_outbound_backlog.set_function(_outbound_backlog)
+
+# Room membership cache shared by ChatService and RoomService. Membership
+# changes on any instance invalidate it everywhere via a control event.
+membership_cache = RoomMembershipCache(
+    maxsize=settings.membership_cache_size,
+    ttl_seconds=settings.membership_cache_ttl_seconds,
+)
+websocket_manager.add_control_handler(
+    MEMBERSHIP_CHANGED_EVENT,
+    lambda data: membership_cache.invalidate(UUID(data["room_id"])),
+)
+membership_cache_hit_ratio.set_function(lambda: membership_cache.stats()["hit_ratio"])
+
+# Authenticated principals keyed by token signature, so known tokens skip the
+# per-request user lookup. Deactivating a user invalidates it everywhere.
+principal_cache = PrincipalCache(maxsize=settings.principal_cache_size)
+websocket_manager.add_control_handler(
+    USER_DEACTIVATED_EVENT,
+    lambda data: principal_cache.invalidate_user(UUID(data["user_id"])),
+)
+
+# Typing frames are merged per room and published as one combined
+# `typing_indicator` event per merge window instead of one per keystroke.
+typing_aggregator = TypingAggregator(
+    websocket_manager,
+    window_seconds=settings.typing_window_seconds,
+    ttl_seconds=settings.typing_ttl_seconds,
+    min_interval_seconds=settings.typing_min_interval_seconds,
+)
+
+# Message and status events are also appended to a bounded per-room Redis
+# stream, so clients reconnecting with `resume_from` get only what they missed.
+event_log = RoomEventLog(
+    websocket_manager,
+    max_len=settings.event_log_max_len,
+    ttl_seconds=settings.event_log_ttl_seconds,
+    max_replay=settings.event_log_max_replay,
+    replay_overlap_ms=settings.event_log_replay_overlap_ms,
+)
+
+# Delivered/seen acknowledgements are buffered per room and applied with one
+# UPDATE and one status broadcast per batching window.
+receipt_batcher = ReceiptBatcher(
+    apply=build_receipt_flush(async_session, websocket_manager, membership_cache, event_log),
+    window_seconds=settings.receipt_batch_window_seconds,
+    max_batch_size=settings.receipt_max_batch_size,
+)
+
+# Shared FCM sender: credentials, access token and HTTP client are reused
+# by every NotificationService instead of being rebuilt per request.
+fcm_sender = FCMSender(
+    service_account_file=settings.fcm_service_account_file,
+    base_url=settings.fcm_base_url,
+    http2=settings.fcm_http2,
+    refresh_margin_seconds=settings.fcm_token_refresh_margin_seconds,
+)
+
+# Background push delivery. Chat requests only enqueue; workers started in
+# the application lifespan send the notifications.
+push_queue = PushNotificationQueue(
+    deliver=build_push_delivery(async_session, fcm_sender),
+    maxsize=settings.push_queue_maxsize,
+    concurrency=settings.push_queue_concurrency,
+    max_retries=settings.push_max_retries,
+    backoff_base_seconds=settings.push_retry_backoff_seconds,
+)
+
+
+def _push_queue_jobs() -> dict:
+    stats = push_queue.stats()
+    return {("queued",): stats["depth"], ("in_flight",): stats["in_flight"], ("retrying",): stats["scheduled_retries"]}
+
+
+push_queue_jobs.set_function(_push_queue_jobs)
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
@@ -13,9 +14,11 @@ from app.api.rooms import router as room_router
 from app.api.messages import router as message_router
 from app.api.users import router as user_router
 from app.api.websocket import router as websocket_router 
-from app.globals import websocket_manager
+from app.api.metrics import router as metrics_router
+from app.globals import websocket_manager, fcm_sender, push_queue, typing_aggregator, receipt_batcher
 from app.database.postgres import initialize_db
-from app.utils.timing_middleware import TimingMiddleware
+from app.utils.metrics import MetricsMiddleware
+from app.utils.ws_compression import report_compression_stats
 from app.utils.websocket_manager import WebsocketManager
 
 
@@ -23,8 +26,22 @@ from app.utils.websocket_manager import WebsocketManager
 async def lifespan(app: FastAPI):
     await initialize_db()
     await websocket_manager.init_redis()
+    await push_queue.start()
+    await typing_aggregator.start()
+    await receipt_batcher.start()
+    compression_report_task = None
+    if settings.ws_compression and settings.ws_compression_report_interval_seconds > 0:
+        compression_report_task = asyncio.create_task(
+            report_compression_stats(settings.ws_compression_report_interval_seconds)
+        )
     yield
+    if compression_report_task is not None:
+        compression_report_task.cancel()
+    await typing_aggregator.stop()
+    await receipt_batcher.stop()
+    await push_queue.stop()
     await websocket_manager.close()
+    await fcm_sender.close()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -37,10 +54,12 @@ app.add_middleware(
 )
 
 app.add_exception_handler(BaseAPIException, custom_exception_handler)
-app.add_middleware(TimingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth_router)
 app.include_router(room_router)
 app.include_router(message_router)
 app.include_router(user_router)
-app.include_router(websocket_router)
\ No newline at end of file
+app.include_router(websocket_router)
+if settings.metrics_enabled:
+    app.include_router(metrics_router)
\ No newline at end of file
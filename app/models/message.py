@@ -1,6 +1,6 @@
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
-from sqlalchemy import Column, ForeignKey, Text, DateTime, Enum, Integer, String, Boolean
+from sqlalchemy import Column, ForeignKey, Text, DateTime, Enum, Integer, String, Boolean, Index
 from sqlalchemy.sql import func
 
 from .base import Base
@@ -8,6 +8,12 @@ from app.schemas.message import MessageStatus, MessageType
 
 class Message(Base):
     __tablename__ = "messages"
+    # Created by migration v0002_hot_path_indexes
+    __table_args__ = (
+        # Keyset pagination of room history: WHERE room_id = ? AND (created_at, id) < (?, ?)
+        # Also unread counts, seeking from each member's read cursor (v0003_read_cursors)
+        Index("ix_messages_room_id_created_at_id", "room_id", "created_at", "id"),
+    )
     
     content = Column(Text, nullable=False)
     message_type = Column(Enum(MessageType), default=MessageType.TEXT)  # text, image, file, etc.
@@ -1,13 +1,26 @@
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import relationship
 from .base import Base
 
 class RoomMembership(Base):
     __tablename__ = "room_memberships"
+    # Created by migration v0002_hot_path_indexes
+    __table_args__ = (
+        Index("uq_room_memberships_room_id_user_id", "room_id", "user_id", unique=True),
+        Index("ix_room_memberships_user_id", "user_id"),
+    )
     
     user_id = Column(PG_UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     room_id = Column(PG_UUID(as_uuid=True), ForeignKey("rooms.id"), nullable=False)
+
+    # Read cursor (migration v0003_read_cursors): the newest message this member
+    # has seen. Messages after (last_read_at, last_read_message_id) are unread.
+    last_read_message_id = Column(PG_UUID(as_uuid=True), nullable=True)
+    last_read_at = Column(DateTime(timezone=True), nullable=True)
+    # Messages from others after the cursor (migration v0004_room_summaries),
+    # incremented on send and decremented as the cursor advances
+    unread_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     user = relationship("User", back_populates="room_memberships")
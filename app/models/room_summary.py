@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from .base import Base
+
+# Characters of the last message kept for the room list
+PREVIEW_LENGTH = 200
+
+
+class RoomSummary(Base):
+    """
+    The room list's view of a room, maintained on the send path
+    (migration v0004_room_summaries) so listing rooms never aggregates
+    messages. `scripts/rebuild_room_summaries.py` recomputes it.
+    """
+    __tablename__ = "room_summaries"
+    __table_args__ = (
+        Index("uq_room_summaries_room_id", "room_id", unique=True),
+    )
+
+    room_id = Column(PG_UUID(as_uuid=True), ForeignKey("rooms.id"), nullable=False)
+    last_message_id = Column(PG_UUID(as_uuid=True), nullable=True)
+    last_message_preview = Column(String(PREVIEW_LENGTH), nullable=True)
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    last_sender_id = Column(PG_UUID(as_uuid=True), nullable=True)
+    message_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RoomSummary(room_id={self.room_id}, last_message_id={self.last_message_id})>"
@@ -2,7 +2,7 @@ from enum import Enum
 from pydantic import BaseModel, Field
 from uuid import UUID
 from datetime import datetime
-from typing import Literal
+from typing import List, Literal, Optional
 
 class MessageStatus(str, Enum):
     SENT = "sent"
@@ -39,4 +39,11 @@ class MessageResponse(BaseModel):
     is_deleted: bool
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class MessageHistoryResponse(BaseModel):
+    messages: List[MessageResponse]
+    next_cursor: Optional[str] = Field(
+        default=None,
+        description="Opaque cursor to continue paging in the same direction, or null when there are no more messages"
+    )
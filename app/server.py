@@ -0,0 +1,48 @@
+"""
+Runs the API under uvicorn with tuned permessage-deflate for /ws.
+
+uvicorn's own `--ws-per-message-deflate` negotiates zlib's defaults for every
+socket (a 32 KiB window, ~300 KiB of zlib state per connection, and every
+frame compressed however small). This entry point swaps in
+TunedPerMessageDeflateFactory, configured from the `ws_compression_*`
+settings.
+
+Usage:
+    python -m app.server [--host 0.0.0.0] [--port 8000] [--reload]
+"""
+import argparse
+
+import uvicorn
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+
+from app.core.config import settings
+from app.utils.ws_compression import TunedPerMessageDeflateFactory
+
+deflate_factory = TunedPerMessageDeflateFactory(
+    min_size=settings.ws_compression_min_size,
+    server_context_takeover=settings.ws_compression_server_context_takeover,
+    client_context_takeover=settings.ws_compression_client_context_takeover,
+    memory_limit_bytes=settings.ws_compression_memory_kb * 1024,
+    compression_level=settings.ws_compression_level,
+)
+
+
+class TunedWebSocketProtocol(WebSocketProtocol):
+    """uvicorn's websockets protocol, negotiating `deflate_factory` instead of the defaults."""
+
+    def __init__(self, config, *args, **kwargs):
+        super().__init__(config, *args, **kwargs)
+        self.available_extensions = [deflate_factory] if settings.ws_compression else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--reload", action="store_true")
+    args = parser.parse_args()
+    uvicorn.run("app.main:app", host=args.host, port=args.port, reload=args.reload, ws=TunedWebSocketProtocol)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,29 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.core.exceptions import InvalidCredentialsException, UserAlreadyExistsException
+from sqlalchemy import select, update
+from typing import Optional
+from uuid import UUID
+from app.core.exceptions import InvalidCredentialsException, UserAlreadyExistsException, UserNotFoundException
 from app.models.user import User
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.security import hash_password_async, verify_password_async, create_access_token
 from app.schemas.auth import RegisterRequest, LoginRequest
+from app.utils.principal_cache import PrincipalCache
+from app.utils.websocket_manager import WebsocketManager
 from fastapi import HTTPException, status
 
+# Control event used to drop a deactivated user's cached principals on every instance
+USER_DEACTIVATED_EVENT = "user_deactivated"
+
 
 class AuthService:
-    def __init__(self, db_session: AsyncSession):
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        principal_cache: Optional[PrincipalCache] = None,
+        websocket_manager: Optional[WebsocketManager] = None,
+    ):
         self.db_session = db_session
+        self.principal_cache = principal_cache
+        self.websocket_manager = websocket_manager
 
     async def register_user(self, request: RegisterRequest):
         """
@@ -33,7 +47,7 @@ class AuthService:
             username=request.username,
             display_name=request.display_name,
             email=request.email,
-            hashed_password=hash_password(request.password)
+            hashed_password=await hash_password_async(request.password)
         )
         self.db_session.add(user)
         await self.db_session.commit()
@@ -64,7 +78,7 @@ class AuthService:
         )
         user = user.scalar_one_or_none()
         
-        if not user or not verify_password(request.password, user.hashed_password):
+        if not user or not await verify_password_async(request.password, user.hashed_password):
             raise InvalidCredentialsException()
         
         access_token = create_access_token(
@@ -76,3 +90,25 @@ class AuthService:
         )
 
         return user, access_token
+
+    async def deactivate_user(self, user_id: UUID):
+        """
+        Deactivates a user and drops their cached principals on every instance,
+        so none of their outstanding tokens are accepted any more.
+
+        Raises:
+            UserNotFoundException: If the user doesn't exist
+        """
+        result = await self.db_session.execute(
+            update(User).where(User.id == user_id).values(is_active=False)
+        )
+        if result.rowcount == 0:
+            raise UserNotFoundException()
+        await self.db_session.commit()
+
+        if self.principal_cache is not None:
+            self.principal_cache.invalidate_user(user_id)
+        if self.websocket_manager is not None:
+            await self.websocket_manager.publish_control_event(
+                USER_DEACTIVATED_EVENT, {"user_id": str(user_id)}
+            )
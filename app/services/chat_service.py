@@ -1,28 +1,31 @@
 from collections import defaultdict
-import json
+import uuid
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, update
+from sqlalchemy import select, and_, or_, update, tuple_, insert, exists, literal, bindparam, func
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import Dict, Iterable, List, Optional
 
 from app.schemas.room import RoomType
-from app.services.notification_service import NotificationService
 from ..models.message import Message, MessageStatus
 from ..models.room_membership import RoomMembership
 from ..models.room import Room
-from ..models.user import User
-from ..schemas.message import MessageCreateRequest, MessageResponse, MessageType
+from ..schemas.message import MessageCreateRequest, MessageHistoryResponse, MessageResponse, MessageType
 from ..database.postgres import get_db_session
+from ..database.room_summaries import summary_upsert, unread_after_cursor, unread_increment
 from .room_service import RoomService
-from .notification_service import NotificationService
 from app.core.exceptions import (
+    InvalidInputException,
     RoomNotFoundException,
     UnauthorizedAccessException,
     MessageNotSentException,
-    UserNotFoundException
 )
 from ..utils.websocket_manager import WebsocketManager
+from ..utils.push_queue import PushNotificationQueue
+from ..utils.event_log import RoomEventLog
+from ..utils.pagination import encode_cursor, decode_cursor
+from ..utils.principal_cache import Principal
+from ..utils.serialization import dump_event
 
 class ChatService:
     def __init__(
@@ -30,117 +33,137 @@ class ChatService:
         room_service: RoomService, 
         db: AsyncSession, 
         websocket_manager: WebsocketManager,
-        notification_service: NotificationService 
+        push_queue: PushNotificationQueue,
+        event_log: Optional[RoomEventLog] = None,
     ):
         self.room_service = room_service
         self.db = db
         self.websocket_manager = websocket_manager
-        self.notification_service = notification_service 
+        self.push_queue = push_queue
+        self.event_log = event_log
+
+    async def _publish_room_event(self, room_id: UUID, event_type: str, data, user_ids: Iterable[UUID]):
+        """
+        Sends a room event to `user_ids`, recording it in the room's event log
+        (when one is configured) so reconnecting clients can have it replayed.
+        """
+        if self.event_log is not None:
+            await self.event_log.publish(room_id, event_type, data, user_ids)
+        else:
+            await self.websocket_manager.send_to_users(user_ids, dump_event(event_type, data))
 
     async def _validate_and_send_message(
         self,
-        user_id: UUID,
+        sender: Principal,
         room_id: UUID,
         content: str,
         message_type: MessageType = MessageType.TEXT,
         recipient_id: UUID = None,
         is_private: bool = False,
     ) -> MessageResponse:
-        # Check if room exists and user is a member
-        room = await self.db.execute(
-            select(Room)
-            .join(RoomMembership)
-            .filter(
-                and_(
-                    Room.id == room_id,
-                    RoomMembership.room_id == Room.id,
-                    RoomMembership.user_id == user_id
-                )
-            )
-        )
-        room = room.scalar_one_or_none()
-        if not room:
-            raise RoomNotFoundException(detail="Room not found or user is not a member")
+        """
+        Checks membership and stores the message in a single statement:
 
-        sender = await self.db.execute(select(User).filter(User.id == user_id))
-        sender = sender.scalar_one_or_none()
-        if not sender:
-            raise UserNotFoundException(detail="Sender not found")
+            INSERT INTO messages (...) SELECT ... WHERE EXISTS (membership) RETURNING ...
 
-        message = Message(
-            room_id=room_id,
-            sender_id=user_id,
-            content=content,
-            message_type=message_type,
-            status=MessageStatus.SENT,
-            recipient_id=recipient_id,
-            is_private=is_private,
+        The room's summary and the other members' unread counters are updated
+        in the same transaction. The sender is the already-authenticated user,
+        so no further lookups are needed to build the response.
+
+        Raises:
+            RoomNotFoundException: If the room doesn't exist or the sender is not a member
+            MessageNotSentException: If the insert fails
+        """
+        message_id = uuid.uuid4()
+        values = {
+            Message.id: message_id,
+            Message.room_id: room_id,
+            Message.sender_id: sender.id,
+            Message.content: content,
+            Message.message_type: message_type,
+            Message.status: MessageStatus.SENT,
+            Message.recipient_id: recipient_id,
+            Message.is_private: is_private,
+            Message.is_edited: False,
+            Message.is_deleted: False,
+        }
+        is_member = exists().where(
+            RoomMembership.room_id == room_id,
+            RoomMembership.user_id == sender.id,
+        )
+        stmt = (
+            insert(Message)
+            .from_select(
+                [column.key for column in values],
+                select(*[literal(value, column.type) for column, value in values.items()]).where(is_member),
+                include_defaults=False,
+            )
+            .returning(Message.created_at)
         )
-        self.db.add(message)
         try:
+            created_at = (await self.db.execute(stmt)).scalar_one_or_none()
+            if created_at is not None:
+                # The room list's summary and counters, in the same transaction
+                dialect_name = self.db.get_bind().dialect.name
+                await self.db.execute(summary_upsert(dialect_name, room_id, message_id, sender.id, content, created_at))
+                await self.db.execute(unread_increment(room_id, sender.id))
             await self.db.commit()
-            await self.db.refresh(message)
         except Exception as e:
             raise MessageNotSentException(detail="Failed to send message") from e
 
+        if created_at is None:
+            raise RoomNotFoundException(detail="Room not found or user is not a member")
+
         return MessageResponse(
-            id=message.id,
-            room_id=message.room_id,
-            sender_id=message.sender_id,
+            id=message_id,
+            room_id=room_id,
+            sender_id=sender.id,
             sender_username=sender.username,
             sender_display_name=sender.display_name,
-            content=message.content,
-            status=message.status,
-            timestamp=message.created_at,
-            message_type=message.message_type,
-            is_edited=message.is_edited,
-            is_deleted=message.is_deleted,
+            content=content,
+            status=MessageStatus.SENT,
+            timestamp=created_at,
+            message_type=message_type,
+            is_edited=False,
+            is_deleted=False,
         )
 
 
     async def send_message(
         self,
-        sender: User,
+        sender: Principal,
         request: MessageCreateRequest,
     ) -> MessageResponse:
         """
         Send a message to a group room, saves it, and broadcasts it, and sends push notifications.
         """
-        room = await self.db.execute(select(Room).filter(Room.id == request.room_id))
-        room = room.scalar_one_or_none()
+        room = await self.room_service.get_room_snapshot(request.room_id)
         if not room:
             raise RoomNotFoundException(detail="Room not found")
         if room.room_type == RoomType.PRIVATE:
             raise UnauthorizedAccessException(detail="Cannot send group messages to private rooms")
 
         message_response = await self._validate_and_send_message(
-            user_id=sender.id,
+            sender=sender,
             room_id=request.room_id,
             content=request.content,
             message_type=request.message_type,
             is_private=False,
         )
 
-        all_member_ids = await self.room_service.get_room_member_ids(request.room_id)
+        all_member_ids = room.member_ids
         
-        smart_event_payload = {
-            "type": "new_message",
-            "data": message_response.model_dump()
-        }
-        json_payload = json.dumps(smart_event_payload, default=str)
-
-        for member_id in all_member_ids:
-            await self.websocket_manager.send_personal_message(
-                user_id=member_id,
-                message=json_payload
-            )
+        # The same bytes are published to every member
+        await self._publish_room_event(request.room_id, "new_message", message_response, all_member_ids)
         
-        # TODO: Add logic here later for push notifications to offline users
-        online_user_ids = await self.websocket_manager.get_globally_online_users()
-
-        for member_id in all_member_ids:
-            if str(member_id) not in online_user_ids and member_id != sender.id:
-                await self.notification_service.send_notification_to_user(
+        # Push notifications for offline members are delivered in the background.
+        # Presence is checked only for this room's members, in one round trip.
+        recipient_ids = [member_id for member_id in all_member_ids if member_id != sender.id]
+        online_user_ids = await self.websocket_manager.are_online(recipient_ids)
+
+        for member_id in recipient_ids:
+            if member_id not in online_user_ids:
+                self.push_queue.enqueue(
                     user_id=member_id,
                     title=f"New message in {room.name}",
                     body=request.content, 
@@ -151,7 +174,7 @@ class ChatService:
 
     async def send_private_message(
         self,
-        sender: User,
+        sender: Principal,
         target_user_id: UUID,
         content: str,
         message_type: MessageType = MessageType.TEXT,
@@ -165,7 +188,7 @@ class ChatService:
         )
 
         message_response = await self._validate_and_send_message(
-            user_id=sender.id,
+            sender=sender,
             room_id=room.id,
             content=content,
             message_type=message_type,
@@ -175,23 +198,13 @@ class ChatService:
 
         recipients = [sender.id, target_user_id]
 
-        smart_event_payload = {
-            "type": "new_message", 
-            "data": message_response.model_dump()
-        }
-        json_payload = json.dumps(smart_event_payload, default=str)
-
-        for user_id in set(recipients): 
-            await self.websocket_manager.send_personal_message(
-                user_id=user_id,
-                message=json_payload
-            )
+        await self._publish_room_event(room.id, "new_message", message_response, recipients)
 
-        # TODO: Add logic here later for push notifications to offline users   
-        online_user_ids = await self.websocket_manager.get_globally_online_users()
+        # Push notifications for offline members are delivered in the background
+        online_user_ids = await self.websocket_manager.are_online([target_user_id])
 
-        if str(target_user_id) not in online_user_ids:
-            await self.notification_service.send_notification_to_user(
+        if target_user_id not in online_user_ids:
+            self.push_queue.enqueue(
                 user_id=target_user_id,
                 title=f"New message from {sender.username}",
                 body=content,
@@ -205,138 +218,297 @@ class ChatService:
         user_id: UUID,
         room_id: UUID,
         limit: int = 50,
-        offset: int = 0,
-    ) -> List[MessageResponse]:
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+    ) -> MessageHistoryResponse:
         """
-        Retrieve message history for a room.
+        Retrieve a page of message history for a room using keyset pagination.
+
+        Without a cursor the newest `limit` messages are returned. `before`
+        pages towards older messages and `after` towards newer ones; both take
+        a cursor previously returned as `next_cursor`. Messages are always
+        returned in chronological order.
+
+        Raises:
+            InvalidInputException: If both cursors are given or a cursor is malformed
+            UnauthorizedAccessException: If the user is not a member of the room
         """
-        # Check if user is a member of the room
+        if before and after:
+            raise InvalidInputException(detail="Use either 'before' or 'after', not both")
+
+        # Check that the user is a member of the room, and find how far the
+        # other members have read so the user's own messages can show SEEN
         membership = await self.db.execute(
-            select(RoomMembership).filter(
+            select(
+                RoomMembership.user_id,
+                select(func.max(RoomMembership.last_read_at))
+                .where(RoomMembership.room_id == room_id, RoomMembership.user_id != user_id)
+                .scalar_subquery(),
+            ).filter(
                 and_(
                     RoomMembership.room_id == room_id,
                     RoomMembership.user_id == user_id
                 )
             )
         )
-        if not membership.scalar():
+        row = membership.first()
+        if row is None:
             raise UnauthorizedAccessException(detail="User is not a member of the room")
+        read_by_others_until = row[1]
 
-        # Fetch messages with sender details
-        messages = await self.db.execute(
+        # Seek on (created_at, id), served by ix_messages_room_id_created_at_id,
+        # so the cost of a page does not grow with how deep it is.
+        position = tuple_(Message.created_at, Message.id)
+        query = (
             select(Message)
             .options(selectinload(Message.sender))
             .filter(Message.room_id == room_id)
-            .order_by(Message.created_at.desc())
-            .limit(limit)
-            .offset(offset)
         )
-        messages = messages.scalars().all()
-
-        return [
-            MessageResponse(
-                id=msg.id,
-                room_id=msg.room_id,
-                sender_id=msg.sender_id,
-                sender_username=msg.sender.username,
-                sender_display_name=msg.sender.display_name,
-                content=msg.content,
-                status=msg.status,
-                timestamp=msg.created_at,
-                message_type=msg.message_type,
-                is_edited=msg.is_edited,
-                is_deleted=msg.is_deleted,
-            )
-            for msg in reversed(messages)
-        ]
+        if after:
+            query = query.filter(position > tuple_(*decode_cursor(after)))
+            query = query.order_by(Message.created_at.asc(), Message.id.asc())
+        else:
+            if before:
+                query = query.filter(position < tuple_(*decode_cursor(before)))
+            query = query.order_by(Message.created_at.desc(), Message.id.desc())
+
+        # Fetch one extra row to know whether another page exists
+        result = await self.db.execute(query.limit(limit + 1))
+        messages = list(result.scalars().all())
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+
+        next_cursor = None
+        if has_more:
+            last = messages[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+
+        if not after:
+            messages.reverse()
+
+        return MessageHistoryResponse(
+            messages=[
+                MessageResponse(
+                    id=msg.id,
+                    room_id=msg.room_id,
+                    sender_id=msg.sender_id,
+                    sender_username=msg.sender.username,
+                    sender_display_name=msg.sender.display_name,
+                    content=msg.content,
+                    status=(
+                        MessageStatus.SEEN
+                        if msg.sender_id == user_id and read_by_others_until is not None
+                        and msg.created_at <= read_by_others_until
+                        else msg.status
+                    ),
+                    timestamp=msg.created_at,
+                    message_type=msg.message_type,
+                    is_edited=msg.is_edited,
+                    is_deleted=msg.is_deleted,
+                )
+                for msg in messages
+            ],
+            next_cursor=next_cursor,
+        )
     
     async def _update_message_status(
         self,
-        message_ids: list[UUID],
+        receipts: Dict[UUID, Iterable[UUID]],
         new_status: MessageStatus,
-        requesting_user_id: UUID,
-    ):
+        room_id: Optional[UUID] = None,
+    ) -> Dict[UUID, List[str]]:
         """
-        Internal helper to update the status of a list of messages.
-        It handles authorization, database updates, and broadcasting the change.
-        """
-        if not message_ids:
-            return
+        Applies the delivery acknowledgements of one or more users in a single
+        statement and broadcasts one `message_status_update` per affected room.
 
-        # 1. Fetch messages and their room memberships to authorize the request
-        query = (
-            select(Message)
-            .options(selectinload(Message.room).joinedload(Room.memberships))
-            .filter(Message.id.in_(message_ids))
-        )
-        result = await self.db.execute(query)
-        messages_to_update = result.scalars().all()
+        `receipts` maps each acknowledging user to message ids. Authorization
+        and the status progression (sent -> delivered) are part of the UPDATE
+        itself: a user may update a private message addressed to them, or a
+        group message in a room where a membership EXISTS for them.
+        Unauthorized or stale ids are simply not matched. `room_id`, when the
+        client provided it, narrows the statement to that room.
 
-        if not messages_to_update:
-            return
+        Seen acknowledgements do not go through here; they advance the
+        reader's own cursor (see `_advance_read_cursors`).
 
-        # 2. Authorization and Filtering
-        # A user can only update status for messages they are a recipient of.
-        # We also respect the status progression: sent -> delivered -> seen.
-        
-        valid_message_ids_to_update = []
-        # Group messages by room to broadcast updates efficiently
-        room_updates = defaultdict(list) 
+        Returns the updated message ids grouped by room.
+        """
+        receipts = {user_id: list(message_ids) for user_id, message_ids in receipts.items() if message_ids}
+        if not receipts:
+            return {}
 
         allowed_previous_statuses = {
             MessageStatus.DELIVERED: [MessageStatus.SENT],
-            MessageStatus.SEEN: [MessageStatus.SENT, MessageStatus.DELIVERED],
         }
 
-        for msg in messages_to_update:
-            is_recipient = False
-            if msg.is_private:
-                # For DMs, the user must be the designated recipient
-                if msg.recipient_id == requesting_user_id:
-                    is_recipient = True
-            else:
-                # For group chats, the user must be a member of the room
-                if any(m.user_id == requesting_user_id for m in msg.room.memberships):
-                    is_recipient = True
-            
-            # Check if the user is authorized AND the status update is valid
-            if is_recipient and msg.status in allowed_previous_statuses.get(new_status, []):
-                valid_message_ids_to_update.append(msg.id)
-                room_updates[msg.room_id].append(str(msg.id))
-
-        if not valid_message_ids_to_update:
-            return
+        per_user = []
+        for user_id, message_ids in receipts.items():
+            is_member = exists().where(
+                RoomMembership.room_id == Message.room_id,
+                RoomMembership.user_id == user_id,
+            )
+            is_recipient = or_(
+                and_(Message.is_private.is_(True), Message.recipient_id == user_id),
+                and_(Message.is_private.isnot(True), is_member),
+            )
+            per_user.append(and_(Message.id.in_(message_ids), is_recipient))
 
-        # 3. Update the database
         stmt = (
             update(Message)
-            .where(Message.id.in_(valid_message_ids_to_update))
+            .where(or_(*per_user), Message.status.in_(allowed_previous_statuses.get(new_status, [])))
             .values(status=new_status)
+            .returning(Message.id, Message.room_id)
+            .execution_options(synchronize_session=False)
         )
-        await self.db.execute(stmt)
+        if room_id is not None:
+            stmt = stmt.where(Message.room_id == room_id)
+
+        rows = (await self.db.execute(stmt)).all()
         await self.db.commit()
 
-        # 4. Broadcast the status update to all members of the affected rooms
-        for room_id, updated_ids in room_updates.items():
-            all_member_ids = await self.room_service.get_room_member_ids(room_id)
-            
-            status_update_payload = {
-                "type": "message_status_update",
-                "data": {
-                    "room_id": str(room_id),
-                    "message_ids": updated_ids,
-                    "status": new_status.value
-                }
-            }
-            json_payload = json.dumps(status_update_payload)
-
-            for member_id in all_member_ids:
-                await self.websocket_manager.send_personal_message(member_id, json_payload)
+        room_updates: Dict[UUID, List[str]] = defaultdict(list)
+        for message_id, message_room_id in rows:
+            room_updates[message_room_id].append(str(message_id))
+
+        # Broadcast the status update to all members of the affected rooms
+        for updated_room_id, updated_ids in room_updates.items():
+            all_member_ids = await self.room_service.get_room_member_ids(updated_room_id)
+
+            await self._publish_room_event(updated_room_id, "message_status_update", {
+                "room_id": str(updated_room_id),
+                "message_ids": updated_ids,
+                "status": new_status.value
+            }, all_member_ids)
+
+        return room_updates
+
+    async def _advance_read_cursors(
+        self,
+        receipts: Dict[UUID, Iterable[UUID]],
+        room_id: Optional[UUID] = None,
+    ) -> Dict[UUID, List[dict]]:
+        """
+        Moves each reader's cursor forward to the newest message they
+        acknowledged, and broadcasts one `read_cursor_updated` per room.
+
+        Reading a room is one membership row per reader instead of one status
+        write per message. A single SELECT loads the acknowledged messages
+        joined with the readers' memberships of their rooms, which both
+        authorizes (no membership, no row) and finds the target cursor; a
+        single executemany UPDATE then applies the cursors, guarded so that
+        they never move backwards, and takes the messages between the old and
+        new cursor off the reader's unread counter.
+
+        Returns the advanced cursors grouped by room.
+        """
+        receipts = {user_id: set(message_ids) for user_id, message_ids in receipts.items() if message_ids}
+        if not receipts:
+            return {}
+
+        query = (
+            select(
+                Message.id,
+                Message.room_id,
+                Message.created_at,
+                RoomMembership.user_id,
+                RoomMembership.last_read_at,
+                RoomMembership.last_read_message_id,
+            )
+            .join(RoomMembership, RoomMembership.room_id == Message.room_id)
+            .where(
+                Message.id.in_(set().union(*receipts.values())),
+                RoomMembership.user_id.in_(list(receipts)),
+            )
+        )
+        if room_id is not None:
+            query = query.where(Message.room_id == room_id)
+        rows = (await self.db.execute(query)).all()
+
+        # (user_id, room_id) -> newest acknowledged (created_at, message_id) past the current cursor
+        targets: Dict[tuple, tuple] = {}
+        for message_id, message_room_id, created_at, user_id, last_read_at, last_read_message_id in rows:
+            if message_id not in receipts[user_id]:
+                continue
+            position = (created_at, message_id)
+            if last_read_at is not None and position <= (last_read_at, last_read_message_id or message_id):
+                continue
+            key = (user_id, message_room_id)
+            if key not in targets or position > targets[key]:
+                targets[key] = position
+
+        if not targets:
+            return {}
+
+        memberships = RoomMembership.__table__
+        stmt = (
+            update(memberships)
+            .where(
+                memberships.c.user_id == bindparam("reader_id"),
+                memberships.c.room_id == bindparam("cursor_room_id"),
+                or_(memberships.c.last_read_at.is_(None), memberships.c.last_read_at <= bindparam("read_at")),
+            )
+            .values(
+                last_read_message_id=bindparam("message_id"),
+                last_read_at=bindparam("read_at"),
+                # Evaluated against the old cursor: the messages being marked read
+                unread_count=memberships.c.unread_count - unread_after_cursor(
+                    memberships,
+                    Message.__table__,
+                    until=(
+                        bindparam("read_at", type_=Message.created_at.type),
+                        bindparam("message_id", type_=Message.id.type),
+                    ),
+                ),
+            )
+        )
+        await self.db.execute(stmt, [
+            {"reader_id": user_id, "cursor_room_id": cursor_room_id, "message_id": message_id, "read_at": created_at}
+            for (user_id, cursor_room_id), (created_at, message_id) in targets.items()
+        ])
+        await self.db.commit()
+
+        room_cursors: Dict[UUID, List[dict]] = defaultdict(list)
+        for (user_id, cursor_room_id), (created_at, message_id) in targets.items():
+            room_cursors[cursor_room_id].append({
+                "user_id": str(user_id),
+                "last_read_message_id": str(message_id),
+                "last_read_at": created_at.isoformat(),
+            })
+
+        for cursor_room_id, cursors in room_cursors.items():
+            all_member_ids = await self.room_service.get_room_member_ids(cursor_room_id)
+            await self._publish_room_event(
+                cursor_room_id, "read_cursor_updated", {"room_id": str(cursor_room_id), "cursors": cursors}, all_member_ids
+            )
+
+        return room_cursors
 
     async def mark_messages_as_delivered(self, message_ids: list[UUID], requesting_user_id: UUID):
         """Marks a list of messages as DELIVERED for a given user."""
-        await self._update_message_status(message_ids, MessageStatus.DELIVERED, requesting_user_id)
+        await self._update_message_status({requesting_user_id: message_ids}, MessageStatus.DELIVERED)
 
     async def mark_messages_as_seen(self, message_ids: list[UUID], requesting_user_id: UUID):
-        """Marks a list of messages as SEEN for a given user."""
-        await self._update_message_status(message_ids, MessageStatus.SEEN, requesting_user_id)
\ No newline at end of file
+        """Advances a user's read cursors to the newest of the given messages."""
+        await self._advance_read_cursors({requesting_user_id: message_ids})
+
+
+def build_receipt_flush(session_factory, websocket_manager: WebsocketManager, membership_cache=None, event_log=None):
+    """
+    Returns the callback used by the background ReceiptBatcher. Each batch
+    runs with its own short-lived database session.
+    """
+    async def apply(room_id: Optional[UUID], status: MessageStatus, receipts: Dict[UUID, Iterable[UUID]]):
+        async with session_factory() as db:
+            chat_service = ChatService(
+                room_service=RoomService(db, membership_cache, websocket_manager),
+                db=db,
+                websocket_manager=websocket_manager,
+                push_queue=None,
+                event_log=event_log,
+            )
+            if status == MessageStatus.SEEN:
+                await chat_service._advance_read_cursors(receipts, room_id)
+            else:
+                await chat_service._update_message_status(receipts, status, room_id)
+
+    return apply
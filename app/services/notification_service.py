@@ -1,39 +1,46 @@
 import asyncio
-import json
+from typing import Optional
+
 import httpx
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from google.oauth2 import service_account
-import google.auth.transport.requests
 from uuid import UUID
 
 from app.schemas.user import DeviceType
 
+from app.core.exceptions import NotificationFailedException
 from ..models.fcm_token import FCMToken
+from ..utils.fcm import FCMSender
+from ..utils.metrics import fcm_sends
+from ..utils.push_queue import PushJob
+
+# FCM error codes for tokens that will never work again; the token is deleted
+# instead of being retried. Other 403/404 answers (e.g. PERMISSION_DENIED from
+# a misconfigured service account) keep the token.
+STALE_TOKEN_ERRORS = frozenset({"UNREGISTERED", "SENDER_ID_MISMATCH"})
+
+
+def is_transient_status(status_code: int) -> bool:
+    """Rate limiting and server errors are worth retrying; other 4xx rejections are not."""
+    return status_code == 429 or status_code >= 500
+
+
+def get_fcm_error_code(response: httpx.Response) -> Optional[str]:
+    """Returns the FcmError `errorCode` of a rejected send, if its body carries one."""
+    try:
+        details = response.json()["error"].get("details") or []
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    for detail in details:
+        if isinstance(detail, dict) and detail.get("errorCode"):
+            return detail["errorCode"]
+    return None
 
-SCOPES = ['https://www.googleapis.com/auth/firebase.messaging']
-SERVICE_ACCOUNT_FILE = 'service_account_key.json'
 
 class NotificationService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, fcm_sender: FCMSender):
         self.db = db
-        self.project_id = self._get_project_id()
-        self.fcm_url = f"https://fcm.googleapis.com/v1/projects/{self.project_id}/messages:send"
-        self._access_token = None
-        self._credentials = None
-
-    def _get_project_id(self):
-        with open(SERVICE_ACCOUNT_FILE, 'r') as f:
-            return json.load(f).get('project_id')
-
-    def _get_access_token(self):
-        if not self._credentials:
-            self._credentials = service_account.Credentials.from_service_account_file(
-                SERVICE_ACCOUNT_FILE, scopes=SCOPES
-            )
-        request = google.auth.transport.requests.Request()
-        self._credentials.refresh(request)
-        return self._credentials.token
+        self.fcm_sender = fcm_sender
 
     async def register_fcm_token(self, user_id: UUID, token: str, device_type: DeviceType):
         """
@@ -68,6 +75,16 @@ class NotificationService:
         await self.db.commit()
 
     async def send_notification_to_user(self, user_id: UUID, title: str, body: str, data: dict = None):
+        """
+        Sends a notification to every registered device of a user.
+
+        Tokens FCM reports as unregistered or foreign are deleted.
+
+        Raises:
+            NotificationFailedException: If the user has devices but none of them could be reached.
+                It is retryable only if at least one device failed transiently (a network
+                error, 429 or 5xx).
+        """
         stmt = select(FCMToken.token, FCMToken.device_type).filter(FCMToken.user_id == user_id)
         result = await self.db.execute(stmt)
         user_devices = result.all()
@@ -75,46 +92,82 @@ class NotificationService:
         if not user_devices:
             return
 
-        headers = {
-            'Authorization': f'Bearer {self._get_access_token()}',
-            'Content-Type': 'application/json; UTF-8',
-        }
-        
-        async with httpx.AsyncClient() as client:
-            tasks = []
-            for token, device_type in user_devices:
-                
-                # Construct a payload specific to the device type
-                if device_type == 'web':
-                    payload = {
-                        "message": {
-                            "token": token,
-                            "notification": {"title": title, "body": body},
-                            "data": data or {}
-                        }
+        tasks = []
+        task_tokens = []
+        for token, device_type in user_devices:
+            
+            # Construct a payload specific to the device type
+            if device_type == 'web':
+                payload = {
+                    "message": {
+                        "token": token,
+                        "notification": {"title": title, "body": body},
+                        "data": data or {}
                     }
-                elif device_type in ['android', 'ios']:
-                    # For mobile, you might send a silent data-only push with a badge count
-                    payload = {
-                        "message": {
-                            "token": token,
-                            "data": {
-                                **(data or {}),
-                                "title": title, # Custom data keys
-                                "body": body,
-                                "badge": "1",
-                                "sound": "default"
-                            }
+                }
+            elif device_type in ['android', 'ios']:
+                # For mobile, you might send a silent data-only push with a badge count
+                payload = {
+                    "message": {
+                        "token": token,
+                        "data": {
+                            **(data or {}),
+                            "title": title, # Custom data keys
+                            "body": body,
+                            "badge": "1",
+                            "sound": "default"
                         }
                     }
+                }
+            else:
+                continue
+
+            # Add the request to a list of tasks to be run concurrently
+            tasks.append(self.fcm_sender.send(payload))
+            task_tokens.append(token)
+
+        if tasks:
+            responses = await asyncio.gather(*tasks, return_exceptions=True)
+            delivered = 0
+            transient = 0
+            stale_tokens = []
+            for token, response in zip(task_tokens, responses):
+                if isinstance(response, Exception):
+                    fcm_sends.inc("error")
+                    transient += 1
+                    print(f"Failed to send notification to token {token[:15]}...: {response}")
+                elif response.status_code >= 400:
+                    fcm_sends.inc("rejected")
+                    print(f"FCM rejected notification to token {token[:15]}...: {response.status_code}")
+                    if is_transient_status(response.status_code):
+                        transient += 1
+                    elif get_fcm_error_code(response) in STALE_TOKEN_ERRORS:
+                        stale_tokens.append(token)
                 else:
-                    continue
+                    fcm_sends.inc("sent")
+                    delivered += 1
+            if stale_tokens:
+                await self.db.execute(delete(FCMToken).where(FCMToken.token.in_(stale_tokens)))
+                await self.db.commit()
+            if not delivered:
+                raise NotificationFailedException(
+                    detail=f"No device of user {user_id} accepted the notification",
+                    retryable=transient > 0,
+                )
 
-                # Add the request to a list of tasks to be run concurrently
-                tasks.append(client.post(self.fcm_url, headers=headers, json=payload))
 
-            if tasks:
-                responses = await asyncio.gather(*tasks, return_exceptions=True)
-                for i, response in enumerate(responses):
-                    if isinstance(response, Exception):
-                        print(f"Failed to send notification to token {user_devices[i][0][:15]}...: {response}")
\ No newline at end of file
+def build_push_delivery(session_factory, fcm_sender: FCMSender):
+    """
+    Returns the delivery callback used by the background PushNotificationQueue.
+    Each job runs with its own short-lived database session.
+    """
+    async def deliver(job: PushJob):
+        async with session_factory() as db:
+            await NotificationService(db, fcm_sender).send_notification_to_user(
+                user_id=job.user_id,
+                title=job.title,
+                body=job.body,
+                data=job.data,
+            )
+
+    return deliver
\ No newline at end of file
@@ -2,16 +2,17 @@ from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func, distinct
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Optional
 from sqlalchemy.orm import contains_eager
 
-from app.schemas.message import MessageStatus
-from ..models.message import Message
 from ..models.room import Room, RoomType
 from ..models.room_membership import RoomMembership
+from ..models.room_summary import RoomSummary
 from ..models.user import User
 from ..schemas.room import RoomMemberResponse, RoomResponse, CreateRoomRequest, CreatePrivateRoomRequest
 from ..database.postgres import get_db_session
+from ..utils.membership_cache import RoomMembershipCache, RoomSnapshot
+from ..utils.websocket_manager import WebsocketManager
 from ..core.exceptions import (
     UserNotFoundException,
     RoomNotFoundException,
@@ -20,9 +21,28 @@ from ..core.exceptions import (
     InternalServerErrorException,
 )
 
+# Control event used to invalidate cached room memberships on every instance
+MEMBERSHIP_CHANGED_EVENT = "room_membership_changed"
+
 class RoomService:
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        membership_cache: Optional[RoomMembershipCache] = None,
+        websocket_manager: Optional[WebsocketManager] = None,
+    ):
         self.db = db
+        self.membership_cache = membership_cache
+        self.websocket_manager = websocket_manager
+
+    async def _invalidate_membership(self, room_id: UUID):
+        """Drops the cached snapshot of a room here and, through Redis, on every other instance."""
+        if self.membership_cache is not None:
+            self.membership_cache.invalidate(room_id)
+        if self.websocket_manager is not None:
+            await self.websocket_manager.publish_control_event(
+                MEMBERSHIP_CHANGED_EVENT, {"room_id": str(room_id)}
+            )
 
     async def create_room(
         self,
@@ -72,6 +92,7 @@ class RoomService:
             await self.db.commit()
         except Exception as e:
             raise InternalServerErrorException(detail="Failed to add user to room") from e
+        await self._invalidate_membership(room.id)
 
         return RoomResponse(
             id=room.id,
@@ -137,6 +158,7 @@ class RoomService:
             self.db.add(membership)
             
             await self.db.commit() # Save everything
+            await self._invalidate_membership(room.id)
             return room
 
         # Check if user2 exists
@@ -185,6 +207,7 @@ class RoomService:
         except Exception as e:
             raise InternalServerErrorException(detail="Failed to add users to private room") from e
 
+        await self._invalidate_membership(room.id)
         return room
 
     async def join_room(self, user_id: UUID, room_id: UUID) -> None:
@@ -223,10 +246,14 @@ class RoomService:
         if membership.scalar():
             raise RoomAlreadyExistsException(detail="User is already a member of the room")
 
-        # Add user to room
+        # Add user to room; the room's whole history is unread for them
+        message_count = await self.db.execute(
+            select(RoomSummary.message_count).filter(RoomSummary.room_id == room_id)
+        )
         membership = RoomMembership(
             user_id=user_id,
-            room_id=room_id
+            room_id=room_id,
+            unread_count=message_count.scalar() or 0
         )
         self.db.add(membership)
         try:
@@ -234,63 +261,29 @@ class RoomService:
         except Exception as e:
             raise InternalServerErrorException(detail="Failed to join room") from e
 
+        await self._invalidate_membership(room_id)
+
 
     async def get_user_rooms_with_details(self, user_id: UUID) -> List[RoomResponse]:
         """
         Gets all rooms a user is a member of, enriched with member details,
         the last message, and the count of unread messages.
+
+        The last message comes from `room_summaries` and the unread count from
+        the user's membership, both maintained as messages are sent and read,
+        so this is one lookup by ix_room_memberships_user_id however many
+        messages the rooms hold (plus the member list).
         """
-        # Query 1: Get rooms and members (no change here)
         rooms_query = (
-            select(Room)
-            .join(Room.memberships)
-            .where(RoomMembership.user_id == user_id)
+            select(Room, RoomMembership.unread_count, RoomSummary.last_message_preview, RoomSummary.last_message_at)
+            .join(RoomMembership, and_(RoomMembership.room_id == Room.id, RoomMembership.user_id == user_id))
+            .outerjoin(RoomSummary, RoomSummary.room_id == Room.id)
             .options(selectinload(Room.memberships).selectinload(RoomMembership.user))
-            .distinct()
         )
         result = await self.db.execute(rooms_query)
-        rooms = result.scalars().all()
-
-        if not rooms:
-            return []
-
-        room_ids = [room.id for room in rooms]
 
-        # Query 2: Get last messages (no change here)
-        last_message_subquery = (
-            select(Message, func.row_number().over(
-                partition_by=Message.room_id,
-                order_by=Message.created_at.desc()
-            ).label("row_num"))
-            .where(Message.room_id.in_(room_ids))
-            .subquery()
-        )
-        last_messages_query = select(last_message_subquery).where(last_message_subquery.c.row_num == 1)
-        last_messages_result = await self.db.execute(last_messages_query)
-        last_messages_map = {msg.room_id: msg for msg in last_messages_result.all()}
-
-        # --- NEW QUERY 3: Get unread counts for all rooms at once ---
-        unread_counts_query = (
-            select(
-                Message.room_id,
-                func.count(Message.id).label("unread_count")
-            )
-            .where(
-                Message.room_id.in_(room_ids),
-                Message.sender_id != user_id,
-                Message.status != MessageStatus.SEEN
-            )
-            .group_by(Message.room_id)
-        )
-        unread_counts_result = await self.db.execute(unread_counts_query)
-        # Create a dictionary for fast lookups: {room_id: count}
-        unread_counts_map = {room_id: count for room_id, count in unread_counts_result.all()}
-
-        # Combine all data in Python
         response_list = []
-        for room in rooms:
-            last_msg = last_messages_map.get(room.id)
-            unread_count = unread_counts_map.get(room.id, 0) # Default to 0 if no unread messages
+        for room, unread_count, last_message, last_message_at in result.all():
             response_list.append(
                 RoomResponse(
                     id=room.id,
@@ -304,17 +297,45 @@ class RoomService:
                             username=member.user.username
                         ) for member in room.memberships
                     ],
-                    last_message=last_msg.content if last_msg else None,
-                    last_message_timestamp=last_msg.created_at if last_msg else None,
-                    unread_count=unread_count # Pass the count to the response
+                    last_message=last_message,
+                    last_message_timestamp=last_message_at,
+                    unread_count=max(unread_count, 0)
                 )
             )
         
         return response_list
     
-    async def get_room_member_ids(self, room_id: UUID) -> list[UUID]:
-        """Fetches a list of all user IDs in a given room."""
+    async def get_room_snapshot(self, room_id: UUID) -> Optional[RoomSnapshot]:
+        """
+        Returns the room's type, name and member ids, or None if the room does not exist.
+        Served from the membership cache when one is configured; a miss costs one query.
+        """
+        if self.membership_cache is not None:
+            snapshot = self.membership_cache.get(room_id)
+            if snapshot is not None:
+                return snapshot
+            generation = self.membership_cache.generation(room_id)
+
         result = await self.db.execute(
-            select(RoomMembership.user_id).filter(RoomMembership.room_id == room_id)
+            select(Room.name, Room.room_type, RoomMembership.user_id)
+            .outerjoin(RoomMembership, RoomMembership.room_id == Room.id)
+            .filter(Room.id == room_id)
+        )
+        rows = result.all()
+        if not rows:
+            return None
+
+        snapshot = RoomSnapshot(
+            room_id=room_id,
+            name=rows[0].name,
+            room_type=rows[0].room_type,
+            member_ids=frozenset(row.user_id for row in rows if row.user_id is not None),
         )
-        return result.scalars().all()
\ No newline at end of file
+        if self.membership_cache is not None:
+            self.membership_cache.set(snapshot, generation)
+        return snapshot
+
+    async def get_room_member_ids(self, room_id: UUID) -> list[UUID]:
+        """Fetches a list of all user IDs in a given room."""
+        snapshot = await self.get_room_snapshot(room_id)
+        return list(snapshot.member_ids) if snapshot else []
\ No newline at end of file
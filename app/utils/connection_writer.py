@@ -0,0 +1,221 @@
+import asyncio
+import re
+from collections import deque
+from typing import Deque, Iterable, Optional, Sequence, Tuple, Union
+from fastapi import WebSocket, status
+
+from .frames import JSON_FRAMES, MSGPACK_FRAMES, FrameCache, decode_frame, encode_frame
+
+# Overflow strategies, applied in the configured order until there is room
+DROP_TYPING = "drop_typing"
+COALESCE_STATUS = "coalesce_status"
+DISCONNECT = "disconnect"
+OVERFLOW_STRATEGIES = (DROP_TYPING, COALESCE_STATUS, DISCONNECT)
+
+TYPING_EVENT = "typing_indicator"
+STATUS_EVENT = "message_status_update"
+
+_EVENT_TYPE_PATTERN = re.compile(r'"type"\s*:\s*"([A-Za-z_]+)"')
+
+
+def get_event_type(message: str) -> Optional[str]:
+    """
+    Returns the `type` of a serialized event without parsing the whole payload.
+    Every event is published as an object whose first key is "type".
+    """
+    match = _EVENT_TYPE_PATTERN.search(message, 0, 64)
+    return match.group(1) if match else None
+
+
+def parse_overflow_policy(policy: str) -> Tuple[str, ...]:
+    """Parses a comma separated list of overflow strategies, e.g. "drop_typing,disconnect"."""
+    strategies = tuple(s.strip() for s in policy.split(",") if s.strip())
+    unknown = set(strategies) - set(OVERFLOW_STRATEGIES)
+    if unknown:
+        raise ValueError(f"Unknown websocket overflow strategies: {', '.join(sorted(unknown))}")
+    return strategies
+
+
+class ConnectionWriter:
+    """
+    Owns all writes to a single WebSocket.
+
+    Outbound messages are put on a bounded queue and sent by a dedicated
+    writer task, so a slow client only ever delays itself and never the
+    pub/sub listener that fans messages out to every connection. Frames are
+    already encoded in the socket's `frame_format` (JSON text or MessagePack
+    binary) when they are queued.
+
+    When the queue is full the overflow strategies run in order:
+    `drop_typing` discards queued (and incoming) typing indicators,
+    `coalesce_status` merges queued status updates for the same room and
+    status into one, and `disconnect` closes the slow consumer. If none of
+    them frees a slot the incoming message is dropped.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        maxsize: int = 256,
+        overflow_policy: Sequence[str] = OVERFLOW_STRATEGIES,
+        frame_format: str = JSON_FRAMES,
+    ):
+        self.websocket = websocket
+        self.frame_format = frame_format
+        self.maxsize = maxsize
+        self.overflow_policy = tuple(overflow_policy)
+
+        self._queue: Deque[Tuple[Optional[str], Union[str, bytes]]] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._close_task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.overflows = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the writer task; anything still queued is discarded."""
+        self.closed = True
+        self._queue.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def send_backlog(self, messages: Iterable[Union[str, bytes]]):
+        """
+        Sends messages straight to the socket, ahead of anything queued.
+        Only valid before `start()`, while nothing else writes to the socket.
+        """
+        for message in messages:
+            if isinstance(message, bytes):
+                message = message.decode()
+            frame = FrameCache(message).get(self.frame_format)
+            if self.frame_format == MSGPACK_FRAMES:
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_text(frame)
+            self.sent += 1
+
+    def enqueue(self, message: Union[str, bytes], event_type: Optional[str] = None) -> bool:
+        """
+        Queues a message for this connection without waiting for the socket.
+        `event_type` may be passed when the caller already knows it, so that a
+        message fanned out to many connections is inspected only once; it is
+        required for binary frames.
+        Returns False if the message was dropped.
+        """
+        if self.closed:
+            return False
+        if event_type is None and isinstance(message, str):
+            event_type = get_event_type(message)
+
+        if len(self._queue) >= self.maxsize and not self._make_room(event_type):
+            self.dropped += 1
+            return False
+
+        self._queue.append((event_type, message))
+        self._wakeup.set()
+        return True
+
+    def _make_room(self, incoming_type: Optional[str]) -> bool:
+        self.overflows += 1
+        for strategy in self.overflow_policy:
+            if strategy == DROP_TYPING:
+                if incoming_type == TYPING_EVENT:
+                    return False
+                self._drop_queued(TYPING_EVENT)
+            elif strategy == COALESCE_STATUS:
+                self._coalesce_status_updates()
+            elif strategy == DISCONNECT:
+                self._disconnect_slow_consumer()
+                return False
+            if len(self._queue) < self.maxsize:
+                return True
+        return False
+
+    def _drop_queued(self, event_type: str):
+        kept = deque(item for item in self._queue if item[0] != event_type)
+        self.dropped += len(self._queue) - len(kept)
+        self._queue = kept
+
+    def _coalesce_status_updates(self):
+        """Merges queued status updates sharing a room and status into the first of them."""
+        merged = {}
+        kept = []
+        for event_type, message in self._queue:
+            if event_type == STATUS_EVENT:
+                event = decode_frame(message, self.frame_format)
+                key = (event["data"]["room_id"], event["data"]["status"])
+                if key in merged:
+                    merged[key]["data"]["message_ids"].extend(event["data"]["message_ids"])
+                    merged[key]["_merged"] = True
+                    self.coalesced += 1
+                    continue
+                merged[key] = event
+                kept.append((event_type, message, key))
+            else:
+                kept.append((event_type, message, None))
+
+        queue = deque()
+        for event_type, message, key in kept:
+            if key is not None and merged[key].pop("_merged", False):
+                message = encode_frame(merged[key], self.frame_format)
+            queue.append((event_type, message))
+        self._queue = queue
+
+    def _disconnect_slow_consumer(self):
+        print(f"Closing slow WebSocket consumer ({len(self._queue)} messages queued).")
+        self.dropped += len(self._queue)
+        self._queue.clear()
+        self.closed = True
+        self._close_task = asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        try:
+            await self.websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Client too slow")
+        except Exception:
+            pass
+
+    async def _run(self):
+        try:
+            while not self.closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._queue and not self.closed:
+                    _, message = self._queue.popleft()
+                    if self.frame_format == MSGPACK_FRAMES:
+                        await self.websocket.send_bytes(message)
+                    else:
+                        await self.websocket.send_text(message)
+                    self.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # The socket is gone; the endpoint's receive loop will clean up.
+            print(f"WebSocket writer stopped: {e}")
+            self.closed = True
+            self._queue.clear()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "overflows": self.overflows,
+            "frame_format": self.frame_format,
+            "closed": self.closed,
+        }
@@ -0,0 +1,136 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from .serialization import dump_event, with_event_id
+from .websocket_manager import WebsocketManager
+
+# Sent instead of a replay when a room's missed events are no longer in its log
+RESYNC_REQUIRED_EVENT = "resync_required"
+
+
+def get_event_log_key(room_id: UUID) -> str:
+    """Returns the Redis stream holding a room's recent events."""
+    return f"events:{room_id}"
+
+
+def parse_event_id(event_id: str) -> Optional[Tuple[int, int]]:
+    """Parses a stream entry id ("<ms>-<seq>"), or returns None if it is malformed."""
+    ms, _, seq = event_id.partition("-")
+    if not ms.isdigit() or not (seq or "0").isdigit():
+        return None
+    return int(ms), int(seq or 0)
+
+
+def parse_resume_from(raw: Optional[str]) -> Dict[UUID, str]:
+    """
+    Parses the `resume_from` query parameter of /ws, a comma separated list
+    of `<room_id>:<event_id>` pairs. Malformed pairs are ignored.
+    """
+    resume_from = {}
+    for pair in (raw or "").split(","):
+        room_id, _, event_id = pair.strip().partition(":")
+        try:
+            room_uuid = UUID(room_id)
+        except ValueError:
+            continue
+        if parse_event_id(event_id) is not None:
+            resume_from[room_uuid] = event_id
+    return resume_from
+
+
+class RoomEventLog:
+    """
+    A bounded per-room log of the events members must not miss, so a client
+    that reconnects can be sent only what it missed.
+
+    `publish` appends the event to the room's `events:{room_id}` stream,
+    trimmed to about `max_len` entries (XADD MAXLEN ~) and expiring
+    `ttl_seconds` after the room's last event, and then publishes it to the
+    recipients with the stream id added as `event_id`. Clients remember the
+    newest `event_id` per room and pass it back as `resume_from` when they
+    reconnect.
+
+    `replay` returns the events logged after a client's `resume_from`. The
+    range starts `replay_overlap_ms` earlier: an event's id is assigned
+    before it is published, so with concurrent senders a client can see a
+    newer id before an older one. The overlap re-sends those events too, and
+    clients drop event ids they already have. A room whose log no longer
+    holds the resume point, or with more than `max_replay` events after it
+    (the overlap does not count), gets a single `resync_required` event
+    instead, and the client refetches it over REST.
+    """
+
+    def __init__(
+        self,
+        websocket_manager: WebsocketManager,
+        max_len: int = 1000,
+        ttl_seconds: int = 86400,
+        max_replay: int = 200,
+        replay_overlap_ms: int = 2000,
+    ):
+        self.websocket_manager = websocket_manager
+        self.max_len = max_len
+        self.ttl_seconds = ttl_seconds
+        self.max_replay = max_replay
+        self.replay_overlap_ms = replay_overlap_ms
+
+        self.appended = 0
+        self.replayed = 0
+        self.resyncs = 0
+
+    async def publish(self, room_id: UUID, event_type: str, data: Any, user_ids: Iterable[UUID]) -> str:
+        """Logs a room event and sends it to `user_ids`. Returns its event id."""
+        key = get_event_log_key(room_id)
+        # Serialized once; the id Redis assigns is spliced into the same bytes
+        event = dump_event(event_type, data)
+        async with self.websocket_manager.redis_client.pipeline(transaction=False) as pipe:
+            pipe.xadd(key, {"event": event}, maxlen=self.max_len, approximate=True)
+            pipe.expire(key, self.ttl_seconds)
+            event_id, _ = await pipe.execute()
+        self.appended += 1
+
+        await self.websocket_manager.send_to_users(user_ids, with_event_id(event, event_id))
+        return event_id
+
+    async def replay(self, resume_from: Dict[UUID, str]) -> List[bytes]:
+        """
+        Returns, per room and in log order, the events a client missed since
+        the given event ids, or a `resync_required` event for rooms that
+        cannot be replayed. All rooms are read in one round trip.
+        """
+        rooms = list(resume_from.items())
+        if not rooms:
+            return []
+
+        async with self.websocket_manager.redis_client.pipeline(transaction=True) as pipe:
+            for room_id, event_id in rooms:
+                key = get_event_log_key(room_id)
+                ms, seq = parse_event_id(event_id) or (0, 0)
+                pipe.xrange(key, "-", "+", count=1)
+                # The overlap up to the resume point, then what the client missed
+                pipe.xrange(key, f"{max(ms - self.replay_overlap_ms, 0)}-0", f"{ms}-{seq}")
+                pipe.xrange(key, f"({ms}-{seq}", "+", count=self.max_replay + 1)
+            results = await pipe.execute()
+
+        events = []
+        for i, (room_id, event_id) in enumerate(rooms):
+            oldest, overlap, missed = results[3 * i:3 * i + 3]
+            position = parse_event_id(event_id)
+
+            # The log must still hold the resume point, or entries after it may be gone
+            reaches_back = position is not None and bool(oldest) and parse_event_id(oldest[0][0]) <= position
+            if not reaches_back or len(missed) > self.max_replay:
+                self.resyncs += 1
+                events.append(dump_event(RESYNC_REQUIRED_EVENT, {"room_id": str(room_id)}))
+                continue
+
+            events.extend(with_event_id(fields["event"], entry_id) for entry_id, fields in overlap + missed)
+            self.replayed += len(overlap) + len(missed)
+        return events
+
+    def stats(self) -> dict:
+        return {
+            "appended": self.appended,
+            "replayed": self.replayed,
+            "resyncs": self.resyncs,
+        }
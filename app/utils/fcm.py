@@ -0,0 +1,123 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Optional
+
+import httpx
+from google.oauth2 import service_account
+import google.auth.transport.requests
+
+SCOPES = ['https://www.googleapis.com/auth/firebase.messaging']
+SERVICE_ACCOUNT_FILE = 'service_account_key.json'
+FCM_BASE_URL = 'https://fcm.googleapis.com'
+
+
+class FCMSender:
+    """
+    Process-wide Firebase Cloud Messaging sender.
+
+    Holds everything that is expensive to create per request: the service
+    account credentials, a cached OAuth access token and a pooled HTTP/2
+    client. The project id and credentials are loaded lazily on first use,
+    and the token is refreshed in a worker thread (never on the event loop)
+    shortly before it expires. This class is designed to be a singleton
+    instance within the FastAPI application.
+    """
+
+    def __init__(
+        self,
+        service_account_file: str = SERVICE_ACCOUNT_FILE,
+        base_url: str = FCM_BASE_URL,
+        http2: bool = True,
+        refresh_margin_seconds: int = 300,
+        credentials=None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.service_account_file = service_account_file
+        self.base_url = base_url.rstrip('/')
+        self.http2 = http2
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._credentials = credentials
+        self._transport = transport
+
+        self._project_id: Optional[str] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._refresh_lock = asyncio.Lock()
+        self._background_refresh: Optional[asyncio.Task] = None
+
+    @property
+    def project_id(self) -> str:
+        """The Firebase project id, read from the service account file on first access."""
+        if self._project_id is None:
+            with open(self.service_account_file, 'r') as f:
+                self._project_id = json.load(f).get('project_id')
+        return self._project_id
+
+    @property
+    def fcm_url(self) -> str:
+        return f"{self.base_url}/v1/projects/{self.project_id}/messages:send"
+
+    def _seconds_until_expiry(self) -> float:
+        credentials = self._credentials
+        if credentials is None or not credentials.token:
+            return 0.0
+        if credentials.expiry is None:
+            return float('inf')
+        return (credentials.expiry - datetime.utcnow()).total_seconds()
+
+    def _load_and_refresh(self):
+        """Blocking credential load + token refresh. Always runs in a worker thread."""
+        if self._credentials is None:
+            self._credentials = service_account.Credentials.from_service_account_file(
+                self.service_account_file, scopes=SCOPES
+            )
+        self._credentials.refresh(google.auth.transport.requests.Request())
+
+    async def _refresh_token(self):
+        async with self._refresh_lock:
+            # Another coroutine may have refreshed while we waited for the lock.
+            if self._seconds_until_expiry() > self.refresh_margin_seconds:
+                return
+            await asyncio.to_thread(self._load_and_refresh)
+
+    async def get_access_token(self) -> str:
+        """
+        Returns a valid access token from the cache.
+
+        Expired (or missing) tokens are refreshed before returning. Tokens
+        that are still valid but inside the refresh margin are returned
+        immediately while a single background refresh replaces them.
+        """
+        remaining = self._seconds_until_expiry()
+        if remaining <= 0:
+            await self._refresh_token()
+        elif remaining <= self.refresh_margin_seconds:
+            if self._background_refresh is None or self._background_refresh.done():
+                self._background_refresh = asyncio.create_task(self._refresh_token())
+        return self._credentials.token
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                transport=self._transport,
+                timeout=httpx.Timeout(10.0),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def send(self, payload: dict) -> httpx.Response:
+        """Sends a single FCM v1 message payload over the shared client."""
+        headers = {
+            'Authorization': f'Bearer {await self.get_access_token()}',
+            'Content-Type': 'application/json; UTF-8',
+        }
+        return await self._get_client().post(self.fcm_url, headers=headers, json=payload)
+
+    async def close(self):
+        """Closes the pooled HTTP client and cancels any pending token refresh."""
+        if self._background_refresh and not self._background_refresh.done():
+            self._background_refresh.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
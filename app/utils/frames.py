@@ -0,0 +1,64 @@
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from .serialization import to_jsonable, dumps, loads
+
+try:
+    import msgpack
+except ImportError:  # the binary protocol is only offered when msgpack is installed
+    msgpack = None
+
+# WebSocket frame formats. JSON text frames are the default; clients that ask
+# for MSGPACK_SUBPROTOCOL in Sec-WebSocket-Protocol get the same events as
+# MessagePack binary frames instead.
+JSON_FRAMES = "json"
+MSGPACK_FRAMES = "msgpack"
+MSGPACK_SUBPROTOCOL = "rtc.msgpack.v1"
+
+Frame = Union[str, bytes]
+
+
+def negotiate_frame_format(requested_subprotocols: Iterable[str]) -> Tuple[str, Optional[str]]:
+    """
+    Picks the frame format for a new socket from the subprotocols the client
+    offered. Returns the format and the subprotocol to accept (None for JSON).
+    """
+    if msgpack is not None and MSGPACK_SUBPROTOCOL in requested_subprotocols:
+        return MSGPACK_FRAMES, MSGPACK_SUBPROTOCOL
+    return JSON_FRAMES, None
+
+
+def encode_frame(event: Any, frame_format: str) -> Frame:
+    """Encodes an event as a JSON text frame or a MessagePack binary frame."""
+    if frame_format == MSGPACK_FRAMES:
+        return msgpack.packb(event, default=to_jsonable)
+    return dumps(event).decode()
+
+
+def decode_frame(frame: Frame, frame_format: str) -> Any:
+    """Decodes an inbound frame. Raises ValueError if it is malformed."""
+    if frame_format == MSGPACK_FRAMES:
+        return msgpack.unpackb(frame)
+    return loads(frame)
+
+
+class FrameCache:
+    """
+    The encoded frames of one event, at most one per format.
+
+    Events reach a worker as JSON through pub/sub. When they are fanned out
+    to local sockets, each format is encoded on first use and then shared by
+    every socket that speaks it, so a room broadcast costs one MessagePack
+    encoding regardless of how many binary clients are in the room.
+    """
+
+    def __init__(self, json_frame: str):
+        self._frames: Dict[str, Frame] = {JSON_FRAMES: json_frame}
+        self._event: Any = None
+
+    def get(self, frame_format: str) -> Frame:
+        frame = self._frames.get(frame_format)
+        if frame is None:
+            if self._event is None:
+                self._event = loads(self._frames[JSON_FRAMES])
+            frame = self._frames[frame_format] = encode_frame(self._event, frame_format)
+        return frame
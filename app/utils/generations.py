@@ -0,0 +1,37 @@
+from collections import OrderedDict
+from typing import Hashable
+
+
+class Generations:
+    """
+    Per-key invalidation generations for the in-process caches, holding at
+    most `maxsize` keys.
+
+    A cache reads a key's generation before loading a value and stores the
+    value only if the generation is unchanged, so a load that raced an
+    invalidation is dropped. Generations come from one counter, so a bump
+    always yields a value never handed out before. When the least recently
+    bumped key is forgotten, the floor returned for unknown keys rises to
+    its generation: no key's generation ever goes back, and at worst a load
+    of an unrelated key in flight is not stored.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._generations: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._counter = 0
+        self._floor = 0
+
+    def get(self, key: Hashable) -> int:
+        return self._generations.get(key, self._floor)
+
+    def bump(self, key: Hashable):
+        self._counter += 1
+        self._generations[key] = self._counter
+        self._generations.move_to_end(key)
+        while len(self._generations) > self.maxsize:
+            _, generation = self._generations.popitem(last=False)
+            self._floor = max(self._floor, generation)
+
+    def __len__(self) -> int:
+        return len(self._generations)
@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import FrozenSet, Optional, Tuple
+from uuid import UUID
+
+from app.schemas.room import RoomType
+from .generations import Generations
+
+
+@dataclass(frozen=True)
+class RoomSnapshot:
+    """What the send path needs to know about a room: its type, name and members."""
+    room_id: UUID
+    name: Optional[str]
+    room_type: RoomType
+    member_ids: FrozenSet[UUID]
+
+
+class RoomMembershipCache:
+    """
+    In-process TTL + LRU cache of room snapshots, shared by ChatService and
+    RoomService so that sending a message does not hit Postgres just to learn
+    who is in the room.
+
+    Entries expire after `ttl_seconds` and the least recently used entry is
+    evicted beyond `maxsize`. Every invalidation bumps a per-room generation;
+    a load that started before an invalidation is not stored, so a slow query
+    can never re-insert a snapshot that is already known to be stale. Like
+    the entries, generations are kept for at most `maxsize` rooms.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl_seconds: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[UUID, Tuple[float, RoomSnapshot]]" = OrderedDict()
+        self._generations = Generations(maxsize)
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def generation(self, room_id: UUID) -> int:
+        """Returns the current generation of a room; pass it back to `set` after loading."""
+        return self._generations.get(room_id)
+
+    def get(self, room_id: UUID) -> Optional[RoomSnapshot]:
+        entry = self._entries.get(room_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[room_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(room_id)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, snapshot: RoomSnapshot, generation: int):
+        """Stores a snapshot unless the room was invalidated since `generation` was read."""
+        if self.generation(snapshot.room_id) != generation:
+            return
+        self._entries[snapshot.room_id] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(snapshot.room_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, room_id: UUID):
+        self._entries.pop(room_id, None)
+        self._generations.bump(room_id)
+        self.invalidations += 1
+
+    def clear(self):
+        for room_id in list(self._entries):
+            self.invalidate(room_id)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,235 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+# Prometheus text exposition format served by /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, labelnames: Iterable[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """Returns (sample name, formatted labels, value) triples."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label combination."""
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        if not self.registry.enabled:
+            return
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. Either set explicitly, or computed at
+    scrape time by `callback`, which costs nothing between scrapes.
+    """
+    type_name = "gauge"
+
+    def __init__(self, *args, callback: Optional[Callable[[], Union[float, Dict[LabelValues, float]]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.callback = callback
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str):
+        if not self.registry.enabled:
+            return
+        self._values[labels] = value
+
+    def set_function(self, callback: Callable[[], Union[float, Dict[LabelValues, float]]]):
+        self.callback = callback
+
+    def samples(self):
+        values = self._values
+        if self.callback is not None:
+            values = self.callback()
+            if not isinstance(values, dict):
+                values = {(): values}
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in values.items()]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative `le` buckets, with their sum and count."""
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Per label combination: one count per bucket plus +Inf, then the sum
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        if not self.registry.enabled:
+            return
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        samples = []
+        labelnames = self.labelnames + ("le",)
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", _format_labels(labelnames, labels + (_format_value(bound),)), cumulative))
+            formatted = _format_labels(self.labelnames, labels)
+            samples.append((f"{self.name}_sum", formatted, series[-1]))
+            samples.append((f"{self.name}_count", formatted, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    In-process metrics, exported in the Prometheus text format.
+
+    Metrics are declared once at import time. While `enabled` is False every
+    update returns after a single attribute check, and nothing is stored.
+    Updates are not locked: they all happen on the event loop thread.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(self, name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = (), callback=None) -> Gauge:
+        return self._register(Gauge(self, name, help, labelnames, callback=callback))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, help, labelnames, buckets=buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+websocket_connections = metrics.gauge(
+    "websocket_connections", "WebSockets open on this instance."
+)
+websocket_frames_received = metrics.counter(
+    "websocket_frames_received_total", "Inbound WebSocket frames by message type.", ("type",)
+)
+fanout_recipients = metrics.histogram(
+    "fanout_recipients",
+    "Recipients per fan-out: users addressed by send_to_users, local sockets per room or worker event.",
+    ("kind",),
+    buckets=SIZE_BUCKETS,
+)
+redis_publish_duration = metrics.histogram(
+    "redis_publish_duration_seconds", "Latency of Redis publishes (one pipeline counts once).", ("kind",)
+)
+db_pool_checkout_wait = metrics.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent obtaining a connection from the database pool."
+)
+fcm_sends = metrics.counter(
+    "fcm_sends_total", "FCM send attempts by outcome.", ("outcome",)
+)
+push_queue_jobs = metrics.gauge(
+    "push_queue_jobs", "Push notification jobs queued, being sent or waiting to be retried.", ("state",)
+)
+membership_cache_hit_ratio = metrics.gauge(
+    "membership_cache_hit_ratio", "Share of room membership lookups served from the cache."
+)
+websocket_outbound_backlog = metrics.gauge(
+    "websocket_outbound_backlog",
+    "Frames waiting in outbound socket queues: summed over all sockets, and the deepest queue.",
+    ("stat",),
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording `http_request_duration_seconds`. Unlike
+    BaseHTTPMiddleware it neither wraps the request nor buffers the response,
+    so streaming works, and while metrics are disabled it only forwards the
+    call. Requests are labelled by route template (e.g. /rooms/{room_id}),
+    or "unmatched", to keep the label set bounded.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            )
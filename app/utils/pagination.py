@@ -0,0 +1,26 @@
+import base64
+from datetime import datetime
+from uuid import UUID
+
+from app.core.exceptions import InvalidInputException
+
+
+def encode_cursor(created_at: datetime, message_id: UUID) -> str:
+    """Encodes a (created_at, id) keyset position as an opaque, URL-safe cursor."""
+    raw = f"{created_at.isoformat()}|{message_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Raises:
+        InvalidInputException: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, message_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(message_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidInputException(detail="Invalid pagination cursor")
@@ -0,0 +1,163 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, TypeVar
+
+import redis.asyncio as redis
+
+# Control event published whenever a user comes online or goes offline
+PRESENCE_CHANGED_EVENT = "presence_changed"
+
+T = TypeVar("T")
+
+
+def get_presence_key(user_id: str) -> str:
+    """Returns the Redis key holding a user's presence."""
+    return f"presence:{user_id}"
+
+
+def get_worker_presence_key(worker_id: str) -> str:
+    """Returns the Redis key that exists while a worker is alive."""
+    return f"presence_worker:{worker_id}"
+
+
+class PresenceTracker:
+    """
+    Tracks which users are online, and on which workers, with one small
+    Redis hash per user.
+
+    `presence:{user_id}` maps each worker that holds a connection for the
+    user to its number of open sockets, and carries a TTL. Workers refresh
+    their users with a heartbeat. A crashed worker stops refreshing, so its
+    users expire after `ttl_seconds` instead of staying online forever.
+
+    The hash TTL is shared by all workers, so a crashed worker's field lives
+    on while another worker keeps refreshing the same user. Each worker
+    therefore also refreshes `presence_worker:{worker_id}` with the same TTL,
+    and lookups ignore the fields of workers whose key has expired.
+
+    Every write touches only this worker's own field, so connect and
+    disconnect need no cross-worker locking. A user is online while the key
+    holds a field of a live worker. Transitions detected on connect or
+    disconnect are reported through `on_change`. Expiry after a crash is not
+    reported.
+
+    The same hashes are the user -> worker registry used to route events:
+    `locate` tells a publisher which worker channels to publish to.
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        ttl_seconds: int = 60,
+        on_change: Optional[Callable[[str, bool], Awaitable[None]]] = None,
+    ):
+        self.worker_id = worker_id
+        self.ttl_seconds = ttl_seconds
+        self.on_change = on_change
+        self.redis_client: redis.Redis = None
+
+    @property
+    def heartbeat_interval(self) -> float:
+        return self.ttl_seconds / 3
+
+    async def set_connections(self, user_id: str, count: int):
+        """Records how many sockets this worker holds for a user (0 removes them)."""
+        key = get_presence_key(user_id)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            if count > 0:
+                pipe.hgetall(key)
+                pipe.hset(key, self.worker_id, count)
+                pipe.expire(key, self.ttl_seconds)
+                pipe.set(get_worker_presence_key(self.worker_id), 1, ex=self.ttl_seconds)
+                before, _, _, _ = await pipe.execute()
+                changed, online = not await self._live_workers(before or {}), True
+            else:
+                pipe.hdel(key, self.worker_id)
+                pipe.hgetall(key)
+                removed, after = await pipe.execute()
+                changed, online = bool(removed) and not await self._live_workers(after or {}), False
+
+        if changed and self.on_change is not None:
+            await self.on_change(user_id, online)
+
+    async def are_online(self, user_ids: Iterable[T]) -> Set[T]:
+        """
+        Returns the subset of `user_ids` that are online on a live worker, with
+        the same round trips as `locate`.
+        """
+        workers = await self.locate(user_ids)
+        return set().union(*workers.values())
+
+    async def locate(self, user_ids: Iterable[T]) -> Dict[str, List[T]]:
+        """
+        Returns which live workers hold sockets for `user_ids`, as worker id
+        -> users. Offline users are left out.
+
+        One Redis round trip reads the users' hashes. If they name other
+        workers, a second one checks which of those are still alive; this
+        worker is alive by definition.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.hgetall(get_presence_key(str(user_id)))
+            results = await pipe.execute()
+
+        workers: Dict[str, List[T]] = {}
+        for user_id, connections in zip(user_ids, results):
+            for worker_id in connections or {}:
+                workers.setdefault(worker_id, []).append(user_id)
+
+        live = await self._live_workers(workers)
+        return {worker_id: users for worker_id, users in workers.items() if worker_id in live}
+
+    async def _live_workers(self, worker_ids: Iterable[str]) -> Set[str]:
+        """
+        Returns the workers of `worker_ids` whose liveness key has not
+        expired. This worker is alive by definition, so checking only it
+        costs no round trip.
+        """
+        worker_ids = set(worker_ids)
+        remote = [worker_id for worker_id in worker_ids if worker_id != self.worker_id]
+        live = worker_ids - set(remote)
+        if remote:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for worker_id in remote:
+                    pipe.exists(get_worker_presence_key(worker_id))
+                alive = await pipe.execute()
+            live.update(worker_id for worker_id, exists in zip(remote, alive) if exists)
+        return live
+
+    async def heartbeat(self, local_connections: Dict[str, int], batch_size: int = 1000):
+        """Re-asserts this worker's liveness and connections and extends their TTL."""
+        items = list(local_connections.items())
+        for start in range(0, max(len(items), 1), batch_size):
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                if start == 0:
+                    pipe.set(get_worker_presence_key(self.worker_id), 1, ex=self.ttl_seconds)
+                for user_id, count in items[start:start + batch_size]:
+                    key = get_presence_key(user_id)
+                    pipe.hset(key, self.worker_id, count)
+                    pipe.expire(key, self.ttl_seconds)
+                await pipe.execute()
+
+    async def run_heartbeats(self, get_local_connections: Callable[[], Dict[str, int]]):
+        """Runs `heartbeat` every third of the TTL until cancelled."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat(get_local_connections())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Presence heartbeat failed: {e}")
+
+    async def clear(self, user_ids: Iterable[str]):
+        """Removes this worker's presence for the given users (used on shutdown)."""
+        user_ids = list(user_ids)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.delete(get_worker_presence_key(self.worker_id))
+            for user_id in user_ids:
+                pipe.hdel(get_presence_key(user_id), self.worker_id)
+            await pipe.execute()
@@ -0,0 +1,106 @@
+import hmac
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+from uuid import UUID
+
+from .generations import Generations
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated caller, as carried by their access token.
+    Enough for routes that only need to know who is calling; routes that
+    need the full ORM `User` depend on `get_current_user` instead.
+    """
+    id: UUID
+    username: str
+    display_name: str
+    expires_at: float
+
+
+def get_token_signature(token: str) -> str:
+    """Returns the signature segment of a JWT (header.payload.signature)."""
+    return token.rsplit(".", 1)[-1]
+
+
+class PrincipalCache:
+    """
+    LRU cache of authenticated principals keyed by token signature.
+
+    An entry lives until its token's `exp`, so repeat requests with the same
+    token skip both JWT verification and the user lookup. Entries are also
+    indexed by user id so that deactivating a user drops all of their tokens
+    at once; the next request then goes back to the database and is refused.
+    As in RoomMembershipCache, a per-user generation (kept for at most
+    `maxsize` users) keeps a lookup that raced an invalidation from caching
+    the principal again.
+    """
+
+    def __init__(self, maxsize: int = 50000):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[str, Principal]]" = OrderedDict()
+        self._by_user: Dict[UUID, Set[str]] = {}
+        self._generations = Generations(maxsize)
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def generation(self, user_id: UUID) -> int:
+        """Returns the current generation of a user; pass it back to `set` after loading."""
+        return self._generations.get(user_id)
+
+    def get(self, token: str) -> Optional[Principal]:
+        signature = get_token_signature(token)
+        entry = self._entries.get(signature)
+        # The full token is compared so a tampered payload can never reuse a cached signature
+        if entry is None or not hmac.compare_digest(entry[0], token):
+            self.misses += 1
+            return None
+        principal = entry[1]
+        if principal.expires_at <= time.time():
+            self._remove(signature)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(signature)
+        self.hits += 1
+        return principal
+
+    def set(self, token: str, principal: Principal, generation: int):
+        """Stores a principal unless the user was invalidated since `generation` was read."""
+        if self.generation(principal.id) != generation:
+            return
+        signature = get_token_signature(token)
+        self._entries[signature] = (token, principal)
+        self._entries.move_to_end(signature)
+        self._by_user.setdefault(principal.id, set()).add(signature)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: UUID):
+        """Drops every cached token of a user."""
+        for signature in self._by_user.pop(user_id, set()):
+            self._entries.pop(signature, None)
+        self._generations.bump(user_id)
+        self.invalidations += 1
+
+    def _remove(self, signature: str):
+        _, principal = self._entries.pop(signature)
+        signatures = self._by_user.get(principal.id)
+        if signatures is not None:
+            signatures.discard(signature)
+            if not signatures:
+                del self._by_user[principal.id]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
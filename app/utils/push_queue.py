@@ -0,0 +1,188 @@
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+from uuid import UUID
+
+
+@dataclass
+class PushJob:
+    """A pending push notification for a single user."""
+    user_id: UUID
+    title: str
+    body: str
+    data: dict = field(default_factory=dict)
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+class PushNotificationQueue:
+    """
+    Bounded background queue for push notification delivery.
+
+    Request handlers call `enqueue` and return immediately; a fixed number of
+    worker tasks (the concurrency limit) deliver jobs through the `deliver`
+    callback. Jobs are deduplicated per user: while a user already has a
+    pending job, newer notifications replace its content instead of queueing
+    another push. Failed deliveries are retried with exponential backoff,
+    unless the error has a false `retryable` attribute (a permanent
+    rejection), in which case the job is dropped.
+    This class is designed to be a singleton instance within the FastAPI
+    application.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[PushJob], Awaitable[None]],
+        maxsize: int = 10000,
+        concurrency: int = 16,
+        max_retries: int = 3,
+        backoff_base_seconds: float = 0.5,
+        backoff_max_seconds: float = 30.0,
+    ):
+        self.deliver = deliver
+        self.maxsize = maxsize
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[UUID, PushJob] = {}
+        self._workers: List[asyncio.Task] = []
+        self._retry_tasks: set[asyncio.Task] = set()
+        self._in_flight = 0
+
+        self._counters = {
+            "enqueued": 0,
+            "deduplicated": 0,
+            "dropped": 0,
+            "sent": 0,
+            "retried": 0,
+            "failed": 0,
+            "rejected": 0,
+        }
+        self._latencies: Deque[float] = deque(maxlen=1000)
+
+    async def start(self):
+        """Creates the queue and starts the worker tasks."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Waits up to `drain_timeout` for queued jobs, then cancels the workers."""
+        if self._queue is not None and drain_timeout > 0:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        for task in [*self._workers, *self._retry_tasks]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._retry_tasks, return_exceptions=True)
+        self._workers = []
+        self._retry_tasks.clear()
+
+    def enqueue(self, user_id: UUID, title: str, body: str, data: dict = None) -> bool:
+        """
+        Schedules a push for a user without waiting for delivery.
+        Returns False if the queue is full (or not started) and the job was dropped.
+        """
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            # Collapse into the job that is already waiting: only the latest
+            # notification content is delivered, and its latency clock keeps
+            # running from the first enqueue.
+            pending.title, pending.body, pending.data = title, body, data or {}
+            self._counters["deduplicated"] += 1
+            return True
+
+        job = PushJob(user_id=user_id, title=title, body=body, data=data or {})
+        if not self._put(job):
+            self._counters["dropped"] += 1
+            return False
+        self._counters["enqueued"] += 1
+        return True
+
+    def _put(self, job: PushJob) -> bool:
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait(job.user_id)
+        except asyncio.QueueFull:
+            return False
+        self._pending[job.user_id] = job
+        return True
+
+    async def _worker(self):
+        while True:
+            user_id = await self._queue.get()
+            job = self._pending.pop(user_id, None)
+            try:
+                if job is not None:
+                    await self._process(job)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: PushJob):
+        self._in_flight += 1
+        try:
+            job.attempts += 1
+            await self.deliver(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._handle_failure(job, e)
+        else:
+            self._counters["sent"] += 1
+            self._latencies.append(time.monotonic() - job.enqueued_at)
+        finally:
+            self._in_flight -= 1
+
+    def _handle_failure(self, job: PushJob, error: Exception):
+        if not getattr(error, "retryable", True):
+            self._counters["rejected"] += 1
+            print(f"Push notification to user {job.user_id} was rejected: {error}")
+            return
+        if job.attempts > self.max_retries:
+            self._counters["failed"] += 1
+            print(f"Push notification to user {job.user_id} failed after {job.attempts} attempts: {error}")
+            return
+        delay = min(self.backoff_base_seconds * 2 ** (job.attempts - 1), self.backoff_max_seconds)
+        delay += random.uniform(0, self.backoff_base_seconds)
+        self._counters["retried"] += 1
+        task = asyncio.create_task(self._retry_later(job, delay))
+        self._retry_tasks.add(task)
+        task.add_done_callback(self._retry_tasks.discard)
+
+    async def _retry_later(self, job: PushJob, delay: float):
+        await asyncio.sleep(delay)
+        if job.user_id in self._pending:
+            # A newer notification for this user is already queued and supersedes the retry.
+            return
+        if not self._put(job):
+            self._counters["dropped"] += 1
+
+    def stats(self) -> dict:
+        """Returns queue depth, counters and delivery latency (enqueue -> sent) in milliseconds."""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        return {
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "scheduled_retries": len(self._retry_tasks),
+            **self._counters,
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": latencies[-1] * 1000 if latencies else 0.0,
+            },
+        }
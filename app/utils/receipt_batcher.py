@@ -0,0 +1,112 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+from uuid import UUID
+
+# (room_id or None, status) -> user_id -> message ids
+ReceiptBuffer = Dict[Tuple[Optional[UUID], Any], Dict[UUID, Set[UUID]]]
+
+
+class ReceiptBatcher:
+    """
+    Buffers delivered/seen acknowledgements and applies them in batches.
+
+    `messages_delivered` and `messages_seen` frames only add ids to a buffer
+    keyed by room and status. After a `window_seconds` window, each buffer is
+    handed to the `apply` callback, which authorizes and updates every
+    acknowledged message with one statement and broadcasts one status update
+    per room. A client scrolling a busy room therefore costs one UPDATE per
+    window instead of one SELECT, UPDATE and fan-out per frame. A buffer
+    reaching `max_batch_size` ids is flushed without waiting for the window.
+
+    Frames that do not name their room are buffered under `None` and still
+    batched; the callback groups the results by room.
+    """
+
+    def __init__(
+        self,
+        apply: Callable[[Optional[UUID], Any, Dict[UUID, Set[UUID]]], Awaitable[Any]],
+        window_seconds: float = 0.2,
+        max_batch_size: int = 500,
+    ):
+        self.apply = apply
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+
+        self._buffers: ReceiptBuffer = {}
+        self._pending = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.receipts = 0
+        self.batches = 0
+        self.failed = 0
+
+    def add(self, user_id: UUID, status: Any, message_ids: Iterable[UUID], room_id: Optional[UUID] = None):
+        """Buffers one acknowledgement frame. Never touches the database."""
+        users = self._buffers.setdefault((room_id, status), {})
+        ids = users.setdefault(user_id, set())
+        before = len(ids)
+        ids.update(message_ids)
+        self._pending += len(ids) - before
+        self.receipts += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+            if self._pending >= self.max_batch_size:
+                self._full.set()
+
+    async def flush(self):
+        """Applies everything buffered so far, one callback per (room, status)."""
+        buffers, self._buffers, self._pending = self._buffers, {}, 0
+        for (room_id, status), receipts in buffers.items():
+            try:
+                await self.apply(room_id, status, receipts)
+                self.batches += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                print(f"Failed to apply {status} receipts for room {room_id}: {e}")
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            try:
+                # The batching window: acknowledgements arriving meanwhile share
+                # the flush, unless they fill the buffer before it ends
+                await asyncio.wait_for(self._full.wait(), self.window_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self._full.clear()
+            await self.flush()
+
+    async def start(self):
+        """Starts the background flush task."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            if self._buffers:
+                self._wakeup.set()
+            if self._pending >= self.max_batch_size:
+                self._full.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancels the flush task and applies whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._pending,
+            "receipts": self.receipts,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
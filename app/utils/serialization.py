@@ -0,0 +1,129 @@
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Optional, Union
+from uuid import UUID
+
+import pydantic_core
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+def to_jsonable(obj: Any) -> Any:
+    """`default` hook for types the encoders (including MessagePack) do not handle natively."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JSONSerializer:
+    """Standard library json. Always available; the slowest option."""
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, default=to_jsonable, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+class PydanticSerializer:
+    """pydantic-core's Rust encoder (what `model_dump_json` uses). Handles models, UUIDs and datetimes natively."""
+    name = "pydantic"
+
+    def dumps(self, obj: Any) -> bytes:
+        return pydantic_core.to_json(obj)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return pydantic_core.from_json(data)
+
+
+def _to_orjson(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        if hasattr(orjson, "Fragment"):
+            # orjson >= 3.9: embed pydantic-core's encoding verbatim, which is
+            # much cheaper than model_dump() followed by a second encoding pass.
+            return orjson.Fragment(obj.__pydantic_serializer__.to_json(obj))
+        return obj.model_dump()
+    return to_jsonable(obj)
+
+
+class OrjsonSerializer:
+    """orjson, when installed. UUIDs, datetimes and enums are native; models are embedded pre-encoded."""
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_to_orjson)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)
+
+
+SERIALIZERS = {
+    JSONSerializer.name: JSONSerializer,
+    PydanticSerializer.name: PydanticSerializer,
+    OrjsonSerializer.name: OrjsonSerializer,
+}
+
+
+def get_serializer(name: str = "auto"):
+    """
+    Returns a serializer by name. "auto" picks orjson when it is installed
+    and falls back to pydantic-core otherwise.
+    """
+    if name == "auto":
+        name = OrjsonSerializer.name if orjson is not None else PydanticSerializer.name
+    if name == OrjsonSerializer.name and orjson is None:
+        raise ValueError("The orjson serializer was requested but orjson is not installed")
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer: {name}")
+    return SERIALIZERS[name]()
+
+
+_serializer = get_serializer()
+
+
+def configure_serializer(name: str):
+    """Selects the serializer used by `dumps`, `loads` and `dump_event` for the whole process."""
+    global _serializer
+    _serializer = get_serializer(name)
+
+
+def dumps(obj: Any) -> bytes:
+    return _serializer.dumps(obj)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    return _serializer.loads(data)
+
+
+def dump_event(event_type: str, data: Any) -> bytes:
+    """
+    Serializes a WebSocket event once, to bytes that are published as-is to
+    every recipient. `data` may be a pydantic model, a dict, or anything the
+    configured serializer understands.
+    """
+    return _serializer.dumps({"type": event_type, "data": data})
+
+
+def with_event_id(event: Union[str, bytes], event_id: Union[str, bytes]) -> bytes:
+    """
+    Adds the `event_id` of a room event log entry to an event serialized by
+    `dump_event`, without serializing it again: the id is spliced in before
+    the closing brace. Stream ids ("<ms>-<seq>") never need escaping.
+    """
+    if isinstance(event, str):
+        event = event.encode()
+    if isinstance(event_id, str):
+        event_id = event_id.encode()
+    return b'%s,"event_id":"%s"}' % (event.rstrip()[:-1], event_id)
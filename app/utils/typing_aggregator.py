@@ -0,0 +1,205 @@
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from .serialization import dump_event
+from .websocket_manager import WebsocketManager
+
+TYPING_INDICATOR_EVENT = "typing_indicator"
+
+
+def get_typing_key(room_id: UUID) -> str:
+    """Returns the Redis hash holding who is typing in a room."""
+    return f"typing:{room_id}"
+
+
+class TypingAggregator:
+    """
+    Merges typing frames into one `typing_indicator` event per room.
+
+    Typing frames only update local state. Rooms whose typers changed are
+    flushed after a `window_seconds` merge window, all in a single Redis
+    pipeline: this worker's typers are written to the room's
+    `typing:{room_id}` hash and the whole hash is read back, so each event
+    lists everyone typing in the room, whichever worker they are connected
+    to. One event is then broadcast per changed room, however many
+    keystrokes arrived in the window.
+
+    A typer expires `ttl_seconds` after their last `typing` frame, so clients
+    never need to send `is_typing: false`. Repeated frames from the same user
+    in the same room are accepted at most once per `min_interval_seconds`;
+    they only extend the expiry and never cause a broadcast on their own.
+    Entries left behind by a crashed worker are ignored once past their
+    expiry, and the hash itself expires with the same TTL.
+    """
+
+    def __init__(
+        self,
+        websocket_manager: WebsocketManager,
+        window_seconds: float = 0.25,
+        ttl_seconds: float = 5.0,
+        min_interval_seconds: float = 1.0,
+    ):
+        self.websocket_manager = websocket_manager
+        self.window_seconds = window_seconds
+        self.ttl_seconds = ttl_seconds
+        self.min_interval_seconds = min_interval_seconds
+
+        # room_id -> user_id -> (username, time of their last accepted frame)
+        self._typers: Dict[UUID, Dict[UUID, Tuple[str, float]]] = {}
+        # Users to remove from each room's hash at the next flush
+        self._removed: Dict[UUID, Set[UUID]] = {}
+        # Rooms with pending writes, and the subset whose typers changed
+        self._dirty: Set[UUID] = set()
+        self._changed: Set[UUID] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.frames = 0
+        self.suppressed = 0
+        self.events = 0
+
+    def update(self, room_id: UUID, user_id: UUID, username: str, is_typing: bool = True):
+        """Records one typing frame. Never touches Redis."""
+        self.frames += 1
+        typers = self._typers.get(room_id, {})
+        current = typers.get(user_id)
+
+        if not is_typing:
+            if current is None:
+                self.suppressed += 1
+            else:
+                self.clear_user(room_id, user_id)
+            return
+
+        now = time.time()
+        if current is not None and now - current[1] < self.min_interval_seconds:
+            self.suppressed += 1
+            return
+        self._typers.setdefault(room_id, {})[user_id] = (username, now)
+        self._removed.get(room_id, set()).discard(user_id)
+        self._mark(room_id, changed=current is None)
+
+    def clear_user(self, room_id: UUID, user_id: UUID):
+        """Stops a user typing in a room, e.g. when they send a message or leave."""
+        typers = self._typers.get(room_id)
+        if typers is None or typers.pop(user_id, None) is None:
+            return
+        if not typers:
+            del self._typers[room_id]
+        self._removed.setdefault(room_id, set()).add(user_id)
+        self._mark(room_id, changed=True)
+
+    def _mark(self, room_id: UUID, changed: bool):
+        self._dirty.add(room_id)
+        if changed:
+            self._changed.add(room_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _expire(self, now: float):
+        expired = [
+            (room_id, user_id)
+            for room_id, typers in self._typers.items()
+            for user_id, (_, seen) in typers.items()
+            if now - seen >= self.ttl_seconds
+        ]
+        for room_id, user_id in expired:
+            self.clear_user(room_id, user_id)
+
+    def _next_expiry(self, now: float) -> Optional[float]:
+        """Seconds until the oldest local typer expires, or None if nobody is typing."""
+        oldest = min((seen for typers in self._typers.values() for _, seen in typers.values()), default=None)
+        return None if oldest is None else max(0.0, oldest + self.ttl_seconds - now)
+
+    async def flush(self):
+        """Writes pending changes and broadcasts one event per room whose typers changed."""
+        self._expire(time.time())
+        rooms, changed, removed = list(self._dirty), self._changed, self._removed
+        self._dirty, self._changed, self._removed = set(), set(), {}
+        if not rooms:
+            return
+
+        ttl = int(self.ttl_seconds) + 1
+        reads: List[int] = []
+        commands = 0
+        async with self.websocket_manager.redis_client.pipeline(transaction=False) as pipe:
+            for room_id in rooms:
+                key = get_typing_key(room_id)
+                typers = self._typers.get(room_id)
+                if typers:
+                    pipe.hset(key, mapping={
+                        str(user_id): json.dumps({"username": username, "expires_at": seen + self.ttl_seconds})
+                        for user_id, (username, seen) in typers.items()
+                    })
+                    pipe.expire(key, ttl)
+                    commands += 2
+                if removed.get(room_id):
+                    pipe.hdel(key, *(str(user_id) for user_id in removed[room_id]))
+                    commands += 1
+                pipe.hgetall(key)
+                reads.append(commands)
+                commands += 1
+            results = await pipe.execute()
+
+        now = time.time()
+        for room_id, read in zip(rooms, reads):
+            entries = results[read]
+            if room_id in changed:
+                await self._broadcast(room_id, entries, now)
+
+    async def _broadcast(self, room_id: UUID, entries: dict, now: float):
+        typers = []
+        for user_id, raw in entries.items():
+            entry = json.loads(raw)
+            if entry["expires_at"] > now:
+                typers.append({"user_id": user_id, "username": entry["username"]})
+        typers.sort(key=lambda typer: typer["username"])
+        payload = dump_event(TYPING_INDICATOR_EVENT, {"room_id": str(room_id), "typers": typers})
+        await self.websocket_manager.broadcast_to_room(room_id, payload)
+        self.events += 1
+
+    async def _run(self):
+        while True:
+            timeout = self._next_expiry(time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            # The merge window: frames arriving meanwhile share the next flush
+            await asyncio.sleep(self.window_seconds)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Typing indicator flush failed: {e}")
+
+    async def start(self):
+        """Starts the background flush task."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            if self._dirty:
+                self._wakeup.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancels the flush task. Remaining typers expire from Redis by TTL."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "typing_rooms": len(self._typers),
+            "frames": self.frames,
+            "suppressed": self.suppressed,
+            "events": self.events,
+        }
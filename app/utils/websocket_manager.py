@@ -1,44 +1,94 @@
 import asyncio
-from typing import Dict, Set
+import time
+import uuid
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
 from uuid import UUID
 from fastapi import WebSocket
 import redis.asyncio as redis
 
-# This channel is used to keep the pubsub connection alive and listening.
-DUMMY_CHANNEL = "server-control-channel"
+from .connection_writer import OVERFLOW_STRATEGIES, ConnectionWriter, get_event_type
+from .presence import PRESENCE_CHANGED_EVENT, PresenceTracker
+from .serialization import dump_event, loads
+from .frames import JSON_FRAMES, FrameCache
+from .metrics import fanout_recipients, metrics, redis_publish_duration
+
+# This channel keeps the pubsub connection alive and listening, and carries
+# control events (e.g. cache invalidations) between server instances.
+CONTROL_CHANNEL = "server-control-channel"
 
 
 def get_room_channel(room_id: str) -> str:
     """Returns the Redis channel name for a specific room."""
     return f"room:{room_id}"
 
-def get_user_channel(user_id: str) -> str:
-    """Returns the Redis channel name for a specific user."""
-    return f"user:{user_id}"
+def get_worker_channel(worker_id: str) -> str:
+    """Returns the Redis channel a server instance receives user-addressed events on."""
+    return f"worker:{worker_id}"
+
+def pack_envelope(user_ids: Iterable[str], message: str) -> str:
+    """
+    Wraps an event for the users of one worker: their ids on the first line,
+    the serialized event unchanged after it. Serialized events never contain
+    a raw newline, so the event is forwarded without being parsed again.
+    """
+    return ",".join(user_ids) + "\n" + message
+
+def unpack_envelope(envelope: str) -> Tuple[List[str], str]:
+    """Returns the recipient user ids and the event of an envelope."""
+    header, _, message = envelope.partition("\n")
+    return header.split(","), message
 
 class WebsocketManager:
     """
     Manages WebSocket connections, room memberships, and Redis Pub/Sub messaging
     for real-time communication. This class is designed to be a singleton
     instance within the FastAPI application.
+
+    User-addressed events are routed by worker rather than by user: each
+    instance subscribes to its own `worker:{worker_id}` channel once, and
+    publishers look up the workers holding the recipients' sockets in the
+    presence registry, then publish one envelope per worker listing its
+    recipients. Connecting or disconnecting a socket never touches the
+    pubsub subscriptions.
     """
 
-    def __init__(self, redis_url: str):
+    def __init__(
+        self,
+        redis_url: str,
+        outbound_queue_size: int = 256,
+        overflow_policy: Sequence[str] = OVERFLOW_STRATEGIES,
+        presence_ttl_seconds: int = 60,
+    ):
         self.redis_url = redis_url
+        self.outbound_queue_size = outbound_queue_size
+        self.overflow_policy = tuple(overflow_policy)
         self.redis_client: redis.Redis = None
         self.pubsub = None
         self.listener_task: asyncio.Task = None
+        self.heartbeat_task: asyncio.Task = None
 
-        self.ONLINE_USERS_KEY = "online_users"
+        # Identifies this instance in shared Redis state such as presence
+        self.worker_id = uuid.uuid4().hex
+        self.presence = PresenceTracker(
+            self.worker_id, presence_ttl_seconds, on_change=self._publish_presence_change
+        )
 
-        self.active_connections: Dict[str, WebSocket] = {}
-        self.local_room_members: Dict[str, Set[str]] = {}
+        # A user may have several sockets open (tabs, devices) on this instance;
+        # each socket is written to only by its own ConnectionWriter.
+        self.active_connections: Dict[str, Dict[WebSocket, ConnectionWriter]] = {}
+        # Per room, how many of each user's local sockets have joined it
+        self.local_room_members: Dict[str, Counter] = {}
+        self.control_handlers: Dict[str, Callable[[dict], None]] = {}
 
-    async def init_redis(self):
-        """Initializes Redis client and starts the Pub/Sub listener task."""
+    async def init_redis(self, redis_client: redis.Redis = None):
+        """
+        Initializes Redis client and starts the Pub/Sub listener task.
+        An already constructed client may be passed in (e.g. by benchmarks).
+        """
         try:
             print(f"Attempting to connect to Redis at {self.redis_url}")
-            self.redis_client = redis.from_url(
+            self.redis_client = redis_client or redis.from_url(
                 self.redis_url, encoding="utf-8", decode_responses=True
             )
             await self.redis_client.ping()
@@ -48,13 +98,28 @@ class WebsocketManager:
             raise e
 
         self.pubsub = self.redis_client.pubsub()
-        await self.pubsub.subscribe(DUMMY_CHANNEL)
+        await self.pubsub.subscribe(CONTROL_CHANNEL, get_worker_channel(self.worker_id))
         self.listener_task = asyncio.create_task(self._pubsub_listener())
 
+        self.presence.redis_client = self.redis_client
+        self.heartbeat_task = asyncio.create_task(
+            self.presence.run_heartbeats(self._local_connection_counts)
+        )
+
     async def close(self):
         """Closes all connections and stops the listener task."""
         if self.listener_task:
             self.listener_task.cancel()
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+        if self.redis_client:
+            try:
+                await self.presence.clear(self.active_connections.keys())
+            except Exception as e:
+                print(f"Failed to clear presence on shutdown: {e}")
+        for sockets in self.active_connections.values():
+            for writer in sockets.values():
+                await writer.stop()
         if self.pubsub:
             await self.pubsub.unsubscribe()
             await self.pubsub.close()
@@ -62,109 +127,254 @@ class WebsocketManager:
             await self.redis_client.close()
         print("WebsocketManager resources closed.")
 
-    async def connect(self, websocket: WebSocket, user_id: UUID):
-        """Accepts a new WebSocket connection for a user."""
-        await websocket.accept()
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: UUID,
+        frame_format: str = JSON_FRAMES,
+        subprotocol: Optional[str] = None,
+        backlog: Optional[Callable[[], Awaitable[List[Union[str, bytes]]]]] = None,
+    ):
+        """
+        Accepts a new WebSocket connection for a user, with the negotiated
+        subprotocol and frame format, and registers it in presence so that
+        events for the user are routed to this instance.
+
+        `backlog`, when given, returns events the client missed while it was
+        away. It runs once the socket is registered, and its events are sent
+        before any live event, which waits in the outbound queue meanwhile;
+        so nothing published around the reconnect is lost or reordered.
+        """
+        await websocket.accept(subprotocol=subprotocol)
         user_id_str = str(user_id)
-        self.active_connections[user_id_str] = websocket
+        writer = ConnectionWriter(websocket, self.outbound_queue_size, self.overflow_policy, frame_format)
+        sockets = self.active_connections.setdefault(user_id_str, {})
+        sockets[websocket] = writer
+
+        if len(sockets) == 1:
+            print(f"User {user_id_str} connected.")
+        else:
+            print(f"User {user_id_str} opened another connection ({len(sockets)} on this instance).")
 
-        await self.pubsub.subscribe(get_user_channel(user_id_str))
-        print(f"User {user_id_str} connected. Subscribed to personal channel.")
+        # Registered before the backlog is read: anything published from now on reaches this socket
+        await self.presence.set_connections(user_id_str, len(sockets))
 
-        await self.redis_client.sadd(self.ONLINE_USERS_KEY, str(user_id))
-        print(f"User {user_id_str} added to global online set.")
+        if backlog is not None:
+            try:
+                await writer.send_backlog(await backlog())
+            except Exception as e:
+                print(f"Failed to send the backlog of user {user_id_str}: {e}")
+        writer.start()
 
-    async def disconnect(self, user_id: UUID):
-        """Handles a user's disconnection, cleaning up all memberships."""
+    async def disconnect(self, user_id: UUID, websocket: WebSocket):
+        """
+        Handles the disconnection of one of a user's sockets. Room tracking
+        is released with the user's last socket on this instance; the user
+        stays globally online until their last socket on any instance is gone.
+        """
         user_id_str = str(user_id)
-        if user_id_str in self.active_connections:
+        sockets = self.active_connections.get(user_id_str)
+        if sockets is None or websocket not in sockets:
+            return
+        await sockets.pop(websocket).stop()
+
+        if not sockets:
             del self.active_connections[user_id_str]
-            await self.pubsub.unsubscribe(get_user_channel(user_id_str))
-        
-        # Clean up local room tracking
-        rooms_to_unsubscribe = []
-        for room_id, members in self.local_room_members.items():
-            if user_id_str in members:
-                members.discard(user_id_str)
+
+            # Clean up local room tracking
+            rooms_to_unsubscribe = []
+            for room_id, members in self.local_room_members.items():
+                members.pop(user_id_str, None)
                 if not members:
                     rooms_to_unsubscribe.append(room_id)
-        
-        for room_id in rooms_to_unsubscribe:
-            del self.local_room_members[room_id]
-            await self.pubsub.unsubscribe(get_room_channel(room_id))
-            print(f"Unsubscribed from room {room_id} channel (no local members left).")
 
-        print(f"User {user_id_str} disconnected.")
+            for room_id in rooms_to_unsubscribe:
+                del self.local_room_members[room_id]
+                await self.pubsub.unsubscribe(get_room_channel(room_id))
+                print(f"Unsubscribed from room {room_id} channel (no local members left).")
+
+        print(f"User {user_id_str} disconnected ({len(sockets)} connections left on this instance).")
+
+        await self.presence.set_connections(user_id_str, len(sockets))
+
+    async def are_online(self, user_ids: Iterable[UUID]) -> Set[UUID]:
+        """Returns which of the given users have a WebSocket open on any instance."""
+        return await self.presence.are_online(user_ids)
 
-        await self.redis_client.srem(self.ONLINE_USERS_KEY, str(user_id))
-        print(f"User {user_id_str} removed from global online set.")
+    def _local_connection_counts(self) -> Dict[str, int]:
+        return {user_id: len(sockets) for user_id, sockets in self.active_connections.items()}
 
-    async def get_globally_online_users(self) -> set[str]:
-        """Returns a set of user IDs that are currently connected via WebSocket."""
-        return await self.redis_client.smembers(self.ONLINE_USERS_KEY)
+    async def _publish_presence_change(self, user_id: str, online: bool):
+        await self.publish_control_event(PRESENCE_CHANGED_EVENT, {"user_id": user_id, "online": online})
 
     async def join_room(self, user_id: UUID, room_id: UUID):
         """Adds a user to a room's local tracking and subscribes to the room channel if necessary."""
         user_id_str, room_id_str = str(user_id), str(room_id)
-        if room_id_str not in self.local_room_members or not self.local_room_members[room_id_str]:
+        if not self.local_room_members.get(room_id_str):
             await self.pubsub.subscribe(get_room_channel(room_id_str))
             print(f"This instance subscribed to room {room_id_str} channel.")
-        
-        self.local_room_members.setdefault(room_id_str, set()).add(user_id_str)
+
+        self.local_room_members.setdefault(room_id_str, Counter())[user_id_str] += 1
         print(f"User {user_id_str} joined room {room_id_str}.")
 
     async def leave_room(self, user_id: UUID, room_id: UUID):
-        """Removes a user from a room's local tracking and unsubscribes if they were the last one."""
+        """Removes one of a user's joins from a room and unsubscribes if no local member is left."""
         user_id_str, room_id_str = str(user_id), str(room_id)
-        if room_id_str in self.local_room_members:
-            self.local_room_members[room_id_str].discard(user_id_str)
-            if not self.local_room_members[room_id_str]:
+        members = self.local_room_members.get(room_id_str)
+        if members is not None and user_id_str in members:
+            members[user_id_str] -= 1
+            if members[user_id_str] <= 0:
+                del members[user_id_str]
+            if not members:
                 del self.local_room_members[room_id_str]
                 await self.pubsub.unsubscribe(get_room_channel(room_id_str))
                 print(f"This instance unsubscribed from room {room_id_str} channel.")
         print(f"User {user_id_str} left room {room_id_str}.")
 
-    async def broadcast_to_room(self, room_id: UUID, message: str):
+    async def broadcast_to_room(self, room_id: UUID, message: Union[str, bytes]):
         """Publishes a message to a room's Redis channel for all instances to hear."""
+        timed = metrics.enabled
+        started = time.perf_counter() if timed else 0.0
         await self.redis_client.publish(get_room_channel(str(room_id)), message)
+        if timed:
+            redis_publish_duration.observe(time.perf_counter() - started, "room")
 
-    async def send_personal_message(self, user_id: UUID, message: str):
-        """Publishes a message to a specific user's Redis channel."""
-        await self.redis_client.publish(get_user_channel(str(user_id)), message)
+    async def send_personal_message(self, user_id: UUID, message: Union[str, bytes]):
+        """Sends a message to every socket of a specific user, on any instance."""
+        await self.send_to_users([user_id], message)
 
-    async def _send_to_local_websocket(self, user_id: str, message: str):
-        """Sends a message directly to a websocket connected to this instance."""
-        if user_id in self.active_connections:
-            websocket = self.active_connections[user_id]
-            try:
-                await websocket.send_text(message)
-            except Exception:
-                pass
+    async def send_to_users(self, user_ids: Iterable[UUID], message: Union[str, bytes]):
+        """
+        Sends the same message to several users, wherever they are connected.
+
+        One round trip looks up the workers holding the users' sockets, and a
+        second checks that the other workers found are alive; users connected
+        to this instance are queued directly, and every other live worker gets
+        one envelope on its channel, all published in a single pipeline.
+        Offline users cost nothing beyond the lookup.
+        """
+        user_ids = {str(user_id) for user_id in user_ids}
+        if not user_ids:
+            return
+        if metrics.enabled:
+            fanout_recipients.observe(len(user_ids), "users")
+
+        workers = await self.presence.locate(user_ids)
+        if isinstance(message, bytes):
+            message = message.decode()
+
+        local_user_ids = workers.pop(self.worker_id, None)
+        if local_user_ids:
+            event_type = get_event_type(message)
+            frames = FrameCache(message)
+            for user_id in local_user_ids:
+                self._send_to_local_websocket(user_id, message, event_type, frames)
+
+        if workers:
+            timed = metrics.enabled
+            started = time.perf_counter() if timed else 0.0
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for worker_id, worker_user_ids in workers.items():
+                    pipe.publish(get_worker_channel(worker_id), pack_envelope(worker_user_ids, message))
+                await pipe.execute()
+            if timed:
+                redis_publish_duration.observe(time.perf_counter() - started, "workers")
+
+    def add_control_handler(self, event_type: str, handler: Callable[[dict], None]):
+        """Registers a callback for control events of `event_type` published by any instance."""
+        self.control_handlers[event_type] = handler
+
+    async def publish_control_event(self, event_type: str, data: dict):
+        """Publishes a control event to every server instance, including this one."""
+        timed = metrics.enabled
+        started = time.perf_counter() if timed else 0.0
+        await self.redis_client.publish(CONTROL_CHANNEL, dump_event(event_type, data))
+        if timed:
+            redis_publish_duration.observe(time.perf_counter() - started, "control")
+
+    def _handle_control_event(self, raw: str):
+        try:
+            event = loads(raw)
+            handler = self.control_handlers.get(event.get("type"))
+            if handler:
+                handler(event.get("data") or {})
+        except Exception as e:
+            print(f"Failed to handle control event {raw!r}: {e}")
+
+    def send_to_connection(self, websocket: WebSocket, message: Union[str, bytes]) -> bool:
+        """Queues a message for one specific socket of this instance (e.g. an error reply)."""
+        if isinstance(message, bytes):
+            message = message.decode()
+        for sockets in self.active_connections.values():
+            writer = sockets.get(websocket)
+            if writer is not None:
+                frame = FrameCache(message).get(writer.frame_format)
+                return writer.enqueue(frame, get_event_type(message))
+        return False
+
+    def _send_to_local_websocket(
+        self,
+        user_id: str,
+        message: str,
+        event_type: Optional[str] = None,
+        frames: Optional[FrameCache] = None,
+    ):
+        """
+        Queues a message on every socket the user has open on this instance.
+        Never waits for a client: each socket's writer task does the sending.
+        `frames` lets a room broadcast share one encoded frame per format.
+        """
+        sockets = self.active_connections.get(user_id)
+        if not sockets:
+            return
+        if event_type is None:
+            event_type = get_event_type(message)
+        frames = frames or FrameCache(message)
+        for writer in list(sockets.values()):
+            writer.enqueue(frames.get(writer.frame_format), event_type)
+
+    def connection_stats(self) -> List[dict]:
+        """Outbound queue depth and drop counters for every socket on this instance."""
+        return [
+            {"user_id": user_id, **writer.stats()}
+            for user_id, sockets in self.active_connections.items()
+            for writer in sockets.values()
+        ]
 
     async def _pubsub_listener(self):
         """Listens for messages on Redis and routes them to the correct local clients."""
         print("Pub/Sub listener started.")
         try:
             async for message in self.pubsub.listen():
-                if message["type"] != "message" or message["channel"] == DUMMY_CHANNEL:
+                if message["type"] != "message":
                     continue
 
                 channel = message["channel"]
                 data = message["data"]
                 
-                if channel.startswith("room:"):
+                if channel == CONTROL_CHANNEL:
+                    self._handle_control_event(data)
+
+                elif channel.startswith("room:"):
                     room_id = channel.split(":", 1)[1]
                     if room_id in self.local_room_members:
-                        # Broadcast to all users in the room connected to THIS instance
-                        tasks = [
-                            self._send_to_local_websocket(user_id, data)
-                            for user_id in self.local_room_members[room_id]
-                        ]
-                        await asyncio.gather(*tasks)
-
-                elif channel.startswith("user:"):
-                    user_id = channel.split(":", 1)[1]
-                    await self._send_to_local_websocket(user_id, data)
+                        # Queue for all users in the room connected to THIS instance
+                        event_type = get_event_type(data)
+                        frames = FrameCache(data)
+                        members = self.local_room_members[room_id]
+                        if metrics.enabled:
+                            fanout_recipients.observe(len(members), "room")
+                        for user_id in members:
+                            self._send_to_local_websocket(user_id, data, event_type, frames)
+
+                elif channel.startswith("worker:"):
+                    user_ids, event = unpack_envelope(data)
+                    if metrics.enabled:
+                        fanout_recipients.observe(len(user_ids), "worker")
+                    event_type = get_event_type(event)
+                    frames = FrameCache(event)
+                    for user_id in user_ids:
+                        self._send_to_local_websocket(user_id, event, event_type, frames)
 
         except asyncio.CancelledError:
             print("Pub/Sub listener task cancelled.")
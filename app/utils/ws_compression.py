@@ -0,0 +1,169 @@
+import asyncio
+import time
+from typing import Optional, Tuple
+
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import CONT, CTRL_OPCODES, Frame
+
+# zlib's fixed per-inflater overhead, on top of the window
+_INFLATE_OVERHEAD = 7 * 1024
+
+
+def deflate_memory_usage(window_bits: int, mem_level: int) -> int:
+    """Bytes zlib allocates for one compressor (zlib.h: 2^(windowBits+2) + 2^(memLevel+9))."""
+    return (1 << (window_bits + 2)) + (1 << (mem_level + 9))
+
+
+def inflate_memory_usage(window_bits: int) -> int:
+    """Bytes zlib allocates for one decompressor."""
+    return (1 << window_bits) + _INFLATE_OVERHEAD
+
+
+def window_bits_for_memory(
+    memory_limit_bytes: int,
+    server_context_takeover: bool = True,
+    client_context_takeover: bool = True,
+) -> Tuple[int, int]:
+    """
+    Returns the largest (window_bits, mem_level) whose steady-state memory per
+    connection fits `memory_limit_bytes`. Only contexts that survive between
+    messages count: without context takeover a compressor or decompressor
+    lives only while one message is being processed.
+    """
+    for window_bits in range(15, 8, -1):
+        mem_level = max(1, min(8, window_bits - 7))
+        usage = 0
+        if server_context_takeover:
+            usage += deflate_memory_usage(window_bits, mem_level)
+        if client_context_takeover:
+            usage += inflate_memory_usage(window_bits)
+        if usage <= memory_limit_bytes:
+            return window_bits, mem_level
+    raise ValueError(f"permessage-deflate needs more than {memory_limit_bytes} bytes per connection")
+
+
+class CompressionStats:
+    """Process-wide permessage-deflate counters, for the periodic report."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.messages_compressed = 0
+        self.messages_skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compress_seconds = 0.0
+        self.decompress_seconds = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "messages_compressed": self.messages_compressed,
+            "messages_skipped": self.messages_skipped,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": self.bytes_out / self.bytes_in if self.bytes_in else 1.0,
+            "compress_cpu_ms": self.compress_seconds * 1000,
+            "decompress_cpu_ms": self.decompress_seconds * 1000,
+            "us_per_message": (
+                self.compress_seconds / self.messages_compressed * 1e6 if self.messages_compressed else 0.0
+            ),
+        }
+
+
+compression_stats = CompressionStats()
+
+
+class MeteredPerMessageDeflate(PerMessageDeflate):
+    """
+    permessage-deflate that leaves messages below `min_size` uncompressed and
+    records ratio and CPU time in `compression_stats`.
+
+    RFC 7692 lets the sender choose per message (RSV1 unset means plain), so
+    small frames such as typing indicators, where deflate costs more CPU than
+    it saves bytes, go out as-is without any change on the client.
+    """
+
+    def __init__(self, *args, min_size: int = 0, stats: CompressionStats = compression_stats, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+        self.stats = stats
+
+    def encode(self, frame: Frame) -> Frame:
+        if frame.opcode in CTRL_OPCODES:
+            return frame
+        if frame.opcode is not CONT and frame.fin and len(frame.data) < self.min_size:
+            self.stats.messages_skipped += 1
+            return frame
+
+        started = time.thread_time()
+        encoded = super().encode(frame)
+        self.stats.compress_seconds += time.thread_time() - started
+        self.stats.bytes_in += len(frame.data)
+        self.stats.bytes_out += len(encoded.data)
+        if frame.fin:
+            self.stats.messages_compressed += 1
+        return encoded
+
+    def decode(self, frame: Frame, *, max_size: Optional[int] = None) -> Frame:
+        started = time.thread_time()
+        decoded = super().decode(frame, max_size=max_size)
+        self.stats.decompress_seconds += time.thread_time() - started
+        return decoded
+
+
+class TunedPerMessageDeflateFactory(ServerPerMessageDeflateFactory):
+    """
+    Server permessage-deflate negotiation with a size threshold, context
+    takeover settings and a per-connection memory cap.
+
+    The cap is turned into `server_max_window_bits` and zlib's memLevel; the
+    client's window is capped the same way when it offers
+    `client_max_window_bits` (browsers do).
+    """
+
+    def __init__(
+        self,
+        min_size: int = 256,
+        server_context_takeover: bool = True,
+        client_context_takeover: bool = True,
+        memory_limit_bytes: int = 64 * 1024,
+        compression_level: int = 6,
+    ):
+        window_bits, mem_level = window_bits_for_memory(
+            memory_limit_bytes, server_context_takeover, client_context_takeover
+        )
+        super().__init__(
+            server_no_context_takeover=not server_context_takeover,
+            client_no_context_takeover=not client_context_takeover,
+            server_max_window_bits=window_bits,
+            client_max_window_bits=window_bits,
+            compress_settings={"memLevel": mem_level, "level": compression_level},
+        )
+        self.min_size = min_size
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        metered = MeteredPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            min_size=self.min_size,
+        )
+        return response_params, metered
+
+
+async def report_compression_stats(interval_seconds: float):
+    """Prints and resets `compression_stats` every `interval_seconds` until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        stats = compression_stats.snapshot()
+        compression_stats.reset()
+        if stats["messages_compressed"] or stats["messages_skipped"]:
+            print(
+                f"permessage-deflate: {stats['messages_compressed']} compressed, "
+                f"{stats['messages_skipped']} below threshold, ratio {stats['ratio']:.2f}, "
+                f"{stats['compress_cpu_ms']:.1f} ms compress / {stats['decompress_cpu_ms']:.1f} ms decompress CPU"
+            )
@@ -0,0 +1,85 @@
+# bench/asgi_websocket.py
+"""
+An in-process WebSocket client that speaks ASGI directly to an application,
+so thousands of simulated sockets can run on one event loop without real
+network sockets or threads.
+"""
+import asyncio
+from typing import Optional, Union
+
+
+class InProcessWebSocket:
+    def __init__(self, app, path: str, query_string: str = "", subprotocols: Optional[list] = None):
+        self.app = app
+        self.path = path
+        self.query_string = query_string
+        self.subprotocols = subprotocols or []
+        self.accepted_subprotocol: Optional[str] = None
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+    def _scope(self) -> dict:
+        return {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "http_version": "1.1",
+            "path": self.path,
+            "raw_path": self.path.encode(),
+            "root_path": "",
+            "query_string": self.query_string.encode(),
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+            "subprotocols": self.subprotocols,
+        }
+
+    async def connect(self):
+        """Performs the handshake. Raises ConnectionRefusedError if the app closes instead of accepting."""
+        self._to_app.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self.app(self._scope(), self._to_app.get, self._from_app.put))
+        message = await self._next_from_app()
+        if message["type"] != "websocket.accept":
+            self.closed = True
+            raise ConnectionRefusedError(message.get("reason") or message["type"])
+        self.accepted_subprotocol = message.get("subprotocol")
+
+    async def _next_from_app(self) -> dict:
+        """Waits for the next ASGI message, surfacing app crashes instead of hanging."""
+        if not self._from_app.empty():
+            return self._from_app.get_nowait()
+        getter = asyncio.ensure_future(self._from_app.get())
+        await asyncio.wait({getter, self._task}, return_when=asyncio.FIRST_COMPLETED)
+        if getter.done():
+            return getter.result()
+        getter.cancel()
+        self._task.result()  # re-raises the application's exception, if any
+        return {"type": "websocket.close", "reason": "application exited"}
+
+    async def send_text(self, text: str):
+        await self._to_app.put({"type": "websocket.receive", "text": text})
+
+    async def send_bytes(self, data: bytes):
+        await self._to_app.put({"type": "websocket.receive", "bytes": data})
+
+    async def receive(self) -> Union[str, bytes]:
+        """Returns the next text or binary frame sent by the app."""
+        while True:
+            message = await self._next_from_app()
+            if message["type"] == "websocket.send":
+                return message["text"] if message.get("text") is not None else message["bytes"]
+            if message["type"] == "websocket.close":
+                self.closed = True
+                raise ConnectionResetError(message.get("reason") or "closed by server")
+
+    async def close(self, code: int = 1000):
+        if self._task is None:
+            return
+        await self._to_app.put({"type": "websocket.disconnect", "code": code})
+        try:
+            await asyncio.wait_for(self._task, timeout=5)
+        except Exception:
+            self._task.cancel()
+        self.closed = True
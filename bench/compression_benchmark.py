@@ -0,0 +1,134 @@
+# bench/compression_benchmark.py
+"""
+Trades bandwidth against CPU and memory for permessage-deflate settings.
+
+Replays a mix of outbound events (new messages, status updates, typing
+indicators and a page of room history) through the server side of
+permessage-deflate, once per configuration:
+
+  * off             - no compression
+  * uvicorn default - what `--ws-per-message-deflate` negotiates
+  * tuned           - TunedPerMessageDeflateFactory with the default settings
+  * tuned, no ctx   - the same without server context takeover
+
+and reports bytes on the wire, compression ratio, CPU per message and the
+zlib memory held per idle connection.
+
+Usage:
+    python -m bench.compression_benchmark [--messages 5000] [--connections 200]
+"""
+import bench.app_env  # noqa: F401  (must precede app imports)
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+from websockets.frames import TEXT, Frame
+
+from app.schemas.message import MessageResponse, MessageStatus, MessageType
+from app.utils.serialization import dump_event
+from app.utils.ws_compression import TunedPerMessageDeflateFactory
+
+WORDS = "the deploy finished and everything looks green on dashboards lunch meeting at noon ship it".split()
+CLIENT_OFFER = [("client_max_window_bits", None)]
+
+
+def _message(room_id: uuid.UUID) -> MessageResponse:
+    return MessageResponse(
+        id=uuid.uuid4(),
+        room_id=room_id,
+        sender_id=uuid.uuid4(),
+        sender_username="alice",
+        sender_display_name="Alice Example",
+        content=" ".join(random.choices(WORDS, k=random.randint(4, 60))),
+        status=MessageStatus.SENT,
+        timestamp=datetime.now(timezone.utc),
+        message_type=MessageType.TEXT,
+        is_edited=False,
+        is_deleted=False,
+    )
+
+
+def _events(count: int) -> list:
+    room_id = uuid.uuid4()
+    events = []
+    for i in range(count):
+        kind = i % 10
+        if kind < 5:
+            events.append(dump_event("new_message", _message(room_id)))
+        elif kind < 8:
+            events.append(dump_event("typing_indicator", {"room_id": str(room_id), "user_id": str(uuid.uuid4()), "is_typing": True}))
+        elif kind < 9:
+            events.append(dump_event("message_status_update", {
+                "room_id": str(room_id), "message_ids": [str(uuid.uuid4()) for _ in range(5)], "status": "seen",
+            }))
+        else:
+            events.append(dump_event("message_history", {"messages": [_message(room_id) for _ in range(50)]}))
+    return events
+
+
+def _extension(factory):
+    return factory.process_request_params(CLIENT_OFFER, [])[1]
+
+
+def _run(factory, events: list) -> tuple:
+    extension = _extension(factory) if factory is not None else None
+    wire = 0
+    started = time.thread_time()
+    for payload in events:
+        frame = Frame(TEXT, payload)
+        if extension is not None:
+            frame = extension.encode(frame)
+        wire += len(frame.data)
+    return wire, time.thread_time() - started
+
+
+def _memory_per_connection(factory, connections: int, sample: bytes) -> float:
+    if factory is None:
+        return 0.0
+    gc.collect()
+    tracemalloc.start()
+    extensions = [_extension(factory) for _ in range(connections)]
+    for extension in extensions:
+        extension.encode(Frame(TEXT, sample))
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / connections
+
+
+def main(messages: int, connections: int):
+    random.seed(7)
+    events = _events(messages)
+    raw = sum(len(event) for event in events)
+    sample = max(events, key=len)
+    configurations = {
+        "off": None,
+        "uvicorn default": ServerPerMessageDeflateFactory(),
+        "tuned": TunedPerMessageDeflateFactory(),
+        "tuned, no ctx": TunedPerMessageDeflateFactory(server_context_takeover=False),
+    }
+
+    print(f"{messages} events, {raw / 1024:.0f} KiB raw; memory measured over {connections} connections\n")
+    print(f"{'config':<16} | {'wire KiB':>8} | {'ratio':>5} | {'us/event':>8} | {'KiB/conn':>8}")
+    print("-" * 58)
+    for name, factory in configurations.items():
+        wire, seconds = _run(factory, events)
+        memory = _memory_per_connection(factory, connections, sample)
+        print(
+            f"{name:<16} | {wire / 1024:>8.0f} | {wire / raw:>5.2f} | "
+            f"{seconds / len(events) * 1e6:>8.1f} | {memory / 1024:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--connections", type=int, default=200)
+    args = parser.parse_args()
+    main(args.messages, args.connections)
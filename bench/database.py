@@ -0,0 +1,73 @@
+# bench/database.py
+"""
+SQLite-backed database helpers for the benchmarks, following the aiosqlite
+pattern used by tests/conftest.py but with a real connection pool so pool
+pressure can be observed.
+"""
+import os
+import tempfile
+from typing import List
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.security import hash_password
+from app.database.migrations import run_migrations
+from app.models.room import Room, RoomType
+from app.models.room_membership import RoomMembership
+from app.models.user import User
+
+
+def create_bench_engine(pool_size: int = 20, max_overflow: int = 0, pool_timeout: float = 30.0, path: str = None):
+    """Creates an aiosqlite engine on a temporary file with a bounded queue pool."""
+    path = path or os.path.join(tempfile.mkdtemp(prefix="rtc-bench-"), "bench.db")
+    return create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        connect_args={"timeout": 30},
+    )
+
+
+def create_session_factory(engine) -> sessionmaker:
+    return sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+
+async def create_schema(engine):
+    """Builds the schema through the same migrations production uses."""
+    await run_migrations(engine)
+
+
+async def seed_users(session_factory: sessionmaker, count: int, prefix: str = "bench") -> List[User]:
+    """Bulk-inserts `count` users sharing one password hash (hashing is not what is being measured)."""
+    hashed = hash_password("password123")
+    users = [
+        User(
+            username=f"{prefix}{i}",
+            display_name=f"Bench User {i}",
+            email=f"{prefix}{i}@example.com",
+            hashed_password=hashed,
+        )
+        for i in range(count)
+    ]
+    async with session_factory() as session:
+        session.add_all(users)
+        await session.commit()
+    return users
+
+
+async def seed_group_room(session_factory: sessionmaker, members: List[User], name: str = "bench-room") -> Room:
+    async with session_factory() as session:
+        room = Room(name=name, created_by=members[0].id, room_type=RoomType.GROUP)
+        session.add(room)
+        await session.flush()
+        await session.execute(
+            insert(RoomMembership),
+            [{"user_id": member.id, "room_id": room.id} for member in members],
+        )
+        await session.commit()
+    return room
@@ -0,0 +1,236 @@
+# bench/fake_redis.py
+"""
+A minimal in-memory stand-in for `redis.asyncio.Redis`.
+
+Only the commands the application actually uses are implemented. Every
+awaited command (or pipeline execution) counts as one round trip and can
+optionally sleep for `latency` seconds, which makes it possible to observe
+the cost of chatty Redis access patterns without a real server.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class FakePubSub:
+    def __init__(self, server: "FakeRedis"):
+        self.server = server
+        self.channels: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        server._pubsubs.append(self)
+
+    async def subscribe(self, *channels: str):
+        await self.server._round_trip()
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels: str):
+        await self.server._round_trip()
+        if channels:
+            self.channels.difference_update(channels)
+        else:
+            self.channels.clear()
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def close(self):
+        if self in self.server._pubsubs:
+            self.server._pubsubs.remove(self)
+
+    aclose = close
+
+
+class FakePipeline:
+    def __init__(self, server: "FakeRedis"):
+        self.server = server
+        self.commands: List[tuple] = []
+
+    def __getattr__(self, name: str):
+        handler = getattr(self.server, f"_cmd_{name}", None)
+        if handler is None:
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((handler, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        await self.server._round_trip()
+        results = [handler(*args, **kwargs) for handler, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+
+class FakeRedis:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.round_trips = 0
+        self.published = 0
+        self._pubsubs: List[FakePubSub] = []
+        self._strings: Dict[str, str] = {}
+        self._hashes: Dict[str, Dict[str, str]] = {}
+        self._streams: Dict[str, List[Tuple[str, Dict[str, str]]]] = {}
+        self._expiry: Dict[str, float] = {}
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def __getattr__(self, name: str):
+        handler = self.__dict__.get(f"_cmd_{name}") or getattr(type(self), f"_cmd_{name}", None)
+        if handler is None:
+            raise AttributeError(name)
+        handler = handler.__get__(self)
+
+        async def command(*args, **kwargs):
+            await self._round_trip()
+            return handler(*args, **kwargs)
+
+        return command
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+    async def close(self):
+        pass
+
+    aclose = close
+
+    # --- Commands -----------------------------------------------------------
+
+    def _cmd_ping(self):
+        return True
+
+    def _cmd_publish(self, channel: str, message) -> int:
+        self.published += 1
+        if isinstance(message, bytes):
+            # Like a client created with decode_responses=True
+            message = message.decode()
+        receivers = 0
+        for pubsub in self._pubsubs:
+            if channel in pubsub.channels:
+                pubsub.queue.put_nowait({"type": "message", "channel": channel, "data": message})
+                receivers += 1
+        return receivers
+
+    def _expire_key(self, key: str):
+        expires_at = self._expiry.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._strings.pop(key, None)
+            self._hashes.pop(key, None)
+            self._streams.pop(key, None)
+            self._expiry.pop(key, None)
+
+    def _live_hash(self, key: str) -> Dict[str, str]:
+        self._expire_key(key)
+        return self._hashes.get(key, {})
+
+    def _live_stream(self, key: str) -> List[Tuple[str, Dict[str, str]]]:
+        self._expire_key(key)
+        return self._streams.get(key, [])
+
+    def _live_string(self, key: str) -> Optional[str]:
+        self._expire_key(key)
+        return self._strings.get(key)
+
+    def _cmd_exists(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._live_hash(key) or self._live_string(key) is not None)
+
+    def _cmd_set(self, key: str, value, ex: Optional[float] = None) -> bool:
+        self._strings[key] = str(value)
+        if ex is not None:
+            self._expiry[key] = time.monotonic() + ex
+        else:
+            self._expiry.pop(key, None)
+        return True
+
+    def _cmd_delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            self._expire_key(key)
+            found = False
+            for store in (self._strings, self._hashes, self._streams):
+                found = store.pop(key, None) is not None or found
+            self._expiry.pop(key, None)
+            removed += found
+        return removed
+
+    def _cmd_hset(self, key: str, field: str = None, value=None, mapping: dict = None) -> int:
+        fields = self._hashes.setdefault(key, self._live_hash(key))
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        added = sum(1 for name in items if name not in fields)
+        fields.update({name: str(item) for name, item in items.items()})
+        return added
+
+    def _cmd_hgetall(self, key: str) -> Dict[str, str]:
+        return dict(self._live_hash(key))
+
+    def _cmd_hdel(self, key: str, *fields: str) -> int:
+        values = self._live_hash(key)
+        removed = sum(1 for field in fields if values.pop(field, None) is not None)
+        if key in self._hashes and not values:
+            del self._hashes[key]
+            self._expiry.pop(key, None)
+        return removed
+
+    def _cmd_expire(self, key: str, seconds: float) -> bool:
+        if not self._live_hash(key) and not self._live_stream(key) and self._live_string(key) is None:
+            return False
+        self._expiry[key] = time.monotonic() + seconds
+        return True
+
+    # Streams. Entry ids are "<ms>-<seq>" strings, as in Redis.
+
+    @staticmethod
+    def _stream_id(entry_id: str) -> Tuple[int, int]:
+        ms, _, seq = entry_id.partition("-")
+        return int(ms), int(seq or 0)
+
+    def _cmd_xadd(self, key: str, fields: dict, id: str = "*", maxlen: Optional[int] = None, approximate: bool = True) -> str:
+        entries = self._streams.setdefault(key, self._live_stream(key))
+        now_ms = int(time.time() * 1000)
+        last = self._stream_id(entries[-1][0]) if entries else (0, -1)
+        new_id = (now_ms, 0) if now_ms > last[0] else (last[0], last[1] + 1)
+        entry_id = f"{new_id[0]}-{new_id[1]}"
+        entries.append((entry_id, {name: value.decode() if isinstance(value, bytes) else str(value)
+                                   for name, value in fields.items()}))
+        if maxlen is not None and len(entries) > maxlen:
+            del entries[:len(entries) - maxlen]
+        return entry_id
+
+    def _cmd_xrange(self, key: str, min: str = "-", max: str = "+", count: Optional[int] = None):
+        def bound(value: str, default):
+            if value in ("-", "+"):
+                return default, False
+            if value.startswith("("):
+                return self._stream_id(value[1:]), True
+            return self._stream_id(value), False
+
+        low, low_exclusive = bound(min, (0, 0))
+        high, high_exclusive = bound(max, (float("inf"), 0))
+        result = []
+        for entry_id, fields in self._live_stream(key):
+            position = self._stream_id(entry_id)
+            if position < low or (low_exclusive and position == low):
+                continue
+            if position > high or (high_exclusive and position == high):
+                break
+            result.append((entry_id, dict(fields)))
+            if count is not None and len(result) >= count:
+                break
+        return result
@@ -0,0 +1,88 @@
+# bench/fanout_benchmark.py
+"""
+Measures how long fanning a single chat event out to every room member takes
+as the member count grows, with the members spread over --workers server
+instances. Compares:
+
+  per-user     one publish per member on a `user:{id}` channel, pipelined
+               (the routing used before worker channels)
+  per-worker   `WebsocketManager.send_to_users`: one presence lookup, then
+               one envelope per worker holding a recipient
+
+Usage:
+    python -m bench.fanout_benchmark [--latency-ms 0.2] [--workers 8] [--redis-url redis://localhost:6379]
+
+Without --redis-url an in-memory fake Redis is used, with every round trip
+delayed by --latency-ms to approximate network RTT.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import redis.asyncio as redis
+
+from app.utils.presence import get_presence_key
+from app.utils.websocket_manager import WebsocketManager
+from bench.fake_redis import FakeRedis
+
+MEMBER_COUNTS = [10, 100, 1000, 5000]
+PAYLOAD = '{"type": "new_message", "data": {"content": "hello"}}'
+
+
+async def _per_user(manager: WebsocketManager, member_ids):
+    async with manager.redis_client.pipeline(transaction=False) as pipe:
+        for member_id in member_ids:
+            pipe.publish(f"user:{member_id}", PAYLOAD)
+        await pipe.execute()
+
+
+async def _per_worker(manager: WebsocketManager, member_ids):
+    await manager.send_to_users(member_ids, PAYLOAD)
+
+
+async def _register(manager: WebsocketManager, member_ids, worker_count: int):
+    """Marks the members online, spread over `worker_count` other instances."""
+    async with manager.redis_client.pipeline(transaction=False) as pipe:
+        for i, member_id in enumerate(member_ids):
+            key = get_presence_key(str(member_id))
+            pipe.hset(key, f"bench-worker-{i % worker_count}", 1)
+            pipe.expire(key, 60)
+        await pipe.execute()
+
+
+async def _time(fn, manager, member_ids) -> float:
+    start = time.perf_counter()
+    await fn(manager, member_ids)
+    return (time.perf_counter() - start) * 1000
+
+
+async def main(latency_ms: float, worker_count: int, redis_url: str | None):
+    manager = WebsocketManager(redis_url or "redis://fake")
+    if redis_url:
+        manager.redis_client = redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+    else:
+        manager.redis_client = FakeRedis(latency=latency_ms / 1000)
+    manager.presence.redis_client = manager.redis_client
+
+    print(f"members spread over {worker_count} workers\n")
+    print(f"{'members':>8} | {'per-user (ms)':>14} | {'per-worker (ms)':>16} | {'publishes':>16}")
+    print("-" * 64)
+    for count in MEMBER_COUNTS:
+        member_ids = [uuid.uuid4() for _ in range(count)]
+        await _register(manager, member_ids, worker_count)
+        per_user_ms = await _time(_per_user, manager, member_ids)
+        per_worker_ms = await _time(_per_worker, manager, member_ids)
+        publishes = f"{count} -> {min(count, worker_count)}"
+        print(f"{count:>8} | {per_user_ms:>14.2f} | {per_worker_ms:>16.2f} | {publishes:>16}")
+
+    await manager.redis_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=0.2, help="Simulated Redis RTT for the fake client")
+    parser.add_argument("--workers", type=int, default=8, help="Server instances the members are connected to")
+    parser.add_argument("--redis-url", default=None, help="Benchmark against a real Redis server instead")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency_ms, args.workers, args.redis_url))
@@ -0,0 +1,84 @@
+# bench/frame_format_benchmark.py
+"""
+Compares JSON text frames with MessagePack binary frames
+(the `rtc.msgpack.v1` subprotocol) for the event types on the hot path.
+
+For each event it reports the frame size in bytes and the encode and
+decode cost. Outbound events are encoded from their JSON frame through
+FrameCache, the same way the room listener does it.
+
+Usage:
+    python -m bench.frame_format_benchmark [--iterations 20000]
+"""
+import bench.app_env  # noqa: F401  (must precede app imports)
+
+import argparse
+import timeit
+import uuid
+from datetime import datetime, timezone
+
+from app.schemas.message import MessageResponse, MessageStatus, MessageType
+from app.utils.frames import JSON_FRAMES, MSGPACK_FRAMES, FrameCache, decode_frame, encode_frame
+from app.utils.serialization import dump_event, loads
+
+
+def _events() -> dict:
+    room_id = str(uuid.uuid4())
+    message = MessageResponse(
+        id=uuid.uuid4(),
+        room_id=uuid.UUID(room_id),
+        sender_id=uuid.uuid4(),
+        sender_username="alice",
+        sender_display_name="Alice Example",
+        content="Hey team, the deploy finished and everything looks green on the dashboards.",
+        status=MessageStatus.SENT,
+        timestamp=datetime.now(timezone.utc),
+        message_type=MessageType.TEXT,
+        is_edited=False,
+        is_deleted=False,
+    )
+    message_ids = [str(uuid.uuid4()) for _ in range(10)]
+    return {
+        "new_message": loads(dump_event("new_message", message)),
+        "message_status_update": loads(dump_event(
+            "message_status_update", {"room_id": room_id, "message_ids": message_ids, "status": "seen"}
+        )),
+        "typing_indicator": loads(dump_event(
+            "typing_indicator", {"room_id": room_id, "user_id": str(uuid.uuid4()), "is_typing": True}
+        )),
+        "send_message": {"type": "send_message", "room_id": room_id, "content": message.content, "message_type": "text"},
+        "messages_seen": {"type": "messages_seen", "room_id": room_id, "message_ids": message_ids},
+    }
+
+
+def _best_us(func, iterations: int) -> float:
+    return min(timeit.repeat(func, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def main(iterations: int):
+    print(f"{iterations} iterations\n")
+    print(
+        f"{'event':<22} | {'json B':>6} | {'msgpack B':>9} | {'saved':>6} | "
+        f"{'json enc/dec (us)':>17} | {'msgpack enc/dec (us)':>20}"
+    )
+    print("-" * 96)
+    for name, event in _events().items():
+        json_frame = encode_frame(event, JSON_FRAMES)
+        binary_frame = encode_frame(event, MSGPACK_FRAMES)
+        json_encode = _best_us(lambda: encode_frame(event, JSON_FRAMES), iterations)
+        # What a fan-out pays per event for binary sockets: one transcoding from the JSON frame
+        binary_encode = _best_us(lambda: FrameCache(json_frame).get(MSGPACK_FRAMES), iterations)
+        json_decode = _best_us(lambda: decode_frame(json_frame, JSON_FRAMES), iterations)
+        binary_decode = _best_us(lambda: decode_frame(binary_frame, MSGPACK_FRAMES), iterations)
+        saved = 1 - len(binary_frame) / len(json_frame.encode())
+        print(
+            f"{name:<22} | {len(json_frame.encode()):>6} | {len(binary_frame):>9} | {saved:>6.1%} | "
+            f"{json_encode:>7.2f} / {json_decode:>7.2f} | {binary_encode:>9.2f} / {binary_decode:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+    main(args.iterations)
@@ -0,0 +1,94 @@
+# bench/idle_sockets_benchmark.py
+"""
+Load test: many idle WebSocket connections against a small database pool.
+
+Opens --sockets authenticated connections to the real `/ws` endpoint
+in-process, checks how many pooled DB connections are held while they sit
+idle, then has --active of them send a group message concurrently and waits
+for delivery. With per-operation sessions the idle sockets hold no
+connections, so the pool of --pool-size only serves in-flight operations.
+
+Usage:
+    python -m bench.idle_sockets_benchmark [--sockets 10000] [--pool-size 20] [--active 200]
+"""
+import bench.app_env  # noqa: F401  (must precede app imports)
+
+import argparse
+import asyncio
+import json
+import time
+
+from app.core.security import create_access_token
+from app.database.postgres import get_session_factory
+from app.globals import websocket_manager
+from app.main import app
+from bench.asgi_websocket import InProcessWebSocket
+from bench.database import create_bench_engine, create_schema, create_session_factory, seed_group_room, seed_users
+from bench.fake_redis import FakeRedis
+
+
+async def _connect_all(users, batch_size: int = 500):
+    clients = []
+    for start in range(0, len(users), batch_size):
+        batch = []
+        for user in users[start:start + batch_size]:
+            token = create_access_token({"user_id": str(user.id)})
+            batch.append(InProcessWebSocket(app, "/ws", f"token={token}"))
+        await asyncio.gather(*(client.connect() for client in batch))
+        clients.extend(batch)
+    return clients
+
+
+async def _receive_n(client: InProcessWebSocket, n: int, timeout: float):
+    for _ in range(n):
+        await asyncio.wait_for(client.receive(), timeout=timeout)
+
+
+async def main(sockets: int, pool_size: int, active: int):
+    engine = create_bench_engine(pool_size=pool_size, max_overflow=0, pool_timeout=10)
+    session_factory = create_session_factory(engine)
+    await create_schema(engine)
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    await websocket_manager.init_redis(FakeRedis())
+
+    users = await seed_users(session_factory, sockets)
+    senders = users[:active]
+    room = await seed_group_room(session_factory, senders)
+
+    start = time.perf_counter()
+    clients = await _connect_all(users)
+    connect_s = time.perf_counter() - start
+    idle_checked_out = engine.pool.checkedout()
+
+    start = time.perf_counter()
+    payloads = [
+        json.dumps({"type": "send_message", "room_id": str(room.id), "content": f"hello from {i}"})
+        for i in range(active)
+    ]
+    await asyncio.gather(*(client.send_text(payload) for client, payload in zip(clients, payloads)))
+    results = await asyncio.gather(
+        *(_receive_n(client, active, timeout=60) for client in clients[:active]),
+        return_exceptions=True,
+    )
+    send_s = time.perf_counter() - start
+    failures = sum(1 for result in results if isinstance(result, Exception))
+
+    print(f"sockets connected          : {len(clients)} in {connect_s:.2f}s")
+    print(f"pool size                  : {pool_size} (max_overflow=0)")
+    print(f"connections held when idle : {idle_checked_out}")
+    print(f"concurrent senders         : {active}")
+    print(f"all deliveries completed   : {send_s:.2f}s ({active * active} frames)")
+    print(f"senders with missing frames: {failures}")
+
+    await asyncio.gather(*(client.close() for client in clients))
+    await websocket_manager.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=10_000)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--active", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.sockets, args.pool_size, args.active))
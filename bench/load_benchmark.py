@@ -0,0 +1,384 @@
+# bench/load_benchmark.py
+"""
+End-to-end load test of the real `app.main:app`, driven in-process by
+--clients simulated WebSocket clients.
+
+Clients are seeded in group rooms of --room-size members and connect to
+`/ws`, each joining its room. For --duration seconds every client then
+performs about --rate actions per second (Poisson arrivals), picked by the
+weights of --mix:
+
+  message     send_message to its room; the content carries the send time
+  typing      a typing frame
+  delivered   messages_delivered for the messages received since its last
+              delivered ack
+  seen        messages_seen for the messages received since its last seen ack
+
+The database is an aiosqlite file behind a bounded pool (bench/database.py),
+Redis the in-memory fake unless --redis-url is given. The typing aggregator
+and receipt batcher run as in production.
+
+Reported:
+  throughput         actions sent and frames received per second
+  delivery latency   send_message sent -> new_message received, per recipient
+  memory/connection  Python heap allocated by connecting and joining a room
+                     (tracemalloc, measured before the load starts)
+
+Runs are seeded, so two runs with the same options perform the same actions.
+--json writes the results with the options and the git commit; --compare
+prints them next to a previous run's file:
+
+    python -m bench.load_benchmark --json before.json
+    git checkout <other commit>
+    python -m bench.load_benchmark --compare before.json
+
+Both commits need the features the benchmark drives: `resume_from` on /ws,
+the room event log and per-worker channels. The results record which of them
+the tree had, and --compare refuses a baseline recorded without them. Trees
+from before these features cannot run the benchmark at all, so it cannot
+measure the gain of introducing them.
+
+Usage:
+    python -m bench.load_benchmark [--clients 200] [--room-size 10] [--duration 10] [--rate 2]
+                                   [--mix message=1,typing=3,delivered=1,seen=1] [--pool-size 20] [--seed 1]
+                                   [--redis-url redis://localhost:6379] [--json PATH] [--compare PATH]
+"""
+import bench.app_env  # noqa: F401  (must precede app imports)
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import json
+import logging
+import os
+import random
+import subprocess
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List
+
+from app.core.security import create_access_token
+from app.database.postgres import get_session_factory
+from app.globals import event_log, membership_cache, receipt_batcher, typing_aggregator, websocket_manager
+from app.main import app
+from app.services.chat_service import build_receipt_flush
+from bench.asgi_websocket import InProcessWebSocket
+from bench.database import create_bench_engine, create_schema, create_session_factory, seed_group_room, seed_users
+from bench.fake_redis import FakeRedis
+
+ACTIONS = ("message", "typing", "delivered", "seen")
+# Receipt actions: the frame type and the attribute holding the ids still to acknowledge
+RECEIPTS = {"delivered": ("messages_delivered", "undelivered"), "seen": ("messages_seen", "unseen")}
+# Features both sides of --compare need, as feature -> (module, attribute) providing it
+REQUIRED_FEATURES = {
+    "resume_from": ("app.utils.event_log", "parse_resume_from"),
+    "room_event_log": ("app.utils.event_log", "RoomEventLog"),
+    "worker_channels": ("app.utils.websocket_manager", "get_worker_channel"),
+}
+# Keys compared by --compare; higher is better unless listed in LOWER_IS_BETTER
+COMPARED = (
+    "actions_per_second",
+    "frames_received_per_second",
+    "messages_per_second",
+    "latency_p50_ms",
+    "latency_p95_ms",
+    "latency_p99_ms",
+    "latency_max_ms",
+    "delivery_ratio",
+    "memory_per_connection_kb",
+    "redis_round_trips_per_message",
+)
+LOWER_IS_BETTER = {
+    "latency_p50_ms",
+    "latency_p95_ms",
+    "latency_p99_ms",
+    "latency_max_ms",
+    "memory_per_connection_kb",
+    "redis_round_trips_per_message",
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parses action weights, e.g. "message=1,typing=3,delivered=1,seen=1"."""
+    weights = {}
+    for pair in mix.split(","):
+        action, _, weight = pair.partition("=")
+        if action.strip() not in ACTIONS:
+            raise ValueError(f"Unknown action {action.strip()!r}, expected one of {', '.join(ACTIONS)}")
+        weights[action.strip()] = float(weight)
+    return weights
+
+
+def _percentile(samples, p: float) -> float:
+    samples = sorted(samples)
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class SimulatedClient:
+    def __init__(self, user, room_id, websocket: InProcessWebSocket, rng: random.Random):
+        self.user_id = str(user.id)
+        self.room_id = str(room_id)
+        self.websocket = websocket
+        self.rng = rng
+        self.sent: Counter = Counter()
+        self.received: Counter = Counter()
+        self.latencies: List[float] = []
+        self.undelivered: List[str] = []
+        self.unseen: List[str] = []
+
+    async def read(self):
+        """Consumes every frame the server sends until the socket closes."""
+        try:
+            while True:
+                event = json.loads(await self.websocket.receive())
+                self.received[event["type"]] += 1
+                if event["type"] != "new_message":
+                    continue
+                received_at = time.perf_counter()
+                message = event["data"]
+                self.latencies.append(received_at - float(message["content"].split()[1]))
+                if message["sender_id"] != self.user_id:
+                    self.undelivered.append(message["id"])
+                    self.unseen.append(message["id"])
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+
+    async def act(self, action: str):
+        if action == "message":
+            frame = {"type": "send_message", "room_id": self.room_id, "content": f"bench {time.perf_counter()!r}"}
+        elif action == "typing":
+            frame = {"type": "typing", "room_id": self.room_id, "is_typing": True}
+        else:
+            frame_type, pending = RECEIPTS[action]
+            message_ids = getattr(self, pending)
+            if not message_ids:
+                return
+            frame = {"type": frame_type, "room_id": self.room_id, "message_ids": message_ids}
+            setattr(self, pending, [])
+        self.sent[action] += 1
+        await self.websocket.send_text(json.dumps(frame))
+
+    async def run(self, weights: Dict[str, float], rate: float, until: float):
+        """
+        Acts on a seeded schedule of absolute times (open loop), so a slow
+        server delays the actions but does not make the client send fewer.
+        """
+        actions, action_weights = list(weights), list(weights.values())
+        next_at = time.perf_counter()
+        while True:
+            next_at += self.rng.expovariate(rate)
+            if next_at >= until:
+                return
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            await self.act(self.rng.choices(actions, weights=action_weights)[0])
+
+
+async def _connect(users, rooms_by_user, seed: int, batch_size: int = 200) -> List[SimulatedClient]:
+    clients = []
+    for start in range(0, len(users), batch_size):
+        batch = []
+        for i, user in enumerate(users[start:start + batch_size], start):
+            token = create_access_token({"user_id": str(user.id)})
+            websocket = InProcessWebSocket(app, "/ws", f"token={token}")
+            batch.append(SimulatedClient(user, rooms_by_user[user.id], websocket, random.Random(seed + i)))
+        await asyncio.gather(*(client.websocket.connect() for client in batch))
+        for client in batch:
+            await client.websocket.send_text(json.dumps({"type": "join_room", "room_id": client.room_id}))
+        clients.extend(batch)
+    # Let every join be processed before the load starts
+    await asyncio.sleep(0.5)
+    return clients
+
+
+async def _drain(clients, expected: int, timeout: float):
+    """Waits for the new_message deliveries still in flight."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if sum(client.received["new_message"] for client in clients) >= expected:
+            return
+        await asyncio.sleep(0.05)
+
+
+def _features() -> List[str]:
+    """Returns the REQUIRED_FEATURES this tree provides."""
+    features = []
+    for feature, (module, attribute) in REQUIRED_FEATURES.items():
+        try:
+            if hasattr(importlib.import_module(module), attribute):
+                features.append(feature)
+        except ImportError:
+            pass
+    return features
+
+
+def _missing_features(results: dict) -> List[str]:
+    return [feature for feature in REQUIRED_FEATURES if feature not in results.get("features", ())]
+
+
+async def run(args) -> dict:
+    weights = parse_mix(args.mix)
+    engine = create_bench_engine(pool_size=args.pool_size, max_overflow=0, pool_timeout=30)
+    session_factory = create_session_factory(engine)
+    await create_schema(engine)
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    receipt_batcher.apply = build_receipt_flush(session_factory, websocket_manager, membership_cache, event_log)
+
+    if args.redis_url:
+        websocket_manager.redis_url = args.redis_url
+        await websocket_manager.init_redis()
+    else:
+        await websocket_manager.init_redis(FakeRedis())
+    await typing_aggregator.start()
+    await receipt_batcher.start()
+
+    users = await seed_users(session_factory, args.clients)
+    rooms_by_user = {}
+    for start in range(0, len(users), args.room_size):
+        members = users[start:start + args.room_size]
+        room = await seed_group_room(session_factory, members, name=f"load-{start // args.room_size}")
+        rooms_by_user.update({member.id: room.id for member in members})
+    room_sizes = Counter(str(room_id) for room_id in rooms_by_user.values())
+
+    tracemalloc.start()
+    heap_before = tracemalloc.get_traced_memory()[0]
+    clients = await _connect(users, rooms_by_user, args.seed)
+    heap_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    readers = [asyncio.create_task(client.read()) for client in clients]
+    # Only frames caused by the load are counted, not the join broadcasts
+    await asyncio.sleep(0.5)
+    for client in clients:
+        client.received.clear()
+    redis_client = websocket_manager.redis_client
+    round_trips_before = getattr(redis_client, "round_trips", 0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client.run(weights, args.rate, started + args.duration) for client in clients))
+    elapsed = time.perf_counter() - started
+
+    # Every member of the room, the sender included, receives each message
+    expected = sum(room_sizes[client.room_id] * client.sent["message"] for client in clients)
+    await _drain(clients, expected, timeout=args.drain_timeout)
+    round_trips = getattr(redis_client, "round_trips", 0) - round_trips_before
+
+    sent, received, latencies = Counter(), Counter(), []
+    for client in clients:
+        sent.update(client.sent)
+        received.update(client.received)
+        latencies.extend(client.latencies)
+
+    await asyncio.gather(*(client.websocket.close() for client in clients))
+    for reader in readers:
+        reader.cancel()
+    await typing_aggregator.stop()
+    await receipt_batcher.stop()
+    await websocket_manager.close()
+    await engine.dispose()
+
+    return {
+        "commit": _git_commit(),
+        "features": _features(),
+        "options": {
+            "clients": args.clients,
+            "room_size": args.room_size,
+            "duration": args.duration,
+            "rate": args.rate,
+            "mix": args.mix,
+            "pool_size": args.pool_size,
+            "seed": args.seed,
+            "redis": "real" if args.redis_url else "fake",
+        },
+        "sent": dict(sent),
+        "received": dict(received),
+        "actions_per_second": sum(sent.values()) / elapsed,
+        "messages_per_second": sent["message"] / elapsed,
+        "frames_received_per_second": sum(received.values()) / elapsed,
+        "latency_p50_ms": _percentile(latencies, 0.50),
+        "latency_p95_ms": _percentile(latencies, 0.95),
+        "latency_p99_ms": _percentile(latencies, 0.99),
+        "latency_max_ms": max(latencies) * 1000 if latencies else 0.0,
+        "delivery_ratio": received["new_message"] / expected if expected else 1.0,
+        "memory_per_connection_kb": (heap_after - heap_before) / len(clients) / 1024,
+        # Counted by the fake only
+        "redis_round_trips_per_message": round_trips / sent["message"] if sent["message"] else 0.0,
+    }
+
+
+def _print_results(results: dict, baseline: dict = None):
+    options = results["options"]
+    print(
+        f"{options['clients']} clients in rooms of {options['room_size']}, {options['rate']} actions/s each "
+        f"({options['mix']}) for {options['duration']}s, {options['redis']} Redis, commit {results['commit']}"
+    )
+    print(f"sent     : {results['sent']}")
+    print(f"received : {results['received']}\n")
+
+    if baseline is None:
+        for key in COMPARED:
+            print(f"{key:>30} | {results[key]:>12.2f}")
+        return
+
+    print(f"{'':>30} | {baseline['commit']:>12} | {results['commit']:>12} | {'change':>8}")
+    print("-" * 72)
+    for key in COMPARED:
+        before, after = baseline.get(key, 0.0), results[key]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        if before and after != before and (after < before) == (key in LOWER_IS_BETTER):
+            change += " better"
+        print(f"{key:>30} | {before:>12.2f} | {after:>12.2f} | {change:>8}")
+    if baseline.get("options") != options:
+        print(f"\nwarning: the baseline ran with different options: {baseline.get('options')}")
+
+
+async def main(args):
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        missing = _missing_features(baseline)
+        if missing:
+            raise SystemExit(
+                f"{args.compare} was recorded on a tree without {', '.join(missing)}; "
+                "the benchmark needs them on both sides, so the runs are not comparable"
+            )
+
+    # Keep per-connection log lines and prints out of the measurement
+    logging.getLogger("app_logger").setLevel(logging.WARNING)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = await run(args)
+
+    _print_results(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nresults written to {args.json}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--room-size", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load")
+    parser.add_argument("--rate", type=float, default=2.0, help="Actions per second per client")
+    parser.add_argument("--mix", default="message=1,typing=3,delivered=1,seen=1", help="Relative action weights")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--drain-timeout", type=float, default=10.0, help="Seconds to wait for in-flight deliveries")
+    parser.add_argument("--redis-url", default=None, help="Use a real Redis server instead of the fake")
+    parser.add_argument("--json", default=None, help="Write the results to this file")
+    parser.add_argument("--compare", default=None, help="Compare with the results file of a previous run")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,133 @@
+# bench/login_storm_benchmark.py
+"""
+Load test: WebSocket latency during a login storm.
+
+Connects --sockets clients to `/ws` in one room and has each of them send a
+typing indicator every --interval-ms, timing how long it takes for the
+room broadcast to come back. Half way through, --logins concurrent
+`POST /api/auth/login` requests hit the same app.
+
+Run it twice to compare: `--inline` verifies passwords on the event loop
+as the app used to, the default uses the bounded password hashing pool.
+With the pool, WebSocket p99 during the storm should stay close to the
+baseline; inline, every socket freezes while bcrypt runs.
+
+Usage:
+    python -m bench.login_storm_benchmark [--logins 100] [--sockets 20] [--inline]
+"""
+import bench.app_env  # noqa: F401  (must precede app imports)
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.core import security
+from app.core.security import create_access_token
+from app.database.postgres import get_db_session, get_session_factory
+from app.globals import websocket_manager
+from app.main import app
+from app.services import auth_service
+from bench.asgi_websocket import InProcessWebSocket
+from bench.database import create_bench_engine, create_schema, create_session_factory, seed_group_room, seed_users
+from bench.fake_redis import FakeRedis
+
+
+async def _inline_verify(plain_password: str, hashed_password: str) -> bool:
+    return security.verify_password(plain_password, hashed_password)
+
+
+def _percentile(samples, p: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+
+async def _probe(client: InProcessWebSocket, user_id: str, room_id: str, interval: float, stop: asyncio.Event, samples: list):
+    """Sends typing indicators and records the time until the client's own one is broadcast back."""
+    payload = json.dumps({"type": "typing", "room_id": room_id, "is_typing": True})
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.send_text(payload)
+        while True:
+            frame = json.loads(await client.receive())
+            if frame["type"] == "typing_indicator" and frame["data"]["user_id"] == user_id:
+                break
+        samples.append((start, time.perf_counter() - start))
+        await asyncio.sleep(interval)
+
+
+async def main(logins: int, sockets: int, interval_ms: float, inline: bool):
+    if inline:
+        auth_service.verify_password_async = _inline_verify
+
+    engine = create_bench_engine(pool_size=20, max_overflow=20)
+    session_factory = create_session_factory(engine)
+    await create_schema(engine)
+
+    async def bench_db_session():
+        async with session_factory() as session:
+            yield session
+            await session.commit()
+
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    app.dependency_overrides[get_db_session] = bench_db_session
+    await websocket_manager.init_redis(FakeRedis())
+
+    users = await seed_users(session_factory, max(sockets, logins))
+    room = await seed_group_room(session_factory, users[:sockets])
+
+    clients = [
+        InProcessWebSocket(app, "/ws", f"token={create_access_token({'user_id': str(user.id)})}")
+        for user in users[:sockets]
+    ]
+    await asyncio.gather(*(client.connect() for client in clients))
+    for client in clients:
+        await client.send_text(json.dumps({"type": "join_room", "room_id": str(room.id)}))
+    await asyncio.sleep(0.2)
+
+    samples: list = []
+    stop = asyncio.Event()
+    probes = [
+        asyncio.create_task(_probe(client, str(user.id), str(room.id), interval_ms / 1000, stop, samples))
+        for client, user in zip(clients, users)
+    ]
+
+    await asyncio.sleep(1.0)
+    storm_start = time.perf_counter()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+        responses = await asyncio.gather(*(
+            http.post("/api/auth/login", json={"username": user.username, "password": "password123"})
+            for user in users[:logins]
+        ))
+    storm_end = time.perf_counter()
+    await asyncio.sleep(1.0)
+    stop.set()
+    await asyncio.gather(*probes, return_exceptions=True)
+
+    baseline = [latency for sent, latency in samples if sent < storm_start]
+    during = [latency for sent, latency in samples if storm_start <= sent <= storm_end]
+    ok = sum(1 for response in responses if response.status_code == 200)
+
+    print(f"mode                     : {'inline bcrypt' if inline else 'password hashing pool'}")
+    print(f"logins                   : {ok}/{logins} ok in {storm_end - storm_start:.2f}s")
+    print(f"websocket p50 / p99 idle : {_percentile(baseline, 0.50):8.2f} / {_percentile(baseline, 0.99):8.2f} ms")
+    print(f"websocket p50 / p99 storm: {_percentile(during, 0.50):8.2f} / {_percentile(during, 0.99):8.2f} ms")
+    print(f"websocket max during storm: {_percentile(during, 1.0):7.2f} ms ({len(during)} samples)")
+
+    await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+    await websocket_manager.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--sockets", type=int, default=20)
+    parser.add_argument("--interval-ms", type=float, default=20.0)
+    parser.add_argument("--inline", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.sockets, args.interval_ms, args.inline))
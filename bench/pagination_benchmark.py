@@ -0,0 +1,117 @@
+# bench/pagination_benchmark.py
+"""
+Compares LIMIT/OFFSET with keyset (cursor) pagination of room history at
+increasing scrollback depths.
+
+Seeds a single room with --rows messages (1M by default), then times fetching
+one page at each depth with OFFSET and with the `before` cursor query used by
+ChatService.get_room_messages (backed by ix_messages_room_id_created_at_id).
+
+Usage:
+    python -m bench.pagination_benchmark [--rows 1000000] [--page-size 50]
+"""
+import bench.app_env  # noqa: F401  (must precede app imports)
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select, tuple_
+
+from app.models.message import Message
+from app.models.room import Room, RoomType
+from app.schemas.message import MessageStatus, MessageType
+from bench.database import create_bench_engine, create_schema, create_session_factory, seed_users
+
+REPEATS = 5
+
+
+async def _seed_messages(session_factory, room_id, sender_id, rows: int, chunk: int = 50_000):
+    base = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    async with session_factory() as session:
+        for start in range(0, rows, chunk):
+            await session.execute(
+                insert(Message),
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "room_id": room_id,
+                        "sender_id": sender_id,
+                        "content": f"message {i}",
+                        "message_type": MessageType.TEXT,
+                        "status": MessageStatus.SENT,
+                        "is_private": False,
+                        "is_edited": False,
+                        "is_deleted": False,
+                        "created_at": base + timedelta(milliseconds=i),
+                    }
+                    for i in range(start, min(start + chunk, rows))
+                ],
+            )
+            await session.commit()
+
+
+def _history_query(room_id, page_size: int):
+    return (
+        select(Message.id, Message.created_at, Message.content)
+        .where(Message.room_id == room_id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(page_size)
+    )
+
+
+async def _time_query(session_factory, query) -> float:
+    best = float("inf")
+    async with session_factory() as session:
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            (await session.execute(query)).all()
+            best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def main(rows: int, page_size: int):
+    engine = create_bench_engine(pool_size=2)
+    session_factory = create_session_factory(engine)
+    await create_schema(engine)
+
+    (sender,) = await seed_users(session_factory, 1)
+    async with session_factory() as session:
+        room = Room(name="history", created_by=sender.id, room_type=RoomType.GROUP)
+        session.add(room)
+        await session.commit()
+
+    print(f"Seeding {rows:,} messages...")
+    start = time.perf_counter()
+    await _seed_messages(session_factory, room.id, sender.id, rows)
+    print(f"Seeded in {time.perf_counter() - start:.1f}s\n")
+
+    depths = sorted({d for d in (0, 1_000, 10_000, 100_000, rows // 2, rows - page_size) if 0 <= d <= rows - page_size})
+    print(f"{'depth':>10} | {'offset (ms)':>12} | {'cursor (ms)':>12}")
+    print("-" * 40)
+    for depth in depths:
+        offset_query = _history_query(room.id, page_size).offset(depth)
+
+        # Position of the newest message on the page at this depth (not timed)
+        async with session_factory() as session:
+            anchor = (await session.execute(_history_query(room.id, 1).offset(depth))).one()
+        cursor_query = (
+            _history_query(room.id, page_size)
+            .where(tuple_(Message.created_at, Message.id) < tuple_(anchor.created_at, anchor.id))
+        ) if depth else _history_query(room.id, page_size)
+
+        offset_ms = await _time_query(session_factory, offset_query)
+        cursor_ms = await _time_query(session_factory, cursor_query)
+        print(f"{depth:>10,} | {offset_ms:>12.2f} | {cursor_ms:>12.2f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.page_size))
@@ -0,0 +1,131 @@
+# bench/receipt_benchmark.py
+"""
+Cost of delivered/seen acknowledgements while readers scroll a busy room.
+
+`--readers` members each acknowledge `--messages` messages one frame at a
+time, as a client does while scrolling. The legacy path is reproduced as
+it was: per frame, a SELECT loading every membership of the room, an
+UPDATE, a COMMIT and a member fan-out. It is compared with ReceiptBatcher,
+which applies the whole burst in one flush: one SELECT and one executemany
+UPDATE advancing each reader's cursor.
+
+Database round trips (statements and commits, each delayed by --rtt-ms)
+and Redis publishes are counted.
+
+Usage:
+    python -m bench.receipt_benchmark [--readers 20] [--messages 50] [--rtt-ms 0.5]
+"""
+import bench.app_env  # noqa: F401  (must precede app imports)
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.models.message import Message, MessageStatus
+from app.models.room import Room
+from app.services.chat_service import build_receipt_flush
+from app.services.room_service import RoomService
+from app.utils.receipt_batcher import ReceiptBatcher
+from app.utils.serialization import dump_event
+from app.utils.websocket_manager import WebsocketManager
+from bench.database import create_bench_engine, create_schema, create_session_factory, seed_group_room, seed_users
+from bench.fake_redis import FakeRedis
+
+
+async def legacy_mark_seen(session_factory, manager, message_ids, user_id):
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Message)
+            .options(selectinload(Message.room).joinedload(Room.memberships))
+            .filter(Message.id.in_(message_ids))
+        )
+        messages = result.unique().scalars().all()
+        valid = [
+            m for m in messages
+            if any(member.user_id == user_id for member in m.room.memberships)
+            and m.status in (MessageStatus.SENT, MessageStatus.DELIVERED)
+        ]
+        if not valid:
+            return
+        await db.execute(update(Message).where(Message.id.in_([m.id for m in valid])).values(status=MessageStatus.SEEN))
+        await db.commit()
+        member_ids = await RoomService(db).get_room_member_ids(valid[0].room_id)
+        payload = dump_event("message_status_update", {
+            "room_id": str(valid[0].room_id), "message_ids": [str(m.id) for m in valid], "status": "seen",
+        })
+        await manager.send_to_users(member_ids, payload)
+
+
+async def _seed_messages(session_factory, room, sender, count: int) -> list:
+    async with session_factory() as db:
+        rows = await db.execute(
+            insert(Message).returning(Message.id),
+            [{"room_id": room.id, "sender_id": sender.id, "content": f"m{i}", "status": MessageStatus.SENT} for i in range(count)],
+        )
+        ids = list(rows.scalars().all())
+        await db.commit()
+    return ids
+
+
+async def main(readers: int, messages: int, rtt_ms: float):
+    engine = create_bench_engine(pool_size=1)
+    session_factory = create_session_factory(engine)
+    await create_schema(engine)
+    users = await seed_users(session_factory, 50)
+    room = await seed_group_room(session_factory, users)
+    redis = FakeRedis()
+    manager = WebsocketManager("redis://fake")
+    with contextlib.redirect_stdout(io.StringIO()):
+        await manager.init_redis(redis)
+
+    counter = {"round_trips": 0}
+
+    def round_trip(*_):
+        counter["round_trips"] += 1
+        if rtt_ms:
+            time.sleep(rtt_ms / 1000)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", round_trip)
+    event.listen(engine.sync_engine, "commit", round_trip)
+
+    print(f"{readers} readers x {messages} seen frames, simulated RTT {rtt_ms}ms\n")
+    print(f"{'path':<10} | {'db round trips':>14} | {'publishes':>9} | {'total (ms)':>10}")
+    print("-" * 52)
+
+    async def acknowledge_legacy(ids):
+        for user in users[1:readers + 1]:
+            for message_id in ids:
+                await legacy_mark_seen(session_factory, manager, [message_id], user.id)
+
+    async def acknowledge_batched(ids):
+        batcher = ReceiptBatcher(build_receipt_flush(session_factory, manager))
+        for user in users[1:readers + 1]:
+            for message_id in ids:
+                batcher.add(user.id, MessageStatus.SEEN, [message_id], room.id)
+        await batcher.flush()
+
+    for name, acknowledge in (("legacy", acknowledge_legacy), ("batched", acknowledge_batched)):
+        ids = await _seed_messages(session_factory, room, users[0], messages)
+        counter["round_trips"], published = 0, redis.published
+        started = time.perf_counter()
+        await acknowledge(ids)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{name:<10} | {counter['round_trips']:>14} | {redis.published - published:>9} | {elapsed:>10.1f}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        await manager.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.readers, args.messages, args.rtt_ms))
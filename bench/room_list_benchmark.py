@@ -0,0 +1,181 @@
+# bench/room_list_benchmark.py
+"""
+Compares the room list computed from messages with the materialized room
+summaries, as the rooms' history grows.
+
+Seeds one reader in --rooms group rooms, each with a second member who has
+posted messages, and the reader's cursor halfway through each room. At each
+history size it times:
+
+  aggregate   the previous RoomService.get_user_rooms_with_details queries:
+              row_number() over every message of the user's rooms for the last
+              message, and a count from each read cursor for unread messages
+  summary     the current get_user_rooms_with_details, reading room_summaries
+              and room_memberships.unread_count
+
+and the share of a send (ChatService._validate_and_send_message) spent
+maintaining the summary and counters.
+
+Usage:
+    python -m bench.room_list_benchmark [--rooms 50] [--sizes 100,1000,10000]
+"""
+import bench.app_env  # noqa: F401  (must precede app imports)
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, event, func, insert, or_, select, tuple_, update
+
+from app.database.room_summaries import rebuild_room_summaries
+from app.models.message import Message
+from app.models.room_membership import RoomMembership
+from app.schemas.message import MessageStatus, MessageType
+from app.services.chat_service import ChatService
+from app.services.room_service import RoomService
+from bench.database import create_bench_engine, create_schema, create_session_factory, seed_group_room, seed_users
+
+REPEATS = 5
+SENDS = 200
+
+
+async def _seed_messages(session_factory, rooms, sender_id, start: int, stop: int):
+    base = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    async with session_factory() as session:
+        for room in rooms:
+            await session.execute(insert(Message), [
+                {
+                    "id": uuid.uuid4(),
+                    "room_id": room.id,
+                    "sender_id": sender_id,
+                    "content": f"message {i}",
+                    "message_type": MessageType.TEXT,
+                    "status": MessageStatus.SENT,
+                    "is_private": False,
+                    "is_edited": False,
+                    "is_deleted": False,
+                    "created_at": base + timedelta(milliseconds=i),
+                }
+                for i in range(start, stop)
+            ])
+        await session.commit()
+
+
+async def _move_cursors_to_middle(session_factory, rooms, reader_id, size: int):
+    async with session_factory() as session:
+        for room in rooms:
+            middle = (await session.execute(
+                select(Message.id, Message.created_at)
+                .where(Message.room_id == room.id)
+                .order_by(Message.created_at, Message.id)
+                .offset(size // 2)
+                .limit(1)
+            )).one()
+            await session.execute(
+                update(RoomMembership)
+                .where(RoomMembership.room_id == room.id, RoomMembership.user_id == reader_id)
+                .values(last_read_message_id=middle.id, last_read_at=middle.created_at)
+            )
+        await session.commit()
+
+
+async def _aggregate_room_list(session, user_id):
+    """The room list as computed before room summaries existed."""
+    room_ids = (await session.execute(
+        select(RoomMembership.room_id).where(RoomMembership.user_id == user_id)
+    )).scalars().all()
+    ranked = select(Message, func.row_number().over(
+        partition_by=Message.room_id,
+        order_by=Message.created_at.desc()
+    ).label("row_num")).where(Message.room_id.in_(room_ids)).subquery()
+    (await session.execute(select(ranked).where(ranked.c.row_num == 1))).all()
+
+    read_position = tuple_(RoomMembership.last_read_at, RoomMembership.last_read_message_id)
+    (await session.execute(
+        select(RoomMembership.room_id, func.count(Message.id))
+        .join(Message, and_(
+            Message.room_id == RoomMembership.room_id,
+            Message.sender_id != user_id,
+            or_(RoomMembership.last_read_at.is_(None), tuple_(Message.created_at, Message.id) > read_position),
+        ))
+        .where(RoomMembership.user_id == user_id)
+        .group_by(RoomMembership.room_id)
+    )).all()
+
+
+async def _best_ms(session_factory, run) -> float:
+    best = float("inf")
+    async with session_factory() as session:
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            await run(session)
+            best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def _time_sends(engine, session_factory, sender, room_id):
+    """Mean milliseconds per send, and the part spent in the summary statements."""
+    summary_seconds = 0.0
+    started = {}
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        started[id(cursor)] = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        nonlocal summary_seconds
+        elapsed = time.perf_counter() - started.pop(id(cursor))
+        if "room_summaries" in statement or statement.lstrip().upper().startswith("UPDATE ROOM_MEMBERSHIPS"):
+            summary_seconds += elapsed
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before)
+    event.listen(engine.sync_engine, "after_cursor_execute", after)
+    try:
+        async with session_factory() as session:
+            service = ChatService(room_service=RoomService(session), db=session, websocket_manager=None, push_queue=None)
+            start = time.perf_counter()
+            for i in range(SENDS):
+                await service._validate_and_send_message(sender=sender, room_id=room_id, content=f"bench {i}")
+            total = time.perf_counter() - start
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before)
+        event.remove(engine.sync_engine, "after_cursor_execute", after)
+    return total / SENDS * 1000, summary_seconds / SENDS * 1000
+
+
+async def main(room_count: int, sizes):
+    engine = create_bench_engine(pool_size=2)
+    session_factory = create_session_factory(engine)
+    await create_schema(engine)
+
+    reader, writer = await seed_users(session_factory, 2)
+    rooms = [await seed_group_room(session_factory, [reader, writer], name=f"room-{i}") for i in range(room_count)]
+
+    print(f"{room_count} rooms per user\n")
+    print(f"{'messages/room':>13} | {'aggregate (ms)':>14} | {'summary (ms)':>12}")
+    print("-" * 47)
+    seeded = 0
+    for size in sizes:
+        await _seed_messages(session_factory, rooms, writer.id, seeded, size)
+        seeded = size
+        await _move_cursors_to_middle(session_factory, rooms, reader.id, size)
+        async with engine.begin() as conn:
+            await conn.run_sync(rebuild_room_summaries)
+
+        aggregate_ms = await _best_ms(session_factory, lambda s: _aggregate_room_list(s, reader.id))
+        summary_ms = await _best_ms(session_factory, lambda s: RoomService(s).get_user_rooms_with_details(reader.id))
+        print(f"{size:>13,} | {aggregate_ms:>14.2f} | {summary_ms:>12.2f}")
+
+    send_ms, summary_ms = await _time_sends(engine, session_factory, writer, rooms[0].id)
+    print(f"\nsend: {send_ms:.2f} ms, of which {summary_ms:.2f} ms updating the summary and unread counters")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--sizes", default="100,1000,10000")
+    args = parser.parse_args()
+    asyncio.run(main(args.rooms, [int(size) for size in args.sizes.split(",")]))
@@ -0,0 +1,124 @@
+# bench/send_path_benchmark.py
+"""
+Measures per-message send latency of the legacy five-round-trip path against
+the single-statement INSERT ... SELECT ... WHERE EXISTS ... RETURNING path
+used by ChatService._validate_and_send_message.
+
+The legacy path is reproduced here as it was: room + membership SELECT,
+sender SELECT, INSERT, COMMIT and a refresh SELECT. SQLite runs in-process,
+so --rtt-ms adds a simulated network round trip to every statement and
+commit to approximate a remote Postgres.
+
+Usage:
+    python -m bench.send_path_benchmark [--messages 2000] [--rtt-ms 0.5]
+"""
+import bench.app_env  # noqa: F401  (must precede app imports)
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import and_, event, select
+
+from app.models.message import Message, MessageStatus
+from app.models.room import Room
+from app.models.room_membership import RoomMembership
+from app.models.user import User
+from app.schemas.message import MessageResponse, MessageType
+from app.services.chat_service import ChatService
+from app.services.room_service import RoomService
+from bench.database import create_bench_engine, create_schema, create_session_factory, seed_group_room, seed_users
+
+
+async def legacy_send(db, user_id, room_id, content: str) -> MessageResponse:
+    room = await db.execute(
+        select(Room).join(RoomMembership).filter(
+            and_(Room.id == room_id, RoomMembership.user_id == user_id)
+        )
+    )
+    if not room.scalar_one_or_none():
+        raise RuntimeError("not a member")
+    sender = (await db.execute(select(User).filter(User.id == user_id))).scalar_one()
+    message = Message(
+        room_id=room_id,
+        sender_id=user_id,
+        content=content,
+        message_type=MessageType.TEXT,
+        status=MessageStatus.SENT,
+        is_private=False,
+    )
+    db.add(message)
+    await db.commit()
+    await db.refresh(message)
+    return MessageResponse(
+        id=message.id,
+        room_id=message.room_id,
+        sender_id=message.sender_id,
+        sender_username=sender.username,
+        sender_display_name=sender.display_name,
+        content=message.content,
+        status=message.status,
+        timestamp=message.created_at,
+        message_type=message.message_type,
+        is_edited=message.is_edited,
+        is_deleted=message.is_deleted,
+    )
+
+
+def _percentile(samples, p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+
+async def _run(label, session_factory, counter, messages: int, send):
+    latencies = []
+    counter["round_trips"] = 0
+    for i in range(messages):
+        async with session_factory() as db:
+            start = time.perf_counter()
+            await send(db, f"message {i}")
+            latencies.append(time.perf_counter() - start)
+    print(
+        f"{label:<14} | {counter['round_trips'] / messages:>11.1f} | "
+        f"{_percentile(latencies, 0.50):>8.3f} | {_percentile(latencies, 0.95):>8.3f} | "
+        f"{_percentile(latencies, 0.99):>8.3f}"
+    )
+
+
+async def main(messages: int, rtt_ms: float):
+    engine = create_bench_engine(pool_size=1)
+    session_factory = create_session_factory(engine)
+    await create_schema(engine)
+    users = await seed_users(session_factory, 50)
+    room = await seed_group_room(session_factory, users)
+    sender = users[0]
+
+    counter = {"round_trips": 0}
+
+    def round_trip(*_):
+        counter["round_trips"] += 1
+        if rtt_ms:
+            time.sleep(rtt_ms / 1000)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", round_trip)
+    event.listen(engine.sync_engine, "commit", round_trip)
+
+    async def fast_send(db, content):
+        chat_service = ChatService(room_service=RoomService(db), db=db, websocket_manager=None, push_queue=None)
+        await chat_service._validate_and_send_message(sender=sender, room_id=room.id, content=content)
+
+    print(f"{messages} messages, simulated RTT {rtt_ms}ms\n")
+    print(f"{'path':<14} | {'round trips':>11} | {'p50 (ms)':>8} | {'p95 (ms)':>8} | {'p99 (ms)':>8}")
+    print("-" * 62)
+    await _run("legacy", session_factory, counter, messages, lambda db, c: legacy_send(db, sender.id, room.id, c))
+    await _run("insert-select", session_factory, counter, messages, fast_send)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.rtt_ms))
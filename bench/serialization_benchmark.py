@@ -0,0 +1,88 @@
+# bench/serialization_benchmark.py
+"""
+Micro-benchmark of the WebSocket serialization hot path.
+
+Times, per serializer backend:
+  * encoding one `new_message` event (MessageResponse) to bytes,
+  * decoding a typical inbound `send_message` frame,
+and compares them with the previous approach,
+`json.dumps({"type": ..., "data": model.model_dump()}, default=str)`.
+
+The last column shows the cost of a 500-member room fan-out if every
+recipient got its own encoding, against encoding once and reusing the bytes.
+
+Usage:
+    python -m bench.serialization_benchmark [--iterations 20000] [--recipients 500]
+"""
+import bench.app_env  # noqa: F401  (must precede app imports)
+
+import argparse
+import json
+import timeit
+import uuid
+from datetime import datetime, timezone
+
+from app.schemas.message import MessageResponse, MessageStatus, MessageType
+from app.utils.serialization import SERIALIZERS, get_serializer, orjson
+
+
+def _message() -> MessageResponse:
+    return MessageResponse(
+        id=uuid.uuid4(),
+        room_id=uuid.uuid4(),
+        sender_id=uuid.uuid4(),
+        sender_username="alice",
+        sender_display_name="Alice Example",
+        content="Hey team, the deploy finished and everything looks green on the dashboards.",
+        status=MessageStatus.SENT,
+        timestamp=datetime.now(timezone.utc),
+        message_type=MessageType.TEXT,
+        is_edited=False,
+        is_deleted=False,
+    )
+
+
+def _best_us(func, iterations: int) -> float:
+    return min(timeit.repeat(func, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def main(iterations: int, recipients: int):
+    message = _message()
+    inbound = json.dumps({
+        "type": "send_message",
+        "room_id": str(uuid.uuid4()),
+        "content": message.content,
+        "message_type": "text",
+    })
+
+    legacy_encode = _best_us(
+        lambda: json.dumps({"type": "new_message", "data": message.model_dump()}, default=str), iterations
+    )
+    legacy_decode = _best_us(lambda: json.loads(inbound), iterations)
+
+    print(f"{iterations} iterations, fan-out to {recipients} recipients\n")
+    print(f"{'serializer':<12} | {'encode (us)':>11} | {'decode (us)':>11} | {'per-recipient (ms)':>18} | {'once (ms)':>9}")
+    print("-" * 74)
+    print(
+        f"{'legacy':<12} | {legacy_encode:>11.2f} | {legacy_decode:>11.2f} | "
+        f"{legacy_encode * recipients / 1000:>18.3f} | {legacy_encode / 1000:>9.3f}"
+    )
+    for name in SERIALIZERS:
+        if name == "orjson" and orjson is None:
+            print(f"{name:<12} | not installed")
+            continue
+        serializer = get_serializer(name)
+        encode = _best_us(lambda: serializer.dumps({"type": "new_message", "data": message}), iterations)
+        decode = _best_us(lambda: serializer.loads(inbound), iterations)
+        print(
+            f"{name:<12} | {encode:>11.2f} | {decode:>11.2f} | "
+            f"{encode * recipients / 1000:>18.3f} | {encode / 1000:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--recipients", type=int, default=500)
+    args = parser.parse_args()
+    main(args.iterations, args.recipients)
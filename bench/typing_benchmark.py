@@ -0,0 +1,97 @@
+# bench/typing_benchmark.py
+"""
+Redis traffic caused by typing indicators in one busy room.
+
+`--typers` users type in a room of `--members` listeners for `--seconds`,
+each sending a `typing` frame per keystroke at `--keystrokes` per second.
+Compares publishing one `typing_indicator` per frame (the previous
+behaviour) with TypingAggregator, and reports Redis publishes, round trips
+and frames delivered to sockets.
+
+Usage:
+    python -m bench.typing_benchmark [--typers 10] [--members 200] [--seconds 3] [--keystrokes 8]
+"""
+import bench.app_env  # noqa: F401  (must precede app imports)
+
+import argparse
+import asyncio
+import contextlib
+import io
+import uuid
+
+from app.utils.serialization import dump_event
+from app.utils.typing_aggregator import TypingAggregator
+from app.utils.websocket_manager import WebsocketManager
+from bench.fake_redis import FakeRedis
+
+
+class CountingWebSocket:
+    def __init__(self):
+        self.received = 0
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, message: str):
+        self.received += 1
+
+
+async def _run(aggregated: bool, typers: int, members: int, seconds: float, keystrokes: float) -> dict:
+    redis = FakeRedis(latency=0.0005)
+    manager = WebsocketManager("redis://fake")
+    await manager.init_redis(redis)
+    room_id = uuid.uuid4()
+    sockets = []
+    for _ in range(members):
+        websocket, user_id = CountingWebSocket(), uuid.uuid4()
+        await manager.connect(websocket, user_id)
+        await manager.join_room(user_id, room_id)
+        sockets.append(websocket)
+
+    aggregator = TypingAggregator(manager)
+    await aggregator.start()
+    round_trips, published = redis.round_trips, redis.published
+
+    async def type_(user_id: uuid.UUID, name: str):
+        for _ in range(int(seconds * keystrokes)):
+            if aggregated:
+                aggregator.update(room_id, user_id, name)
+            else:
+                payload = dump_event("typing_indicator", {
+                    "room_id": str(room_id), "user_id": str(user_id), "username": name, "is_typing": True,
+                })
+                await manager.broadcast_to_room(room_id, payload)
+            await asyncio.sleep(1 / keystrokes)
+
+    await asyncio.gather(*(type_(uuid.uuid4(), f"user{i}") for i in range(typers)))
+    await asyncio.sleep(aggregator.window_seconds * 2)
+    result = {
+        "publishes": redis.published - published,
+        "round_trips": redis.round_trips - round_trips,
+        "delivered": sum(websocket.received for websocket in sockets),
+    }
+    await aggregator.stop()
+    await manager.close()
+    return result
+
+
+async def main(typers: int, members: int, seconds: float, keystrokes: float):
+    frames = int(typers * seconds * keystrokes)
+    print(f"{typers} typers x {keystrokes}/s for {seconds}s ({frames} frames), {members} listeners\n")
+    print(f"{'mode':<12} | {'publishes':>9} | {'round trips':>11} | {'frames delivered':>16}")
+    print("-" * 58)
+    for name, aggregated in (("per frame", False), ("aggregated", True)):
+        # The manager logs every connect and join; keep the table readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await _run(aggregated, typers, members, seconds, keystrokes)
+        print(f"{name:<12} | {result['publishes']:>9} | {result['round_trips']:>11} | {result['delivered']:>16}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--typers", type=int, default=10)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--keystrokes", type=float, default=8.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.typers, args.members, args.seconds, args.keystrokes))
@@ -22,6 +22,9 @@ let state = {
     websocket: null,
     rooms: [],
     currentRoomId: null,
+    // Newest event id received per room, sent back as `resume_from` on reconnect
+    lastEventIds: {},
+    seenEventIds: new Set(),
 };
 
 // --- DOM ELEMENTS ---
@@ -82,9 +85,15 @@ function connectWebSocket() {
     if (state.websocket && state.websocket.readyState === WebSocket.OPEN) return;
     if (state.websocket) state.websocket.close();
 
-    state.websocket = new WebSocket(`${WEBSOCKET_URL}?token=${state.jwt}`);
+    const resumeFrom = Object.entries(state.lastEventIds).map(([roomId, eventId]) => `${roomId}:${eventId}`).join(',');
+    const resumeParam = resumeFrom ? `&resume_from=${encodeURIComponent(resumeFrom)}` : '';
+    state.websocket = new WebSocket(`${WEBSOCKET_URL}?token=${state.jwt}${resumeParam}`);
     state.websocket.onopen = () => console.log('WebSocket connected');
-    state.websocket.onclose = () => console.log('WebSocket disconnected');
+    state.websocket.onclose = () => {
+        console.log('WebSocket disconnected');
+        // Reconnect; the server replays whatever was missed in the meantime
+        if (state.jwt) setTimeout(connectWebSocket, 2000);
+    };
     state.websocket.onerror = (error) => console.error('WebSocket error:', error);
     state.websocket.onmessage = handleWebSocketMessage;
 }
@@ -102,17 +111,50 @@ function processRooms(rawRooms) {
 }
 
 // --- CORE LOGIC HANDLERS ---
+function compareEventIds(a, b) {
+    const [aMs, aSeq] = a.split('-').map(Number);
+    const [bMs, bSeq] = b.split('-').map(Number);
+    return aMs - bMs || aSeq - bSeq;
+}
+
+// Returns false for an event already handled (replays may repeat a few)
+function trackEvent(message) {
+    if (!message.event_id || !message.data || !message.data.room_id) return true;
+    if (state.seenEventIds.has(message.event_id)) return false;
+    state.seenEventIds.add(message.event_id);
+    if (state.seenEventIds.size > 5000) {
+        state.seenEventIds = new Set([...state.seenEventIds].slice(-2500));
+    }
+    const roomId = message.data.room_id;
+    const last = state.lastEventIds[roomId];
+    if (!last || compareEventIds(message.event_id, last) > 0) state.lastEventIds[roomId] = message.event_id;
+    return true;
+}
+
+async function resyncRoom(roomId) {
+    // The room's missed events are gone from the log: refetch it over REST
+    delete state.lastEventIds[roomId];
+    const rawRooms = await apiRequest('/api/rooms');
+    state.rooms = processRooms(rawRooms);
+    sortAndRenderRooms();
+    if (state.currentRoomId === roomId) selectRoom(roomId);
+}
+
 function handleWebSocketMessage(event) {
     const message = JSON.parse(event.data);
     console.log('Received WebSocket message:', message);
+    if (!trackEvent(message)) return;
 
-    if (message.type === 'new_message') {
+    if (message.type === 'resync_required') {
+        resyncRoom(message.data.room_id);
+    } else if (message.type === 'new_message') {
         const msgData = message.data;
 
         // 1. If this message was not sent by me, immediately acknowledge its delivery.
         if (msgData.sender_id !== state.myUserId) {
             state.websocket.send(JSON.stringify({
                 type: 'messages_delivered',
+                room_id: msgData.room_id,
                 message_ids: [msgData.id]
             }));
         }
@@ -130,6 +172,7 @@ function handleWebSocketMessage(event) {
             if (msgData.sender_id !== state.myUserId) {
                 state.websocket.send(JSON.stringify({
                     type: 'messages_seen',
+                    room_id: msgData.room_id,
                     message_ids: [msgData.id]
                 }));
             }
@@ -137,6 +180,9 @@ function handleWebSocketMessage(event) {
     } else if (message.type === 'message_status_update') {
         // Find the message in the DOM and update its status icon
         updateMessageStatusInView(message.data);
+    } else if (message.type === 'read_cursor_updated') {
+        // Another member read up to a point: my messages up to it are seen
+        updateReadCursorsInView(message.data);
     }
 }
 
@@ -152,8 +198,8 @@ async function selectRoom(roomId) {
 
     if (roomId) {
         try {
-            const messages = await apiRequest(`/api/messages/rooms/${roomId}`);
-            renderMessages(messages);
+            const history = await apiRequest(`/api/messages/rooms/${roomId}`);
+            renderMessages(history.messages);
             messageInput.disabled = false;
             sendBtn.disabled = false;
         } catch (error) {
@@ -164,8 +210,9 @@ async function selectRoom(roomId) {
 
 function logout() {
     localStorage.clear();
-    state = { jwt: null, myUserId: null, websocket: null, rooms: [], currentRoomId: null };
-    if (state.websocket) state.websocket.close();
+    const websocket = state.websocket;
+    state = { jwt: null, myUserId: null, websocket: null, rooms: [], currentRoomId: null, lastEventIds: {}, seenEventIds: new Set() };
+    if (websocket) websocket.close();
     authView.style.display = 'flex';
     chatView.style.display = 'none';
 }
@@ -231,16 +278,15 @@ function renderMessages(messages) {
     messagesDiv.innerHTML = '';
     messages.forEach(addMessageToView);
 
-    // After rendering history, find all messages that are NOT from me and are NOT already 'seen'.
-    const unreadMessageIds = messages
-        .filter(m => m.sender_id !== state.myUserId && m.status !== 'seen')
-        .map(m => m.id);
+    // The read cursor only moves forward, so acknowledging the newest
+    // message from someone else marks everything before it as seen too.
+    const othersMessages = messages.filter(m => m.sender_id !== state.myUserId);
 
-    // If there are any such messages, mark them all as seen now.
-    if (unreadMessageIds.length > 0) {
+    if (othersMessages.length > 0) {
         state.websocket.send(JSON.stringify({
             type: 'messages_seen',
-            message_ids: unreadMessageIds
+            room_id: state.currentRoomId,
+            message_ids: [othersMessages[othersMessages.length - 1].id]
         }));
     }
 }
@@ -250,6 +296,7 @@ function addMessageToView(msg) {
     const bubble = document.createElement('div');
     bubble.className = `message-bubble ${isMe ? 'message-out' : 'message-in'}`;
     bubble.dataset.messageId = msg.id;
+    bubble.dataset.timestamp = msg.timestamp;
     
     const content = document.createElement('p');
     content.textContent = msg.content;
@@ -282,6 +329,19 @@ function updateMessageStatusInView(statusData) {
     });
 }
 
+function updateReadCursorsInView(cursorData) {
+    if (state.currentRoomId !== cursorData.room_id) return;
+    cursorData.cursors
+        .filter(cursor => cursor.user_id !== state.myUserId)
+        .forEach(cursor => {
+            const readAt = new Date(cursor.last_read_at);
+            document.querySelectorAll('.message-out').forEach(bubble => {
+                const status = bubble.querySelector('.message-status');
+                if (status && new Date(bubble.dataset.timestamp) <= readAt) status.textContent = ' ✓ seen';
+            });
+        });
+}
+
 // --- NOTIFICATION LOGIC ---
 async function enableNotifications() {
     if (!state.jwt) return alert("Please log in first.");
@@ -0,0 +1,32 @@
+import asyncio
+import sys
+from pathlib import Path
+from uuid import UUID
+
+# Add the project root directory to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from app.database.postgres import get_db_session
+from app.services.auth_service import AuthService
+from app.globals import websocket_manager
+
+
+async def main(user_id: UUID):
+    """
+    Deactivates a user. Running servers drop the user's cached principals
+    through the Redis control channel, so their tokens stop working at once.
+    """
+    await websocket_manager.init_redis()
+    try:
+        async for session in get_db_session():
+            await AuthService(session, websocket_manager=websocket_manager).deactivate_user(user_id)
+            print(f"User {user_id} deactivated.")
+    finally:
+        await websocket_manager.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python scripts/deactivate_user.py <user_id>")
+        sys.exit(1)
+    asyncio.run(main(UUID(sys.argv[1])))
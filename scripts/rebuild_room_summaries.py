@@ -0,0 +1,30 @@
+import asyncio
+import sys
+from pathlib import Path
+from uuid import UUID
+
+# Add the project root directory to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from app.database.postgres import engine
+from app.database.room_summaries import rebuild_room_summaries
+
+
+async def main(room_ids):
+    """
+    Recomputes room summaries and unread counters from the messages table,
+    for every room or only the given ones. Run after importing messages
+    outside the API, or to repair counters.
+    """
+    async with engine.begin() as conn:
+        rebuilt = await conn.run_sync(rebuild_room_summaries, room_ids)
+    print(f"Rebuilt summaries of {rebuilt} room(s) with messages.")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    if any(arg in ("-h", "--help") for arg in sys.argv[1:]):
+        print("Usage: python scripts/rebuild_room_summaries.py [room_id ...]")
+        sys.exit(0)
+    room_ids = [UUID(arg) for arg in sys.argv[1:]] or None
+    asyncio.run(main(room_ids))
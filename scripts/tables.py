@@ -4,14 +4,14 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database.postgres import engine
-from app.models.user import Base  
+from app.database.migrations import run_migrations
 
 async def create_tables():
     """
-    Create all database tables based on the SQLAlchemy models.
+    Create or upgrade all database tables by applying pending migrations.
     """
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    applied = await run_migrations(engine)
+    print(f"Applied migrations: {', '.join(applied) or 'none (up to date)'}")
 
 import asyncio
-asyncio.run(create_tables())
\ No newline at end of file
+asyncio.run(create_tables())
@@ -10,6 +10,7 @@ sys.path.append(str(project_root))
 
 from app.database.postgres import get_db_session
 from app.services.notification_service import NotificationService
+from app.globals import fcm_sender
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,7 +20,7 @@ async def main():
     user_id = UUID("41ddceb4-cbf9-4fa7-bb4a-437c5471d30b")
 
     async for session in get_db_session():
-        notification_service = NotificationService(session)
+        notification_service = NotificationService(session, fcm_sender)
         
         try:
             await notification_service.send_notification_to_user(
@@ -30,6 +31,8 @@ async def main():
             logger.info("Notification sent successfully.")
         except Exception as e:
             logger.error(f"Failed to send notification: {e}")
+        finally:
+            await fcm_sender.close()
 
 if __name__ == "__main__":
     loop = asyncio.new_event_loop()
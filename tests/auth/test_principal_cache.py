@@ -0,0 +1,104 @@
+import time
+import uuid
+import pytest
+import pytest_asyncio
+from fastapi.security import HTTPAuthorizationCredentials
+from app.core.exceptions import UnauthorizedAccessException
+from app.core.security import create_access_token
+from app.dependencies.auth_dependencies import get_current_principal
+from app.globals import principal_cache
+from app.models.user import User
+from app.services.auth_service import AuthService
+from app.utils.principal_cache import Principal, PrincipalCache
+
+
+@pytest_asyncio.fixture
+async def user(session_factory):
+    async with session_factory() as db:
+        user = User(username="alice", display_name="Alice", email="alice@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+    return user
+
+
+def bearer(user) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"user_id": str(user.id)}))
+
+
+def make_principal(user_id=None, expires_in: float = 60) -> Principal:
+    return Principal(id=user_id or uuid.uuid4(), username="alice", display_name="Alice", expires_at=time.time() + expires_in)
+
+
+def test_entries_expire_with_the_token():
+    cache = PrincipalCache()
+    cache.set("header.payload.sig", make_principal(expires_in=-1), 0)
+    assert cache.get("header.payload.sig") is None
+
+
+def test_tampered_payload_does_not_match_cached_signature():
+    cache = PrincipalCache()
+    cache.set("header.payload.sig", make_principal(), 0)
+    assert cache.get("header.other-payload.sig") is None
+
+
+def test_invalidating_a_user_drops_all_their_tokens():
+    cache = PrincipalCache()
+    principal = make_principal()
+    generation = cache.generation(principal.id)
+    cache.set("h.p.one", principal, generation)
+    cache.set("h.p.two", principal, generation)
+
+    cache.invalidate_user(principal.id)
+
+    assert cache.get("h.p.one") is None
+    assert cache.get("h.p.two") is None
+    # A lookup that started before the invalidation must not re-cache the user
+    cache.set("h.p.one", principal, generation)
+    assert cache.get("h.p.one") is None
+
+
+def test_invalidated_users_do_not_accumulate():
+    cache = PrincipalCache(maxsize=2)
+    principal = make_principal()
+    generation = cache.generation(principal.id)
+    cache.invalidate_user(principal.id)
+    for _ in range(10):
+        cache.invalidate_user(uuid.uuid4())
+
+    assert len(cache._generations) == 2
+    cache.set("h.p.one", principal, generation)
+    assert cache.get("h.p.one") is None
+
+
+def test_least_recently_used_token_is_evicted():
+    cache = PrincipalCache(maxsize=1)
+    first, second = make_principal(), make_principal()
+    cache.set("h.p.first", first, 0)
+    cache.set("h.p.second", second, 0)
+    assert cache.get("h.p.first") is None
+    assert cache.get("h.p.second") is second
+
+
+@pytest.mark.asyncio
+async def test_cached_principal_skips_the_database(session_factory, user, recorded_statements):
+    credentials = bearer(user)
+
+    first = await get_current_principal(credentials, session_factory)
+    recorded_statements.clear()
+    second = await get_current_principal(credentials, session_factory)
+
+    assert first == second
+    assert first.username == "alice"
+    assert recorded_statements.statements == []
+
+
+@pytest.mark.asyncio
+async def test_deactivated_user_is_rejected_immediately(session_factory, user):
+    credentials = bearer(user)
+    await get_current_principal(credentials, session_factory)
+
+    async with session_factory() as db:
+        await AuthService(db, principal_cache).deactivate_user(user.id)
+
+    with pytest.raises(UnauthorizedAccessException):
+        await get_current_principal(credentials, session_factory)
@@ -0,0 +1,46 @@
+import asyncio
+import time
+import uuid
+import jwt
+import pytest
+from app.core.config import settings
+from app.core.exceptions import InvalidTokenException
+from app.core.security import hash_password, hash_password_async, verify_password_async, verify_token
+
+
+@pytest.mark.asyncio
+async def test_async_hash_round_trip():
+    hashed = await hash_password_async("password123")
+    assert await verify_password_async("password123", hashed)
+    assert not await verify_password_async("wrong-password", hashed)
+
+
+@pytest.mark.asyncio
+async def test_verification_does_not_block_the_event_loop():
+    hashed = hash_password("password123")
+    gaps = []
+
+    async def ticker(stop: asyncio.Event):
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(stop))
+    results = await asyncio.gather(*(verify_password_async("password123", hashed) for _ in range(8)))
+    stop.set()
+    await tick_task
+
+    assert all(results)
+    # A single inline bcrypt verification alone would stall the loop for ~100ms+
+    assert max(gaps) < 0.05
+
+
+def test_token_without_expiry_is_rejected():
+    token = jwt.encode({"user_id": str(uuid.uuid4())}, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+
+    with pytest.raises(InvalidTokenException):
+        verify_token(token)
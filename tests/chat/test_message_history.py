@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+import pytest_asyncio
+from app.core.exceptions import InvalidInputException, UnauthorizedAccessException
+from app.models.message import Message
+from app.models.room import Room, RoomType
+from app.models.room_membership import RoomMembership
+from app.models.user import User
+from app.utils.pagination import encode_cursor
+
+
+@pytest_asyncio.fixture
+async def room_with_history(async_session):
+    user = User(username="alice", display_name="Alice", email="alice@example.com", hashed_password="x")
+    async_session.add(user)
+    await async_session.flush()
+    room = Room(name="general", created_by=user.id, room_type=RoomType.GROUP)
+    async_session.add(room)
+    await async_session.flush()
+    async_session.add(RoomMembership(user_id=user.id, room_id=room.id))
+
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(7):
+        # Pairs of messages share a timestamp so the id tiebreak is exercised
+        async_session.add(
+            Message(room_id=room.id, sender_id=user.id, content=f"m{i}", created_at=base + timedelta(seconds=i // 2))
+        )
+    await async_session.commit()
+    return user, room
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_walks_history_without_gaps(async_session, room_with_history, make_chat_service):
+    user, room = room_with_history
+    chat_service = make_chat_service(async_session)
+
+    seen = []
+    page = await chat_service.get_room_messages(user.id, room.id, limit=3)
+    seen = [m.id for m in page.messages] + seen
+    while page.next_cursor:
+        page = await chat_service.get_room_messages(user.id, room.id, limit=3, before=page.next_cursor)
+        seen = [m.id for m in page.messages] + seen
+
+    assert len(seen) == len(set(seen)) == 7
+
+    # Paging forward with `after` from the oldest message returns the rest in order
+    oldest = await async_session.get(Message, seen[0])
+    forward = await chat_service.get_room_messages(
+        user.id, room.id, limit=4, after=encode_cursor(oldest.created_at, oldest.id)
+    )
+    assert [m.id for m in forward.messages] == seen[1:5]
+    rest = await chat_service.get_room_messages(user.id, room.id, limit=4, after=forward.next_cursor)
+    assert [m.id for m in rest.messages] == seen[5:]
+    assert rest.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_cursor_validation(async_session, room_with_history, make_chat_service):
+    user, room = room_with_history
+    chat_service = make_chat_service(async_session)
+
+    with pytest.raises(InvalidInputException):
+        await chat_service.get_room_messages(user.id, room.id, before="not-a-cursor")
+    with pytest.raises(InvalidInputException):
+        await chat_service.get_room_messages(user.id, room.id, before="a", after="b")
+
+
+@pytest.mark.asyncio
+async def test_non_member_cannot_read_history(async_session, room_with_history, make_chat_service):
+    _, room = room_with_history
+    chat_service = make_chat_service(async_session)
+    with pytest.raises(UnauthorizedAccessException):
+        await chat_service.get_room_messages(room.id, room.id)
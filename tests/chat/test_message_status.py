@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from app.models.message import Message
+from app.models.room import Room, RoomType
+from app.models.room_membership import RoomMembership
+from app.models.user import User
+from app.schemas.message import MessageStatus
+from app.services.chat_service import build_receipt_flush
+from app.services.room_service import RoomService
+from app.utils.receipt_batcher import ReceiptBatcher
+
+
+@pytest_asyncio.fixture
+async def chat(session_factory):
+    async with session_factory() as db:
+        users = [
+            User(username=name, display_name=name.title(), email=f"{name}@example.com", hashed_password="x")
+            for name in ("alice", "bob", "carol", "mallory")
+        ]
+        db.add_all(users)
+        await db.flush()
+        alice, bob, carol, _ = users
+        room = Room(name="general", created_by=alice.id, room_type=RoomType.GROUP)
+        db.add(room)
+        await db.flush()
+        # Alice sends all five messages below; the others start with them unread
+        db.add_all([
+            RoomMembership(user_id=user.id, room_id=room.id, unread_count=0 if user is alice else 5)
+            for user in (alice, bob, carol)
+        ])
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        messages = [
+            Message(room_id=room.id, sender_id=alice.id, content=f"m{i}", status=MessageStatus.SENT,
+                    created_at=base + timedelta(seconds=i))
+            for i in range(5)
+        ]
+        db.add_all(messages)
+        await db.commit()
+        return users, room, messages
+
+
+async def _statuses(session_factory, messages):
+    async with session_factory() as db:
+        rows = await db.execute(select(Message.id, Message.status).filter(Message.id.in_([m.id for m in messages])))
+        return dict(rows.all())
+
+
+async def _cursor(session_factory, room, user):
+    async with session_factory() as db:
+        row = await db.execute(
+            select(RoomMembership.last_read_message_id)
+            .filter(RoomMembership.room_id == room.id, RoomMembership.user_id == user.id)
+        )
+        return row.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_delivery_receipts_of_several_users_are_one_update_and_one_broadcast(
+    session_factory, chat, recorded_statements, make_chat_service, fake_manager
+):
+    (alice, bob, carol, _), room, messages = chat
+
+    async with session_factory() as db:
+        updated = await make_chat_service(db)._update_message_status(
+            {bob.id: [m.id for m in messages[:3]], carol.id: [m.id for m in messages[2:4]]},
+            MessageStatus.DELIVERED,
+            room.id,
+        )
+
+    assert [s for s in recorded_statements.heads() if s.startswith("UPDATE")] == ["UPDATE MESSAGES SET"]
+    assert len(updated[room.id]) == 4
+    assert len(fake_manager.sent) == 1
+    assert fake_manager.sent[0][0] == {alice.id, bob.id, carol.id}
+    statuses = await _statuses(session_factory, messages)
+    assert [statuses[m.id] for m in messages] == [MessageStatus.DELIVERED] * 4 + [MessageStatus.SENT]
+
+
+@pytest.mark.asyncio
+async def test_non_member_receipts_are_ignored(session_factory, chat, make_chat_service, fake_manager):
+    (_, _, _, mallory), _, messages = chat
+
+    async with session_factory() as db:
+        service = make_chat_service(db)
+        delivered = await service._update_message_status({mallory.id: [m.id for m in messages]}, MessageStatus.DELIVERED)
+        seen = await service._advance_read_cursors({mallory.id: [m.id for m in messages]})
+
+    assert delivered == {} and seen == {}
+    assert fake_manager.sent == []
+    assert set((await _statuses(session_factory, messages)).values()) == {MessageStatus.SENT}
+
+
+@pytest.mark.asyncio
+async def test_seen_advances_the_readers_cursor_without_touching_messages(
+    session_factory, chat, recorded_statements, make_chat_service, fake_manager
+):
+    (alice, bob, _, _), room, messages = chat
+
+    async with session_factory() as db:
+        await make_chat_service(db).mark_messages_as_seen([m.id for m in messages[:4]], bob.id)
+
+    assert [s for s in recorded_statements.heads() if s.startswith("UPDATE")] == ["UPDATE ROOM_MEMBERSHIPS SET"]
+    assert await _cursor(session_factory, room, bob) == messages[3].id
+    assert await _cursor(session_factory, room, alice) is None
+    assert set((await _statuses(session_factory, messages)).values()) == {MessageStatus.SENT}
+    assert len(fake_manager.sent) == 1
+    assert b"read_cursor_updated" in fake_manager.sent[0][1]
+
+
+@pytest.mark.asyncio
+async def test_read_cursor_never_moves_backwards(session_factory, chat, make_chat_service, fake_manager):
+    (_, bob, _, _), room, messages = chat
+
+    async with session_factory() as db:
+        service = make_chat_service(db)
+        await service.mark_messages_as_seen([messages[3].id], bob.id)
+        await service.mark_messages_as_seen([messages[1].id], bob.id)
+
+    assert await _cursor(session_factory, room, bob) == messages[3].id
+    assert len(fake_manager.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_unread_count_is_per_member(session_factory, chat, make_chat_service):
+    (alice, bob, carol, _), room, messages = chat
+
+    async with session_factory() as db:
+        await make_chat_service(db).mark_messages_as_seen([messages[2].id], bob.id)
+        rooms = {
+            user.username: (await RoomService(db).get_user_rooms_with_details(user.id))[0].unread_count
+            for user in (alice, bob, carol)
+        }
+
+    assert rooms == {"alice": 0, "bob": 2, "carol": 5}
+
+
+@pytest.mark.asyncio
+async def test_history_shows_own_messages_seen_up_to_other_readers_cursor(session_factory, chat, make_chat_service):
+    (alice, bob, _, _), room, messages = chat
+
+    async with session_factory() as db:
+        service = make_chat_service(db)
+        await service.mark_messages_as_seen([messages[1].id], bob.id)
+        alice_view = await service.get_room_messages(alice.id, room.id)
+        bob_view = await service.get_room_messages(bob.id, room.id)
+
+    assert [m.status for m in alice_view.messages] == [MessageStatus.SEEN] * 2 + [MessageStatus.SENT] * 3
+    assert {m.status for m in bob_view.messages} == {MessageStatus.SENT}
+
+
+@pytest.mark.asyncio
+async def test_batcher_applies_a_burst_of_frames_in_one_batch(session_factory, chat, fake_manager):
+    (_, bob, carol, _), room, messages = chat
+    batcher = ReceiptBatcher(build_receipt_flush(session_factory, fake_manager), window_seconds=0.01)
+
+    for message in messages:
+        batcher.add(bob.id, MessageStatus.SEEN, [message.id], room.id)
+        batcher.add(carol.id, MessageStatus.SEEN, [message.id], room.id)
+    await batcher.flush()
+
+    assert batcher.stats()["batches"] == 1
+    assert len(fake_manager.sent) == 1
+    assert await _cursor(session_factory, room, bob) == messages[-1].id
+    assert await _cursor(session_factory, room, carol) == messages[-1].id
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+from app.database.room_summaries import rebuild_room_summaries
+from app.models.message import Message
+from app.models.room import Room, RoomType
+from app.models.room_membership import RoomMembership
+from app.models.room_summary import PREVIEW_LENGTH, RoomSummary
+from app.models.user import User
+from app.services.room_service import RoomService
+
+
+@pytest_asyncio.fixture
+async def chat(async_session):
+    users = [
+        User(username=name, display_name=name.title(), email=f"{name}@example.com", hashed_password="x")
+        for name in ("alice", "bob", "carol", "dave")
+    ]
+    async_session.add_all(users)
+    await async_session.flush()
+    room = Room(name="general", created_by=users[0].id, room_type=RoomType.GROUP)
+    async_session.add(room)
+    await async_session.flush()
+    async_session.add_all([RoomMembership(user_id=user.id, room_id=room.id) for user in users[:3]])
+    await async_session.commit()
+    return users, room
+
+
+async def send(chat_service, sender, room, content):
+    return await chat_service._validate_and_send_message(sender=sender, room_id=room.id, content=content)
+
+
+async def unread_counts(db, users):
+    return {
+        user.username: [room.unread_count for room in await RoomService(db).get_user_rooms_with_details(user.id)]
+        for user in users
+    }
+
+
+async def snapshot(db, room_id):
+    summary = (await db.execute(
+        select(RoomSummary.last_message_id, RoomSummary.last_message_preview, RoomSummary.message_count)
+        .filter(RoomSummary.room_id == room_id)
+    )).one()
+    counters = dict((await db.execute(
+        select(RoomMembership.user_id, RoomMembership.unread_count).filter(RoomMembership.room_id == room_id)
+    )).all())
+    return tuple(summary), counters
+
+
+async def restamp(db, messages):
+    """SQLite's CURRENT_TIMESTAMP has one-second resolution; spread the messages out in send order."""
+    base = datetime(2024, 1, 1)
+    for i, message in enumerate(messages):
+        await db.execute(update(Message).filter(Message.id == message.id).values(created_at=base + timedelta(seconds=i)))
+    await db.commit()
+    return [message.id for message in messages]
+
+
+@pytest.mark.asyncio
+async def test_sending_updates_the_summary_and_the_other_members_counters(
+    async_session, chat, make_chat_service, recorded_statements
+):
+    (alice, bob, carol, _), room = chat
+    chat_service = make_chat_service(async_session)
+    await send(chat_service, alice, room, "first")
+    await send(chat_service, alice, room, "second")
+    last = await send(chat_service, bob, room, "x" * (PREVIEW_LENGTH + 50))
+
+    recorded_statements.clear()
+    rooms = await RoomService(async_session).get_user_rooms_with_details(carol.id)
+
+    assert rooms[0].last_message == "x" * PREVIEW_LENGTH
+    assert rooms[0].last_message_timestamp == last.timestamp
+    assert rooms[0].unread_count == 3
+    assert not any("FROM messages" in statement for statement in recorded_statements.statements)
+    assert await unread_counts(async_session, (alice, bob)) == {"alice": [1], "bob": [2]}
+
+
+@pytest.mark.asyncio
+async def test_reading_takes_the_read_messages_off_the_counter(async_session, chat, make_chat_service):
+    (alice, bob, _, _), room = chat
+    chat_service = make_chat_service(async_session)
+    sent = [await send(chat_service, alice, room, f"m{i}") for i in range(3)]
+    sent.append(await send(chat_service, bob, room, "reply"))
+    positions = await restamp(async_session, sent)
+
+    await chat_service._advance_read_cursors({bob.id: [positions[0]]}, room.id)
+    assert (await unread_counts(async_session, [bob]))["bob"] == [2]
+
+    await chat_service._advance_read_cursors({bob.id: [positions[-1]], alice.id: [positions[-1]]}, room.id)
+    assert await unread_counts(async_session, (alice, bob)) == {"alice": [0], "bob": [0]}
+
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_the_incrementally_maintained_state(engine, async_session, chat, make_chat_service):
+    (alice, bob, carol, _), room = chat
+    chat_service = make_chat_service(async_session)
+    sent = [await send(chat_service, sender, room, f"m{i}") for i, sender in enumerate((alice, bob, alice, carol, alice))]
+    positions = await restamp(async_session, sent)
+    await chat_service._advance_read_cursors({bob.id: [positions[2]], carol.id: [positions[-1]]}, room.id)
+    maintained = await snapshot(async_session, room.id)
+
+    await async_session.execute(update(RoomMembership).values(unread_count=0))
+    await async_session.execute(update(RoomSummary).values(message_count=0, last_message_preview=None))
+    await async_session.commit()
+    async with engine.begin() as conn:
+        assert await conn.run_sync(rebuild_room_summaries) == 1
+
+    assert await snapshot(async_session, room.id) == maintained
+
+
+@pytest.mark.asyncio
+async def test_joining_member_starts_with_the_history_unread(async_session, chat, make_chat_service):
+    (alice, bob, _, dave), room = chat
+    chat_service = make_chat_service(async_session)
+    await send(chat_service, alice, room, "before dave")
+    await send(chat_service, bob, room, "also before dave")
+
+    await RoomService(async_session).join_room(dave.id, room.id)
+    assert (await unread_counts(async_session, [dave]))["dave"] == [2]
+
+    await send(chat_service, alice, room, "after dave")
+    assert (await unread_counts(async_session, [dave]))["dave"] == [3]
+
+
+@pytest.mark.asyncio
+async def test_rejected_message_leaves_the_summary_alone(async_session, chat, make_chat_service):
+    (_, _, _, dave), room = chat
+    with pytest.raises(Exception):
+        await send(make_chat_service(async_session), dave, room, "not a member")
+
+    assert (await async_session.execute(select(RoomSummary))).first() is None
@@ -0,0 +1,59 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from app.core.exceptions import RoomNotFoundException
+from app.models.message import Message
+from app.models.room import Room, RoomType
+from app.models.room_membership import RoomMembership
+from app.models.user import User
+from app.schemas.message import MessageStatus
+
+
+@pytest_asyncio.fixture
+async def room_with_members(async_session):
+    alice = User(username="alice", display_name="Alice", email="alice@example.com", hashed_password="x")
+    mallory = User(username="mallory", display_name="Mallory", email="mallory@example.com", hashed_password="x")
+    async_session.add_all([alice, mallory])
+    await async_session.flush()
+    room = Room(name="general", created_by=alice.id, room_type=RoomType.GROUP)
+    async_session.add(room)
+    await async_session.flush()
+    async_session.add(RoomMembership(user_id=alice.id, room_id=room.id))
+    await async_session.commit()
+    return alice, mallory, room
+
+
+@pytest.mark.asyncio
+async def test_member_message_is_stored_in_one_statement(
+    async_session, room_with_members, recorded_statements, make_chat_service
+):
+    alice, _, room = room_with_members
+    recorded_statements.clear()
+
+    response = await make_chat_service(async_session)._validate_and_send_message(
+        sender=alice, room_id=room.id, content="hi"
+    )
+
+    # The message itself, then the room summary and the other members' unread counters
+    assert recorded_statements.heads() == [
+        "INSERT INTO MESSAGES",
+        "INSERT INTO ROOM_SUMMARIES",
+        "UPDATE ROOM_MEMBERSHIPS SET",
+    ]
+    assert response.sender_username == "alice"
+    assert response.status == MessageStatus.SENT
+    assert response.timestamp is not None
+
+    stored = (await async_session.execute(select(Message).filter(Message.id == response.id))).scalar_one()
+    assert stored.content == "hi"
+    assert stored.created_at == response.timestamp
+
+
+@pytest.mark.asyncio
+async def test_non_member_message_is_rejected_and_not_stored(async_session, room_with_members, make_chat_service):
+    _, mallory, room = room_with_members
+
+    with pytest.raises(RoomNotFoundException):
+        await make_chat_service(async_session)._validate_and_send_message(sender=mallory, room_id=room.id, content="hi")
+
+    assert (await async_session.execute(select(Message))).first() is None
@@ -0,0 +1,110 @@
+"""
+The WebSocket endpoint holds no database session while a socket is open:
+authentication and every inbound operation use their own short-lived one.
+"""
+import asyncio
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.api.websocket import router
+from app.database.postgres import get_session_factory
+from app.globals import websocket_manager
+from app.models.room import Room, RoomType
+from app.models.room_membership import RoomMembership
+from app.utils.serialization import dumps, loads
+from bench.asgi_websocket import InProcessWebSocket
+from bench.fake_redis import FakeRedis
+
+
+class TrackedSessions:
+    """A session factory remembering every session it opened and which were closed."""
+
+    def __init__(self, engine):
+        self.opened = []
+        self.closed = set()
+        tracker = self
+
+        class TrackedSession(AsyncSession):
+            async def close(self):
+                tracker.closed.add(self)
+                await super().close()
+
+        self.factory = sessionmaker(engine, expire_on_commit=False, class_=TrackedSession)
+
+    def __call__(self):
+        session = self.factory()
+        self.opened.append(session)
+        return session
+
+    @property
+    def open(self):
+        return [session for session in self.opened if session not in self.closed]
+
+
+@pytest.fixture
+def sessions(engine):
+    return TrackedSessions(engine)
+
+
+@pytest_asyncio.fixture
+async def client(sessions, test_token, async_session, test_user):
+    room = Room(name="general", created_by=test_user.id, room_type=RoomType.GROUP)
+    async_session.add(room)
+    await async_session.flush()
+    async_session.add(RoomMembership(user_id=test_user.id, room_id=room.id))
+    await async_session.commit()
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_session_factory] = lambda: sessions
+    await websocket_manager.init_redis(FakeRedis())
+    websocket = InProcessWebSocket(app, "/ws", f"token={test_token}")
+    await websocket.connect()
+    yield websocket, room
+    await websocket.close()
+    await websocket_manager.close()
+
+
+async def _send_message(websocket, room, content):
+    await websocket.send_text(dumps({"type": "send_message", "room_id": str(room.id), "content": content}))
+    event = loads(await websocket.receive())
+    assert event["type"] == "new_message"
+    # The scope commits and closes its session right after the broadcast
+    await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_authentication_session_is_released_before_the_socket_is_used(client, sessions):
+    await asyncio.sleep(0.01)
+
+    assert len(sessions.opened) == 1
+    assert sessions.open == []
+
+
+@pytest.mark.asyncio
+async def test_each_operation_gets_a_fresh_session_that_is_closed(client, sessions):
+    websocket, room = client
+    before = len(sessions.opened)
+
+    await _send_message(websocket, room, "first")
+    first = sessions.opened[before:]
+    await _send_message(websocket, room, "second")
+    second = sessions.opened[before + len(first):]
+
+    assert len(first) == len(second) == 1
+    assert first[0] is not second[0]
+    assert sessions.open == []
+
+
+@pytest.mark.asyncio
+async def test_no_session_is_open_while_the_socket_is_idle(client, sessions):
+    websocket, room = client
+    await _send_message(websocket, room, "hello")
+    opened = len(sessions.opened)
+
+    await asyncio.sleep(0.1)
+
+    assert len(sessions.opened) == opened
+    assert sessions.open == []
@@ -1,29 +1,184 @@
+import asyncio
 import pytest
+import pytest_asyncio
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
+from app.database.migrations import run_migrations
 from app.models.base import Base
 from app.models.user import User
 from app.core.security import create_access_token, hash_password
+from app.services.chat_service import ChatService
+from app.services.room_service import RoomService
+from app.utils.serialization import loads
+from app.utils.websocket_manager import WebsocketManager
+from bench.fake_redis import FakeRedis
 
 DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
-@pytest.fixture
-async def async_session():
+
+class RecordingManager:
+    """Stands in for WebsocketManager in service tests: records what would be sent, and nobody is online."""
+
+    def __init__(self):
+        self.sent = []
+        self.control_events = []
+
+    async def send_to_users(self, user_ids, message):
+        self.sent.append((set(user_ids), message))
+
+    async def are_online(self, user_ids):
+        return set()
+
+    async def publish_control_event(self, event_type, data):
+        self.control_events.append((event_type, data))
+
+
+class RecordingWebSocket:
+    """
+    Records the raw frames the server sends. A stalled socket behaves like a
+    client that stopped reading: every send blocks until `release` is set.
+    """
+
+    def __init__(self, stalled: bool = False):
+        self.sent = []
+        self.subprotocol = None
+        self.close_code = None
+        self.release = asyncio.Event()
+        if not stalled:
+            self.release.set()
+
+    @property
+    def events(self):
+        return [loads(message) for message in self.sent]
+
+    async def accept(self, subprotocol=None):
+        self.subprotocol = subprotocol
+
+    async def send_text(self, message: str):
+        await self.release.wait()
+        self.sent.append(message)
+
+    async def send_bytes(self, message: bytes):
+        await self.release.wait()
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000, reason: str = None):
+        self.close_code = code
+
+
+class StatementRecorder:
+    """Collects the SQL sent to an engine as (statement, parameters) pairs."""
+
+    def __init__(self):
+        self.executed = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.executed.append((statement, parameters))
+
+    @property
+    def statements(self):
+        return [statement for statement, _ in self.executed]
+
+    def heads(self):
+        """The first three words of each statement, e.g. "UPDATE MESSAGES SET"."""
+        return [" ".join(statement.split()[:3]).upper() for statement in self.statements]
+
+    def clear(self):
+        self.executed.clear()
+
+
+@pytest_asyncio.fixture
+async def empty_engine():
+    """An in-memory database without any tables."""
     engine = create_async_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
         future=True,
     )
-    async with engine.begin() as conn:
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def engine(empty_engine):
+    async with empty_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    async_session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
-    async with async_session_factory() as session:
+    return empty_engine
+
+
+@pytest_asyncio.fixture
+async def migrated_engine(empty_engine):
+    """Same as `engine`, but with the schema built by the real migrations."""
+    await run_migrations(empty_engine)
+    return empty_engine
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+
+@pytest_asyncio.fixture
+async def async_session(session_factory):
+    async with session_factory() as session:
         yield session
-    await engine.dispose()
+
+
+@pytest.fixture
+def recorded_statements(engine):
+    recorder = StatementRecorder()
+    event.listen(engine.sync_engine, "before_cursor_execute", recorder)
+    yield recorder
+    event.remove(engine.sync_engine, "before_cursor_execute", recorder)
+
+
+@pytest.fixture
+def fake_manager():
+    return RecordingManager()
+
+
+@pytest.fixture
+def make_chat_service(fake_manager):
+    def make(db, websocket_manager=fake_manager):
+        return ChatService(room_service=RoomService(db), db=db, websocket_manager=websocket_manager, push_queue=None)
+    return make
+
 
 @pytest.fixture
+def make_websocket():
+    return RecordingWebSocket
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
+
+
+@pytest_asyncio.fixture
+async def make_manager(fake_redis):
+    """Starts WebsocketManagers sharing `fake_redis`, like workers sharing one Redis."""
+    managers = []
+
+    async def make():
+        manager = WebsocketManager("redis://fake")
+        await manager.init_redis(fake_redis)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        await manager.close()
+
+
+@pytest_asyncio.fixture
+async def manager(make_manager):
+    return await make_manager()
+
+
+@pytest_asyncio.fixture
 async def test_user(async_session):
     user = User(
         username="testuser",
@@ -36,6 +191,7 @@ async def test_user(async_session):
     await async_session.refresh(user)
     return user
 
+
 @pytest.fixture
 def test_token(test_user):
-    return create_access_token({"user_id": str(test_user.id)})
\ No newline at end of file
+    return create_access_token({"user_id": str(test_user.id)})
@@ -0,0 +1,115 @@
+"""
+Data migrations, exercised against a database built by the earlier migrations.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from app.database.migrations import load_migrations, run_migrations
+
+
+async def upgrade_to(engine, version: str):
+    def apply(conn):
+        for migration in load_migrations():
+            if migration.version > version:
+                break
+            migration.upgrade(conn)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(apply)
+
+
+def _id() -> str:
+    return uuid.uuid4().hex
+
+
+@pytest.mark.asyncio
+async def test_read_cursors_are_backfilled_from_seen_status(empty_engine):
+    await upgrade_to(empty_engine, "v0002_hot_path_indexes")
+    alice, bob, room = _id(), _id(), _id()
+    base = datetime(2024, 1, 1)
+    messages = [_id() for _ in range(4)]
+    statuses = ["SEEN", "SEEN", "DELIVERED", "SENT"]
+    async with empty_engine.begin() as conn:
+        for user_id, name in ((alice, "alice"), (bob, "bob")):
+            await conn.execute(
+                text("INSERT INTO users (id, username, display_name, email, hashed_password) VALUES (:id, :n, :n, :e, 'x')"),
+                {"id": user_id, "n": name, "e": f"{name}@example.com"},
+            )
+        await conn.execute(
+            text("INSERT INTO rooms (id, name, room_type, created_by) VALUES (:id, 'general', 'GROUP', :by)"),
+            {"id": room, "by": alice},
+        )
+        for user_id in (alice, bob):
+            await conn.execute(
+                text("INSERT INTO room_memberships (id, user_id, room_id) VALUES (:id, :u, :r)"),
+                {"id": _id(), "u": user_id, "r": room},
+            )
+        for i, (message_id, status) in enumerate(zip(messages, statuses)):
+            await conn.execute(
+                text(
+                    "INSERT INTO messages (id, content, status, sender_id, room_id, created_at) "
+                    "VALUES (:id, 'hi', :status, :sender, :room, :at)"
+                ),
+                {"id": message_id, "status": status, "sender": alice, "room": room, "at": base + timedelta(seconds=i)},
+            )
+
+    await run_migrations(empty_engine)
+
+    async with empty_engine.connect() as conn:
+        cursors = dict((await conn.execute(
+            text("SELECT user_id, last_read_message_id FROM room_memberships")
+        )).all())
+        indexes = (await conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))).scalars().all()
+
+    # Bob read up to the last SEEN message; Alice sent everything, so she has read it all
+    assert cursors == {bob: messages[1], alice: messages[3]}
+    assert "ix_messages_room_id_unseen" not in indexes
+
+
+@pytest.mark.asyncio
+async def test_room_summaries_and_unread_counts_are_backfilled(empty_engine):
+    await upgrade_to(empty_engine, "v0003_read_cursors")
+    alice, bob, room, empty_room = _id(), _id(), _id(), _id()
+    base = datetime(2024, 1, 1)
+    messages = [_id() for _ in range(3)]
+    async with empty_engine.begin() as conn:
+        for user_id, name in ((alice, "alice"), (bob, "bob")):
+            await conn.execute(
+                text("INSERT INTO users (id, username, display_name, email, hashed_password) VALUES (:id, :n, :n, :e, 'x')"),
+                {"id": user_id, "n": name, "e": f"{name}@example.com"},
+            )
+        for room_id in (room, empty_room):
+            await conn.execute(
+                text("INSERT INTO rooms (id, name, room_type, created_by) VALUES (:id, :id, 'GROUP', :by)"),
+                {"id": room_id, "by": alice},
+            )
+        for i, message_id in enumerate(messages):
+            await conn.execute(
+                text(
+                    "INSERT INTO messages (id, content, status, sender_id, room_id, created_at) "
+                    "VALUES (:id, :content, 'SENT', :sender, :room, :at)"
+                ),
+                {"id": message_id, "content": f"m{i}", "sender": alice, "room": room, "at": base + timedelta(seconds=i)},
+            )
+        # Bob has read the first message
+        for user_id, cursor in ((alice, None), (bob, messages[0])):
+            await conn.execute(
+                text(
+                    "INSERT INTO room_memberships (id, user_id, room_id, last_read_message_id, last_read_at) "
+                    "VALUES (:id, :u, :r, :cursor, :at)"
+                ),
+                {"id": _id(), "u": user_id, "r": room, "cursor": cursor, "at": base if cursor else None},
+            )
+
+    await run_migrations(empty_engine)
+
+    async with empty_engine.connect() as conn:
+        summaries = (await conn.execute(
+            text("SELECT room_id, last_message_id, last_message_preview, message_count FROM room_summaries")
+        )).all()
+        unread = dict((await conn.execute(text("SELECT user_id, unread_count FROM room_memberships"))).all())
+
+    assert summaries == [(room, messages[2], "m2", 3)]
+    assert unread == {alice: 0, bob: 2}
@@ -0,0 +1,123 @@
+"""
+EXPLAIN-based regression tests: every statement issued by the hot query paths
+must be served by an index rather than a full scan of messages or
+room_memberships. The schema is built by the real migrations.
+"""
+from datetime import datetime, timedelta, timezone
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect
+from app.database.migrations import load_migrations, run_migrations
+from app.models.base import Base
+from app.models.message import Message
+from app.models.room import Room, RoomType
+from app.models.room_membership import RoomMembership
+from app.models.user import User
+from app.services.room_service import RoomService
+
+HOT_TABLES = ("messages", "room_memberships", "room_summaries")
+
+
+@pytest.fixture
+def engine(migrated_engine):
+    return migrated_engine
+
+
+@pytest_asyncio.fixture
+async def chat(async_session):
+    users = [
+        User(username=f"user{i}", display_name=f"User {i}", email=f"user{i}@example.com", hashed_password="x")
+        for i in range(3)
+    ]
+    async_session.add_all(users)
+    await async_session.flush()
+    room = Room(name="general", created_by=users[0].id, room_type=RoomType.GROUP)
+    async_session.add(room)
+    await async_session.flush()
+    async_session.add_all([RoomMembership(user_id=user.id, room_id=room.id) for user in users])
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    async_session.add_all([
+        Message(room_id=room.id, sender_id=users[i % 3].id, content=f"m{i}", created_at=base + timedelta(seconds=i))
+        for i in range(20)
+    ])
+    await async_session.commit()
+    return users, room
+
+
+def selects(recorded_statements):
+    # Plain SELECTs plus INSERT ... SELECT, whose SELECT part carries the membership check
+    return [
+        (statement, parameters) for statement, parameters in recorded_statements.executed
+        if statement.lstrip().upper().startswith(("SELECT", "INSERT")) and "SELECT" in statement.upper()
+    ]
+
+
+async def assert_no_full_scans(engine, statements):
+    assert statements, "expected the hot path to issue queries"
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+            details = [row[-1] for row in plan]
+            full_scans = [d for d in details if any(d.startswith(f"SCAN {table}") for table in HOT_TABLES)]
+            assert not full_scans, f"{full_scans} in plan {details} for:\n{statement}"
+
+
+@pytest.mark.asyncio
+async def test_room_list_uses_indexes(engine, async_session, chat, recorded_statements):
+    users, _ = chat
+    await RoomService(async_session).get_user_rooms_with_details(users[0].id)
+    await assert_no_full_scans(engine, selects(recorded_statements))
+
+
+@pytest.mark.asyncio
+async def test_member_fan_out_lookup_uses_indexes(engine, async_session, chat, recorded_statements):
+    _, room = chat
+    await RoomService(async_session).get_room_member_ids(room.id)
+    await assert_no_full_scans(engine, selects(recorded_statements))
+
+
+@pytest.mark.asyncio
+async def test_message_send_validation_uses_indexes(engine, async_session, chat, recorded_statements, make_chat_service):
+    users, room = chat
+    await make_chat_service(async_session)._validate_and_send_message(
+        sender=users[1], room_id=room.id, content="hi"
+    )
+    await assert_no_full_scans(engine, selects(recorded_statements))
+
+
+@pytest.mark.asyncio
+async def test_history_page_uses_indexes(engine, async_session, chat, recorded_statements, make_chat_service):
+    users, room = chat
+    chat_service = make_chat_service(async_session)
+    page = await chat_service.get_room_messages(users[0].id, room.id, limit=5)
+    await chat_service.get_room_messages(users[0].id, room.id, limit=5, before=page.next_cursor)
+    await assert_no_full_scans(engine, selects(recorded_statements))
+
+
+@pytest.mark.asyncio
+async def test_migrations_match_model_indexes(engine):
+    def index_names(sync_conn):
+        inspector = inspect(sync_conn)
+        return {table: {ix["name"] for ix in inspector.get_indexes(table)} for table in HOT_TABLES}
+
+    async with engine.connect() as conn:
+        migrated = await conn.run_sync(index_names)
+    for table in HOT_TABLES:
+        declared = {ix.name for ix in Base.metadata.tables[table].indexes}
+        assert declared <= migrated[table]
+
+
+@pytest.mark.asyncio
+async def test_migrations_are_idempotent(engine):
+    assert await run_migrations(engine) == []
+    assert [m.version for m in load_migrations()][0].startswith("v0001")
+
+
+@pytest.mark.asyncio
+async def test_read_cursor_advance_uses_indexes(engine, async_session, chat, recorded_statements, make_chat_service):
+    users, room = chat
+    chat_service = make_chat_service(async_session)
+    page = await chat_service.get_room_messages(users[0].id, room.id, limit=5)
+    recorded_statements.clear()
+    await chat_service._advance_read_cursors({users[0].id: [page.messages[-1].id]}, room.id)
+    await assert_no_full_scans(engine, selects(recorded_statements))
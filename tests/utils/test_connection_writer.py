@@ -0,0 +1,91 @@
+import asyncio
+import json
+import pytest
+from app.utils.connection_writer import (
+    COALESCE_STATUS,
+    DISCONNECT,
+    DROP_TYPING,
+    ConnectionWriter,
+    get_event_type,
+    parse_overflow_policy,
+)
+
+
+def event(event_type: str, **data) -> str:
+    return json.dumps({"type": event_type, "data": data})
+
+
+def status_update(room_id: str, *message_ids: str) -> str:
+    return event("message_status_update", room_id=room_id, message_ids=list(message_ids), status="seen")
+
+
+def test_event_type_is_read_without_parsing():
+    assert get_event_type(event("typing_indicator", room_id="r")) == "typing_indicator"
+    assert get_event_type("not json") is None
+
+
+def test_unknown_overflow_strategy_is_rejected():
+    assert parse_overflow_policy("drop_typing, disconnect") == (DROP_TYPING, DISCONNECT)
+    with pytest.raises(ValueError):
+        parse_overflow_policy("drop_everything")
+
+
+@pytest.mark.asyncio
+async def test_typing_indicators_are_dropped_first(make_websocket):
+    writer = ConnectionWriter(make_websocket(stalled=True), maxsize=3, overflow_policy=(DROP_TYPING,))
+    writer.enqueue(event("typing_indicator", room_id="r"))
+    writer.enqueue(event("new_message", id="1"))
+    writer.enqueue(event("typing_indicator", room_id="r"))
+
+    assert writer.enqueue(event("new_message", id="2"))
+    writer.enqueue(event("new_message", id="3"))
+    assert not writer.enqueue(event("typing_indicator", room_id="r"))
+    assert [get_event_type(m) for _, m in writer._queue] == ["new_message"] * 3
+    assert writer.dropped == 3
+
+
+@pytest.mark.asyncio
+async def test_status_updates_are_coalesced(make_websocket):
+    writer = ConnectionWriter(make_websocket(stalled=True), maxsize=3, overflow_policy=(COALESCE_STATUS,))
+    writer.enqueue(status_update("r", "a"))
+    writer.enqueue(status_update("r", "b"))
+    writer.enqueue(status_update("other", "c"))
+
+    assert writer.enqueue(status_update("r", "d"))
+    messages = [json.loads(m)["data"] for _, m in writer._queue]
+    assert messages[0]["message_ids"] == ["a", "b"]
+    assert messages[1]["message_ids"] == ["c"]
+    assert messages[2]["message_ids"] == ["d"]
+    assert writer.coalesced == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_disconnected(make_websocket):
+    websocket = make_websocket(stalled=True)
+    writer = ConnectionWriter(websocket, maxsize=2, overflow_policy=(DROP_TYPING, DISCONNECT))
+    writer.start()
+    for i in range(3):
+        writer.enqueue(event("new_message", id=str(i)))
+    await asyncio.sleep(0.01)
+
+    assert writer.closed
+    assert websocket.close_code == 1013
+    assert not writer.enqueue(event("new_message", id="late"))
+
+
+@pytest.mark.asyncio
+async def test_writer_sends_in_order_once_client_reads(make_websocket):
+    websocket = make_websocket(stalled=True)
+    writer = ConnectionWriter(websocket, maxsize=10)
+    writer.start()
+    messages = [event("new_message", id=str(i)) for i in range(5)]
+    for message in messages:
+        writer.enqueue(message)
+    assert writer.depth >= 4
+
+    websocket.release.set()
+    await asyncio.sleep(0.01)
+
+    assert websocket.sent == messages
+    assert writer.depth == 0
+    await writer.stop()
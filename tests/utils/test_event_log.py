@@ -0,0 +1,145 @@
+import asyncio
+import uuid
+import pytest
+from app.utils.event_log import (
+    RESYNC_REQUIRED_EVENT,
+    RoomEventLog,
+    get_event_log_key,
+    parse_event_id,
+    parse_resume_from,
+)
+from app.utils.serialization import loads
+
+
+async def _publish(event_log, room_id, user_id, count, start=0):
+    return [
+        await event_log.publish(room_id, "new_message", {"room_id": str(room_id), "content": f"m{i}"}, [user_id])
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_published_events_carry_their_log_id(manager, make_websocket):
+    event_log = RoomEventLog(manager)
+    room_id, user_id = uuid.uuid4(), uuid.uuid4()
+    websocket = make_websocket()
+    await manager.connect(websocket, user_id)
+
+    (event_id,) = await _publish(event_log, room_id, user_id, 1)
+    await asyncio.sleep(0.01)
+
+    assert websocket.events == [{
+        "type": "new_message",
+        "data": {"room_id": str(room_id), "content": "m0"},
+        "event_id": event_id,
+    }]
+
+
+@pytest.mark.asyncio
+async def test_replay_returns_only_what_was_missed(manager):
+    event_log = RoomEventLog(manager, replay_overlap_ms=0)
+    room_id, user_id = uuid.uuid4(), uuid.uuid4()
+    ids = await _publish(event_log, room_id, user_id, 5)
+
+    replayed = [loads(event) for event in await event_log.replay({room_id: ids[1]})]
+
+    missed = [event for event in replayed if parse_event_id(event["event_id"]) > parse_event_id(ids[1])]
+    assert [event["event_id"] for event in missed] == ids[2:]
+    assert [event["data"]["content"] for event in missed] == ["m2", "m3", "m4"]
+    assert all(event["event_id"] in ids[:2] for event in replayed if event not in missed)
+
+
+@pytest.mark.asyncio
+async def test_trimmed_log_requires_a_resync(manager):
+    event_log = RoomEventLog(manager, max_len=3)
+    room_id, other_room_id, user_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    ids = await _publish(event_log, room_id, user_id, 6)
+    other_ids = await _publish(event_log, other_room_id, user_id, 2)
+
+    events = [loads(event) for event in await event_log.replay({room_id: ids[0], other_room_id: other_ids[0]})]
+
+    assert events[0] == {"type": RESYNC_REQUIRED_EVENT, "data": {"room_id": str(room_id)}}
+    assert [event["data"]["content"] for event in events[1:]] == ["m0", "m1"]
+    assert event_log.stats()["resyncs"] == 1
+
+
+@pytest.mark.asyncio
+async def test_too_many_missed_events_require_a_resync(manager):
+    event_log = RoomEventLog(manager, max_replay=3)
+    room_id, user_id = uuid.uuid4(), uuid.uuid4()
+    ids = await _publish(event_log, room_id, user_id, 6)
+
+    events = [loads(event) for event in await event_log.replay({room_id: ids[0]})]
+
+    assert [event["type"] for event in events] == [RESYNC_REQUIRED_EVENT]
+
+
+@pytest.mark.asyncio
+async def test_overlap_does_not_count_toward_max_replay(manager):
+    event_log = RoomEventLog(manager, max_replay=3)
+    room_id, user_id = uuid.uuid4(), uuid.uuid4()
+    # All six fall inside the overlap window; only the last three were missed
+    ids = await _publish(event_log, room_id, user_id, 6)
+
+    events = [loads(event) for event in await event_log.replay({room_id: ids[2]})]
+
+    assert [event["event_id"] for event in events] == ids
+
+
+@pytest.mark.asyncio
+async def test_publish_serializes_the_event_once(manager, make_websocket, monkeypatch):
+    from app.utils import event_log as event_log_module
+
+    calls = []
+    dump_event = event_log_module.dump_event
+    monkeypatch.setattr(event_log_module, "dump_event", lambda *args: calls.append(args) or dump_event(*args))
+    room_id, user_id = uuid.uuid4(), uuid.uuid4()
+    websocket = make_websocket()
+    await manager.connect(websocket, user_id)
+
+    (event_id,) = await _publish(RoomEventLog(manager), room_id, user_id, 1)
+    await asyncio.sleep(0.01)
+
+    assert len(calls) == 1
+    assert websocket.events[0]["event_id"] == event_id
+
+
+@pytest.mark.asyncio
+async def test_expired_log_requires_a_resync(manager, fake_redis):
+    event_log = RoomEventLog(manager)
+    room_id, user_id = uuid.uuid4(), uuid.uuid4()
+    (event_id,) = await _publish(event_log, room_id, user_id, 1)
+    del fake_redis._streams[get_event_log_key(room_id)]
+
+    events = [loads(event) for event in await event_log.replay({room_id: event_id})]
+
+    assert [event["type"] for event in events] == [RESYNC_REQUIRED_EVENT]
+
+
+@pytest.mark.asyncio
+async def test_backlog_is_sent_before_live_events(manager, make_websocket):
+    event_log = RoomEventLog(manager, replay_overlap_ms=0)
+    room_id, user_id = uuid.uuid4(), uuid.uuid4()
+    ids = await _publish(event_log, room_id, user_id, 3)
+    websocket = make_websocket()
+
+    async def backlog():
+        # An event published while the backlog is being read waits for it
+        await _publish(event_log, room_id, user_id, 1, start=3)
+        await asyncio.sleep(0.01)
+        return await event_log.replay({room_id: ids[0]})
+
+    await manager.connect(websocket, user_id, backlog=backlog)
+    await asyncio.sleep(0.01)
+
+    contents = [event["data"]["content"] for event in websocket.events]
+    assert contents[:4] == ["m0", "m1", "m2", "m3"]
+    assert contents[4:] == ["m3"]
+
+
+def test_parse_resume_from_ignores_malformed_pairs():
+    room_id, other_room_id = uuid.uuid4(), uuid.uuid4()
+    raw = f"{room_id}:1700000000000-3,not-a-room:1-0,{other_room_id}:garbage, "
+
+    assert parse_resume_from(raw) == {room_id: "1700000000000-3"}
+    assert parse_resume_from(None) == {}
@@ -0,0 +1,90 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from app.utils.fcm import FCMSender
+
+
+class FakeCredentials:
+    """Mimics google.oauth2 credentials: a token, an expiry and a blocking refresh()."""
+    def __init__(self, lifetime: timedelta = timedelta(hours=1)):
+        self.lifetime = lifetime
+        self.token = None
+        self.expiry = None
+        self.refresh_count = 0
+
+    def refresh(self, request):
+        self.refresh_count += 1
+        self.token = f"token-{self.refresh_count}"
+        self.expiry = datetime.utcnow() + self.lifetime
+
+
+def create_fake_fcm_app(received: list) -> FastAPI:
+    fake_fcm = FastAPI()
+
+    @fake_fcm.post("/v1/projects/{project_id}/messages:send")
+    async def send(project_id: str, request: Request):
+        received.append({
+            "project_id": project_id,
+            "authorization": request.headers["authorization"],
+            "body": await request.json(),
+        })
+        return {"name": f"projects/{project_id}/messages/1"}
+
+    return fake_fcm
+
+
+@pytest.fixture
+def service_account_file(tmp_path):
+    path = tmp_path / "service_account_key.json"
+    path.write_text(json.dumps({"project_id": "test-project"}))
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_sender_reuses_cached_token(service_account_file):
+    received = []
+    credentials = FakeCredentials()
+    sender = FCMSender(
+        service_account_file=service_account_file,
+        base_url="http://fake-fcm",
+        http2=False,
+        credentials=credentials,
+        transport=httpx.ASGITransport(app=create_fake_fcm_app(received)),
+    )
+
+    for _ in range(3):
+        response = await sender.send({"message": {"token": "device"}})
+        assert response.status_code == 200
+    await sender.close()
+
+    assert credentials.refresh_count == 1
+    assert [r["project_id"] for r in received] == ["test-project"] * 3
+    assert all(r["authorization"] == "Bearer token-1" for r in received)
+
+
+@pytest.mark.asyncio
+async def test_project_id_is_loaded_lazily(tmp_path):
+    sender = FCMSender(service_account_file=str(tmp_path / "missing.json"), credentials=FakeCredentials())
+    with pytest.raises(FileNotFoundError):
+        _ = sender.project_id
+
+
+@pytest.mark.asyncio
+async def test_token_is_refreshed_in_background_before_expiry(service_account_file):
+    credentials = FakeCredentials(lifetime=timedelta(seconds=60))
+    sender = FCMSender(
+        service_account_file=service_account_file,
+        refresh_margin_seconds=300,
+        credentials=credentials,
+    )
+
+    assert await sender.get_access_token() == "token-1"
+    # Token is valid but within the refresh margin: the stale token is served
+    # immediately and a single background refresh replaces it.
+    assert await sender.get_access_token() == "token-1"
+    await asyncio.sleep(0.05)
+    assert credentials.refresh_count == 2
+    await sender.close()
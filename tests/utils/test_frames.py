@@ -0,0 +1,53 @@
+import asyncio
+import uuid
+import msgpack
+import pytest
+from app.utils.frames import (
+    JSON_FRAMES,
+    MSGPACK_FRAMES,
+    MSGPACK_SUBPROTOCOL,
+    FrameCache,
+    decode_frame,
+    negotiate_frame_format,
+)
+from app.utils.serialization import dump_event, loads
+
+
+def test_json_is_the_default_format():
+    assert negotiate_frame_format([]) == (JSON_FRAMES, None)
+    assert negotiate_frame_format(["something-else"]) == (JSON_FRAMES, None)
+    assert negotiate_frame_format(["something-else", MSGPACK_SUBPROTOCOL]) == (MSGPACK_FRAMES, MSGPACK_SUBPROTOCOL)
+
+
+def test_frame_cache_encodes_each_format_once():
+    frames = FrameCache(dump_event("typing_indicator", {"room_id": "r", "is_typing": True}).decode())
+
+    binary = frames.get(MSGPACK_FRAMES)
+
+    assert frames.get(MSGPACK_FRAMES) is binary
+    assert msgpack.unpackb(binary) == {"type": "typing_indicator", "data": {"room_id": "r", "is_typing": True}}
+
+
+def test_malformed_binary_frame_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_frame(b"\xc1", MSGPACK_FRAMES)
+
+
+@pytest.mark.asyncio
+async def test_room_broadcast_reaches_each_socket_in_its_format(manager, make_websocket):
+    room_id = uuid.uuid4()
+    text_client, binary_client = make_websocket(), make_websocket()
+    await manager.connect(text_client, uuid.uuid4())
+    await manager.connect(binary_client, uuid.uuid4(), MSGPACK_FRAMES, MSGPACK_SUBPROTOCOL)
+    for user_id in manager.active_connections:
+        await manager.join_room(user_id, room_id)
+
+    event = {"room_id": str(room_id), "message_ids": ["a", "b"], "status": "seen"}
+    await manager.broadcast_to_room(room_id, dump_event("message_status_update", event))
+    await asyncio.sleep(0.01)
+
+    assert binary_client.subprotocol == MSGPACK_SUBPROTOCOL
+    assert isinstance(text_client.sent[0], str)
+    assert isinstance(binary_client.sent[0], bytes)
+    assert loads(text_client.sent[0]) == msgpack.unpackb(binary_client.sent[0])
+    assert len(binary_client.sent[0]) < len(text_client.sent[0])
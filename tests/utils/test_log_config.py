@@ -0,0 +1,101 @@
+import json
+import logging
+import queue
+import sys
+import pytest
+from app.core import log_config
+from app.core.config import settings
+from app.core.log_config import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    SamplingFilter,
+    configure_logging,
+    parse_log_levels,
+    parse_sample_rates,
+)
+
+
+@pytest.fixture
+def restore_logging():
+    yield
+    configure_logging(
+        level=settings.log_level,
+        levels=settings.log_levels,
+        log_format=settings.log_format,
+        log_file=settings.log_file,
+        sample_rates=settings.log_sample_rates,
+    )
+
+
+def make_record(msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("app_logger.websocket", logging.DEBUG, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_parse_settings():
+    assert parse_log_levels("app_logger.websocket=debug, sqlalchemy.engine=WARNING") == {
+        "app_logger.websocket": logging.DEBUG,
+        "sqlalchemy.engine": logging.WARNING,
+    }
+    assert parse_sample_rates("typing=100,receipts=20,") == {"typing": 100, "receipts": 20}
+    with pytest.raises(ValueError):
+        parse_log_levels("app_logger=LOUD")
+    with pytest.raises(ValueError):
+        parse_sample_rates("typing=0")
+
+
+def test_sampling_keeps_one_in_n_per_event():
+    sampling = SamplingFilter({"typing": 10})
+    kept = [sampling.filter(make_record(sample="typing")) for _ in range(25)]
+    assert kept.count(True) == 3
+    assert all(sampling.filter(make_record(sample="receipts")) for _ in range(5))
+    assert sampling.filter(make_record())
+
+
+def test_queue_handler_defers_formatting_and_never_blocks():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    payload = ["frame"]
+    handler.emit(make_record("payload %s", (payload,)))
+    handler.emit(make_record())
+
+    record = handler.queue.get_nowait()
+    assert record.msg == "payload %s" and record.args == (payload,)
+    assert handler.dropped == 1
+
+
+def test_json_formatter_writes_one_object_per_record():
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = make_record()
+        record.exc_info = sys.exc_info()
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "hello world"
+    assert entry["logger"] == "app_logger.websocket"
+    assert entry["level"] == "DEBUG"
+    assert "RuntimeError: boom" in entry["exception"]
+
+
+def test_records_are_written_by_the_listener_thread(tmp_path, restore_logging):
+    log_file = tmp_path / "app.log"
+    configure_logging(
+        level="INFO",
+        levels="app_logger.websocket=DEBUG",
+        log_format="json",
+        log_file=str(log_file),
+        sample_rates="typing=2",
+    )
+    websocket_logger = log_config.logger.getChild("websocket")
+    websocket_logger.debug("frame from %s", "alice")
+    for i in range(4):
+        websocket_logger.debug("typing %d", i, extra={"sample": "typing"})
+    log_config.logger.getChild("rooms").debug("filtered out by level")
+    log_config.stop_logging()
+
+    messages = [json.loads(line)["message"] for line in log_file.read_text().splitlines()]
+    assert messages == ["frame from alice", "typing 0", "typing 2"]
+
+    configure_logging(level="INFO", log_file="")
+    assert not websocket_logger.isEnabledFor(logging.DEBUG)
@@ -0,0 +1,95 @@
+import asyncio
+import uuid
+import pytest
+from app.schemas.room import RoomType
+from app.services.room_service import MEMBERSHIP_CHANGED_EVENT, RoomService
+from app.utils.membership_cache import RoomMembershipCache, RoomSnapshot
+
+
+def make_snapshot(room_id=None):
+    return RoomSnapshot(
+        room_id=room_id or uuid.uuid4(),
+        name="general",
+        room_type=RoomType.GROUP,
+        member_ids=frozenset({uuid.uuid4()}),
+    )
+
+
+def test_hits_and_misses_are_counted():
+    cache = RoomMembershipCache()
+    snapshot = make_snapshot()
+
+    assert cache.get(snapshot.room_id) is None
+    cache.set(snapshot, cache.generation(snapshot.room_id))
+    assert cache.get(snapshot.room_id) is snapshot
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = RoomMembershipCache(ttl_seconds=-1)
+    snapshot = make_snapshot()
+    cache.set(snapshot, cache.generation(snapshot.room_id))
+    assert cache.get(snapshot.room_id) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RoomMembershipCache(maxsize=2)
+    first, second, third = make_snapshot(), make_snapshot(), make_snapshot()
+    for snapshot in (first, second):
+        cache.set(snapshot, 0)
+    cache.get(first.room_id)
+    cache.set(third, 0)
+
+    assert cache.get(second.room_id) is None
+    assert cache.get(first.room_id) is first
+    assert cache.stats()["evictions"] == 1
+
+
+def test_load_started_before_invalidation_is_not_stored():
+    cache = RoomMembershipCache()
+    snapshot = make_snapshot()
+    generation = cache.generation(snapshot.room_id)
+    cache.invalidate(snapshot.room_id)
+    cache.set(snapshot, generation)
+    assert cache.get(snapshot.room_id) is None
+
+
+def test_generations_are_bounded_without_reviving_stale_loads():
+    cache = RoomMembershipCache(maxsize=2)
+    snapshot = make_snapshot()
+    generation = cache.generation(snapshot.room_id)
+    cache.invalidate(snapshot.room_id)
+    for _ in range(10):
+        cache.invalidate(uuid.uuid4())
+
+    assert len(cache._generations) == 2
+    # The room's generation was forgotten, but the slow load is still refused
+    cache.set(snapshot, generation)
+    assert cache.get(snapshot.room_id) is None
+    cache.set(snapshot, cache.generation(snapshot.room_id))
+    assert cache.get(snapshot.room_id) is snapshot
+
+
+@pytest.mark.asyncio
+async def test_membership_change_invalidates_every_instance(make_manager):
+    caches = [RoomMembershipCache(), RoomMembershipCache()]
+    managers = []
+    for cache in caches:
+        manager = await make_manager()
+        manager.add_control_handler(
+            MEMBERSHIP_CHANGED_EVENT, lambda data, cache=cache: cache.invalidate(uuid.UUID(data["room_id"]))
+        )
+        managers.append(manager)
+
+    snapshot = make_snapshot()
+    for cache in caches:
+        cache.set(snapshot, 0)
+
+    await RoomService(db=None, membership_cache=caches[0], websocket_manager=managers[0])._invalidate_membership(
+        snapshot.room_id
+    )
+    await asyncio.sleep(0.01)
+
+    assert all(cache.get(snapshot.room_id) is None for cache in caches)
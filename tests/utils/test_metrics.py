@@ -0,0 +1,96 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.utils.metrics import MetricsMiddleware, MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry(enabled=True)
+
+
+def test_histogram_renders_cumulative_buckets(registry):
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "/rooms")
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/rooms",le="0.1"} 2',
+        'latency_seconds_bucket{route="/rooms",le="1.0"} 3',
+        'latency_seconds_bucket{route="/rooms",le="+Inf"} 4',
+        'latency_seconds_sum{route="/rooms"} 3.65',
+        'latency_seconds_count{route="/rooms"} 4',
+    ]
+
+
+def test_counters_and_gauges(registry):
+    frames = registry.counter("frames_total", "Frames.", ("type",))
+    frames.inc("typing")
+    frames.inc("typing")
+    frames.inc('odd"type')
+    registry.gauge("sockets", "Sockets.", callback=lambda: 7)
+
+    lines = registry.render().splitlines()
+    assert 'frames_total{type="typing"} 2' in lines
+    assert 'frames_total{type="odd\\"type"} 1' in lines
+    assert "sockets 7" in lines
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    frames = registry.counter("frames_total", "Frames.", ("type",))
+    latency = registry.histogram("latency_seconds", "Latency.")
+    frames.inc("typing")
+    latency.observe(0.2)
+
+    assert registry.render().splitlines() == [
+        "# HELP frames_total Frames.",
+        "# TYPE frames_total counter",
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+    ]
+
+
+def test_duplicate_metric_names_are_rejected(registry):
+    registry.counter("frames_total", "Frames.")
+    with pytest.raises(ValueError):
+        registry.gauge("frames_total", "Frames.")
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_requests_by_route_template(registry, monkeypatch):
+    from app.utils import metrics as metrics_module
+
+    durations = registry.histogram("http_request_duration_seconds", "Latency.", ("method", "route", "status"))
+    monkeypatch.setattr(metrics_module, "http_request_duration", durations)
+
+    app = FastAPI()
+
+    @app.get("/rooms/{room_id}")
+    async def get_room(room_id: str):
+        return {"room_id": room_id}
+
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for room_id in ("a", "b"):
+            assert (await client.get(f"/rooms/{room_id}")).status_code == 200
+        assert (await client.get("/nowhere")).status_code == 404
+
+    lines = registry.render().splitlines()
+    assert 'http_request_duration_seconds_count{method="GET",route="/rooms/{room_id}",status="200"} 2' in lines
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in lines
+
+
+def test_queue_cache_and_backlog_stats_are_exported():
+    import app.globals  # noqa: F401 (registers the callbacks)
+    from app.utils.metrics import metrics
+
+    samples = {line.rsplit(" ", 1)[0] for line in metrics.render().splitlines() if not line.startswith("#")}
+
+    assert 'push_queue_jobs{state="queued"}' in samples
+    assert "membership_cache_hit_ratio" in samples
+    assert 'websocket_outbound_backlog{stat="max"}' in samples
@@ -0,0 +1,132 @@
+import asyncio
+import uuid
+import pytest
+import pytest_asyncio
+from app.utils.presence import PRESENCE_CHANGED_EVENT, PresenceTracker, get_presence_key
+
+
+@pytest_asyncio.fixture
+async def managers(make_manager):
+    """Two server instances sharing one Redis, recording presence events."""
+    managers = [await make_manager(), await make_manager()]
+    for manager in managers:
+        manager.presence_events = []
+        manager.add_control_handler(PRESENCE_CHANGED_EVENT, manager.presence_events.append)
+    return managers
+
+
+@pytest.mark.asyncio
+async def test_are_online_is_one_round_trip(fake_redis):
+    tracker = PresenceTracker("worker-a")
+    tracker.redis_client = fake_redis
+    online = [uuid.uuid4() for _ in range(5)]
+    for user_id in online:
+        await tracker.set_connections(str(user_id), 1)
+
+    fake_redis.round_trips = 0
+    offline = [uuid.uuid4() for _ in range(95)]
+    assert await tracker.are_online(online + offline) == set(online)
+    assert fake_redis.round_trips == 1
+
+
+@pytest.mark.asyncio
+async def test_user_stays_online_while_any_worker_holds_a_socket(managers, make_websocket):
+    first, second = managers
+    user_id = uuid.uuid4()
+    socket_a, socket_b = make_websocket(), make_websocket()
+
+    await first.connect(socket_a, user_id)
+    await second.connect(socket_b, user_id)
+    await first.disconnect(user_id, socket_a)
+    assert await first.are_online([user_id]) == {user_id}
+
+    await second.disconnect(user_id, socket_b)
+    assert await first.are_online([user_id]) == set()
+
+    await asyncio.sleep(0.01)
+    expected = [{"user_id": str(user_id), "online": True}, {"user_id": str(user_id), "online": False}]
+    assert first.presence_events == expected
+    assert second.presence_events == expected
+
+
+@pytest.mark.asyncio
+async def test_crashed_worker_users_expire(fake_redis):
+    tracker = PresenceTracker("crashed-worker", ttl_seconds=0.05)
+    tracker.redis_client = fake_redis
+    user_id = uuid.uuid4()
+    await tracker.set_connections(str(user_id), 1)
+    assert await tracker.are_online([user_id]) == {user_id}
+
+    # No heartbeat arrives, as if the worker had died
+    await asyncio.sleep(0.06)
+    assert await tracker.are_online([user_id]) == set()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_live_users_online(fake_redis):
+    tracker = PresenceTracker("worker-a", ttl_seconds=0.05)
+    tracker.redis_client = fake_redis
+    user_id = uuid.uuid4()
+    await tracker.set_connections(str(user_id), 1)
+
+    for _ in range(3):
+        await asyncio.sleep(0.03)
+        await tracker.heartbeat({str(user_id): 1})
+    assert await tracker.are_online([user_id]) == {user_id}
+
+
+@pytest.mark.asyncio
+async def test_crashed_worker_is_skipped_while_another_worker_refreshes_the_user(fake_redis):
+    crashed = PresenceTracker("crashed-worker", ttl_seconds=0.05)
+    live = PresenceTracker("live-worker", ttl_seconds=0.05)
+    crashed.redis_client = live.redis_client = fake_redis
+    user_id = str(uuid.uuid4())
+    await crashed.set_connections(user_id, 1)
+    await live.set_connections(user_id, 1)
+    assert await live.locate([user_id]) == {"crashed-worker": [user_id], "live-worker": [user_id]}
+
+    # Only the live worker heartbeats, which keeps the user's hash alive
+    for _ in range(3):
+        await asyncio.sleep(0.03)
+        await live.heartbeat({user_id: 1})
+    assert await live.locate([user_id]) == {"live-worker": [user_id]}
+
+    await live.set_connections(user_id, 0)
+    assert await live.are_online([user_id]) == set()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_marks_the_worker_dead(fake_redis):
+    stopping = PresenceTracker("stopping-worker")
+    other = PresenceTracker("other-worker")
+    stopping.redis_client = other.redis_client = fake_redis
+    user_id = str(uuid.uuid4())
+    await stopping.set_connections(user_id, 1)
+
+    await stopping.clear([])
+    assert await other.locate([user_id]) == {}
+
+
+@pytest.mark.asyncio
+async def test_dead_worker_field_does_not_hide_presence_changes(fake_redis):
+    events = []
+
+    async def on_change(user_id, online):
+        events.append(online)
+
+    crashed = PresenceTracker("crashed-worker", ttl_seconds=0.05)
+    live = PresenceTracker("live-worker", ttl_seconds=0.05, on_change=on_change)
+    crashed.redis_client = live.redis_client = fake_redis
+    user_id = str(uuid.uuid4())
+    await crashed.set_connections(user_id, 1)
+    # Heartbeats of other workers keep the hash alive
+    await fake_redis.expire(get_presence_key(user_id), 60)
+
+    # The crashed worker's liveness key expires; its field stays in the hash
+    await asyncio.sleep(0.06)
+    await live.set_connections(user_id, 1)
+    await live.set_connections(user_id, 0)
+    await live.set_connections(user_id, 1)
+
+    assert await fake_redis.hgetall(get_presence_key(user_id)) == {"crashed-worker": "1", "live-worker": "1"}
+    assert events == [True, False, True]
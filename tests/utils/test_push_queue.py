@@ -0,0 +1,198 @@
+import asyncio
+import uuid
+import httpx
+import pytest
+from sqlalchemy import select
+from app.core.exceptions import NotificationFailedException
+from app.models.fcm_token import FCMToken
+from app.services.notification_service import NotificationService
+from app.utils.push_queue import PushNotificationQueue
+
+
+@pytest.mark.asyncio
+async def test_enqueue_returns_immediately_and_delivers_in_background():
+    delivered = []
+    release = asyncio.Event()
+
+    async def deliver(job):
+        await release.wait()
+        delivered.append(job.user_id)
+
+    queue = PushNotificationQueue(deliver, concurrency=2)
+    await queue.start()
+    user_ids = [uuid.uuid4() for _ in range(5)]
+    for user_id in user_ids:
+        assert queue.enqueue(user_id, "title", "body")
+    assert delivered == []
+
+    release.set()
+    await queue.stop()
+    assert sorted(delivered) == sorted(user_ids)
+    assert queue.stats()["sent"] == 5
+
+
+@pytest.mark.asyncio
+async def test_pending_jobs_are_deduplicated_per_user():
+    bodies = []
+
+    async def deliver(job):
+        bodies.append(job.body)
+
+    queue = PushNotificationQueue(deliver, concurrency=1)
+    user_id = uuid.uuid4()
+    await queue.start()
+    for i in range(3):
+        queue.enqueue(user_id, "title", f"message {i}")
+    await queue.stop()
+
+    assert bodies == ["message 2"]
+    assert queue.stats()["deduplicated"] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_is_respected():
+    active = 0
+    peak = 0
+
+    async def deliver(job):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    queue = PushNotificationQueue(deliver, concurrency=3)
+    await queue.start()
+    for _ in range(20):
+        queue.enqueue(uuid.uuid4(), "title", "body")
+    await queue.stop()
+
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_retried_with_backoff():
+    attempts = 0
+
+    async def deliver(job):
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise RuntimeError("FCM unavailable")
+
+    queue = PushNotificationQueue(deliver, concurrency=1, max_retries=3, backoff_base_seconds=0.01)
+    await queue.start()
+    queue.enqueue(uuid.uuid4(), "title", "body")
+    for _ in range(100):
+        if queue.stats()["sent"]:
+            break
+        await asyncio.sleep(0.01)
+    await queue.stop()
+
+    stats = queue.stats()
+    assert attempts == 3
+    assert stats["retried"] == 2
+    assert stats["sent"] == 1
+    assert stats["failed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_jobs():
+    async def deliver(job):
+        pass
+
+    queue = PushNotificationQueue(deliver, maxsize=2, concurrency=1)
+    await queue.start()
+    results = [queue.enqueue(uuid.uuid4(), "title", "body") for _ in range(3)]
+    await queue.stop()
+
+    assert results == [True, True, False]
+    assert queue.stats()["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_permanent_rejection_is_not_retried():
+    attempts = 0
+
+    async def deliver(job):
+        nonlocal attempts
+        attempts += 1
+        raise NotificationFailedException(detail="token unregistered", retryable=False)
+
+    queue = PushNotificationQueue(deliver, concurrency=1, max_retries=3, backoff_base_seconds=0.01)
+    await queue.start()
+    queue.enqueue(uuid.uuid4(), "title", "body")
+    await queue.stop()
+
+    stats = queue.stats()
+    assert attempts == 1
+    assert stats["retried"] == 0
+    assert stats["rejected"] == 1
+
+
+# FCM v1 error statuses by HTTP status code
+FCM_STATUSES = {400: "INVALID_ARGUMENT", 403: "PERMISSION_DENIED", 404: "NOT_FOUND", 429: "RESOURCE_EXHAUSTED", 503: "UNAVAILABLE"}
+
+
+def fcm_error(status_code, error_code=None):
+    """A rejected FCM send with the body FCM returns, optionally carrying an FcmError code."""
+    error = {"code": status_code, "message": "Rejected", "status": FCM_STATUSES[status_code]}
+    if error_code is not None:
+        error["details"] = [{"@type": "type.googleapis.com/google.firebase.fcm.v1.FcmError", "errorCode": error_code}]
+    return httpx.Response(status_code, json={"error": error})
+
+
+class StatusSender:
+    """Answers each FCM send with the response configured for its token."""
+
+    def __init__(self, responses):
+        self.responses = responses
+
+    async def send(self, payload):
+        return self.responses[payload["message"]["token"]]
+
+
+async def _send(async_session, test_user, statuses):
+    async_session.add_all([FCMToken(user_id=test_user.id, token=token, device_type="web") for token in statuses])
+    await async_session.commit()
+    service = NotificationService(async_session, StatusSender(statuses))
+    with pytest.raises(NotificationFailedException) as failure:
+        await service.send_notification_to_user(test_user.id, "title", "body")
+    remaining = (await async_session.execute(select(FCMToken.token))).scalars().all()
+    return failure.value, set(remaining)
+
+
+@pytest.mark.asyncio
+async def test_unregistered_tokens_are_pruned_and_not_retried(async_session, test_user):
+    error, remaining = await _send(async_session, test_user, {
+        "unregistered": fcm_error(404, "UNREGISTERED"),
+        "foreign": fcm_error(403, "SENDER_ID_MISMATCH"),
+        "bad": fcm_error(400, "INVALID_ARGUMENT"),
+    })
+
+    assert not error.retryable
+    assert remaining == {"bad"}
+
+
+@pytest.mark.asyncio
+async def test_permission_denied_keeps_the_token(async_session, test_user):
+    # A misconfigured service account must not wipe out every user's tokens
+    error, remaining = await _send(async_session, test_user, {
+        "denied": fcm_error(403),
+        "not_found": fcm_error(404),
+    })
+
+    assert not error.retryable
+    assert remaining == {"denied", "not_found"}
+
+
+@pytest.mark.asyncio
+async def test_server_errors_and_rate_limits_are_retried(async_session, test_user):
+    error, remaining = await _send(async_session, test_user, {
+        "busy": fcm_error(503),
+        "throttled": fcm_error(429, "QUOTA_EXCEEDED"),
+        "unregistered": fcm_error(404, "UNREGISTERED"),
+    })
+
+    assert error.retryable
+    assert remaining == {"busy", "throttled"}
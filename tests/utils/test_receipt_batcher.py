@@ -0,0 +1,75 @@
+import asyncio
+import uuid
+import pytest
+from app.utils.receipt_batcher import ReceiptBatcher
+
+
+class RecordingApply:
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, room_id, status, receipts):
+        self.batches.append((room_id, status, {user_id: set(ids) for user_id, ids in receipts.items()}))
+
+
+@pytest.mark.asyncio
+async def test_frames_within_the_window_share_one_batch():
+    apply = RecordingApply()
+    batcher = ReceiptBatcher(apply, window_seconds=0.05)
+    await batcher.start()
+    room_id, user_id = uuid.uuid4(), uuid.uuid4()
+    ids = [uuid.uuid4() for _ in range(10)]
+
+    for message_id in ids:
+        batcher.add(user_id, "seen", [message_id], room_id)
+    batcher.add(user_id, "seen", ids[:3], room_id)
+    await asyncio.sleep(0.1)
+    await batcher.stop()
+
+    assert apply.batches == [(room_id, "seen", {user_id: set(ids)})]
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_is_flushed_without_waiting_for_the_window():
+    apply = RecordingApply()
+    batcher = ReceiptBatcher(apply, window_seconds=10, max_batch_size=5)
+    await batcher.start()
+
+    batcher.add(uuid.uuid4(), "delivered", [uuid.uuid4() for _ in range(5)])
+    await asyncio.sleep(0.01)
+
+    assert len(apply.batches) == 1
+    await batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_buffer_filling_up_during_the_window_cuts_it_short():
+    apply = RecordingApply()
+    batcher = ReceiptBatcher(apply, window_seconds=10, max_batch_size=5)
+    await batcher.start()
+    user_id = uuid.uuid4()
+
+    batcher.add(user_id, "seen", [uuid.uuid4()])
+    await asyncio.sleep(0.01)
+    assert apply.batches == []
+
+    # The window is now running; the fifth id fills the buffer
+    batcher.add(user_id, "seen", [uuid.uuid4() for _ in range(4)])
+    await asyncio.sleep(0.01)
+
+    assert len(apply.batches) == 1
+    assert len(apply.batches[0][2][user_id]) == 5
+    await batcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_applies_pending_receipts():
+    apply = RecordingApply()
+    batcher = ReceiptBatcher(apply, window_seconds=10)
+    await batcher.start()
+
+    batcher.add(uuid.uuid4(), "seen", [uuid.uuid4()])
+    await batcher.stop()
+
+    assert len(apply.batches) == 1
+    assert batcher.stats()["pending"] == 0
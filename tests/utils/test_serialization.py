@@ -0,0 +1,64 @@
+import uuid
+from datetime import datetime, timezone
+import pytest
+from app.schemas.message import MessageResponse, MessageStatus, MessageType
+from app.utils.serialization import SERIALIZERS, get_serializer, orjson, with_event_id
+
+
+def make_message() -> MessageResponse:
+    return MessageResponse(
+        id=uuid.uuid4(),
+        room_id=uuid.uuid4(),
+        sender_id=uuid.uuid4(),
+        sender_username="alice",
+        sender_display_name="Alice",
+        content="héllo",
+        status=MessageStatus.SENT,
+        timestamp=datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc),
+        message_type=MessageType.TEXT,
+        is_edited=False,
+        is_deleted=False,
+    )
+
+
+AVAILABLE = [name for name in SERIALIZERS if name != "orjson" or orjson is not None]
+
+
+@pytest.mark.parametrize("name", AVAILABLE)
+def test_serializers_produce_the_same_event(name):
+    message = make_message()
+    serializer = get_serializer(name)
+
+    payload = serializer.dumps({"type": "new_message", "data": message})
+
+    assert isinstance(payload, bytes)
+    # The event type must lead the payload so ConnectionWriter can classify it cheaply
+    assert payload.startswith(b'{"type":"new_message"')
+    decoded = serializer.loads(payload)
+    assert decoded["data"] == get_serializer("json").loads(get_serializer("json").dumps(message))
+    assert decoded["data"]["id"] == str(message.id)
+    assert decoded["data"]["status"] == "sent"
+    assert decoded["data"]["content"] == "héllo"
+
+
+@pytest.mark.parametrize("name", AVAILABLE)
+def test_event_id_is_added_without_reserializing(name):
+    serializer = get_serializer(name)
+    payload = serializer.dumps({"type": "new_message", "data": {"content": "}"}})
+
+    for event in (payload, payload.decode()):
+        assert serializer.loads(with_event_id(event, "1700000000000-3")) == {
+            "type": "new_message",
+            "data": {"content": "}"},
+            "event_id": "1700000000000-3",
+        }
+
+
+def test_auto_prefers_orjson_when_installed():
+    expected = "orjson" if orjson is not None else "pydantic"
+    assert get_serializer("auto").name == expected
+
+
+def test_unknown_serializer_is_rejected():
+    with pytest.raises(ValueError):
+        get_serializer("yaml")
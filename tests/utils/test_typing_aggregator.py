@@ -0,0 +1,84 @@
+import asyncio
+import uuid
+import pytest
+from app.utils.typing_aggregator import TypingAggregator
+
+
+async def _listener(manager, room_id, websocket):
+    user_id = uuid.uuid4()
+    await manager.connect(websocket, user_id)
+    await manager.join_room(user_id, room_id)
+    return websocket
+
+
+@pytest.mark.asyncio
+async def test_keystrokes_in_one_window_become_one_combined_event(manager, fake_redis, make_websocket):
+    room_id = uuid.uuid4()
+    listener = await _listener(manager, room_id, make_websocket())
+    aggregator = TypingAggregator(manager)
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+    published = fake_redis.published
+
+    for _ in range(20):
+        aggregator.update(room_id, alice, "alice")
+        aggregator.update(room_id, bob, "bob")
+    await aggregator.flush()
+    await asyncio.sleep(0.01)
+
+    assert fake_redis.published - published == 1
+    assert aggregator.suppressed == 38
+    assert listener.events == [{
+        "type": "typing_indicator",
+        "data": {
+            "room_id": str(room_id),
+            "typers": [{"user_id": str(alice), "username": "alice"}, {"user_id": str(bob), "username": "bob"}],
+        },
+    }]
+
+
+@pytest.mark.asyncio
+async def test_refreshing_an_existing_typer_does_not_broadcast(manager, fake_redis):
+    room_id = uuid.uuid4()
+    aggregator = TypingAggregator(manager, min_interval_seconds=0)
+    user_id = uuid.uuid4()
+    aggregator.update(room_id, user_id, "alice")
+    await aggregator.flush()
+    published = fake_redis.published
+
+    aggregator.update(room_id, user_id, "alice")
+    await aggregator.flush()
+
+    assert fake_redis.published == published
+
+
+@pytest.mark.asyncio
+async def test_typers_expire_without_an_explicit_stop(manager, make_websocket):
+    room_id = uuid.uuid4()
+    listener = await _listener(manager, room_id, make_websocket())
+    aggregator = TypingAggregator(manager, window_seconds=0.01, ttl_seconds=0.05)
+    await aggregator.start()
+
+    aggregator.update(room_id, uuid.uuid4(), "alice")
+    await asyncio.sleep(0.15)
+    await aggregator.stop()
+
+    typers = [event["data"]["typers"] for event in listener.events]
+    assert len(typers) == 2
+    assert [typer["username"] for typer in typers[0]] == ["alice"]
+    assert typers[1] == []
+
+
+@pytest.mark.asyncio
+async def test_event_lists_typers_from_every_worker(manager, make_manager, make_websocket):
+    room_id = uuid.uuid4()
+    other_worker = await make_manager()
+    listener = await _listener(manager, room_id, make_websocket())
+    here, there = TypingAggregator(manager), TypingAggregator(other_worker)
+
+    there.update(room_id, uuid.uuid4(), "bob")
+    await there.flush()
+    here.update(room_id, uuid.uuid4(), "alice")
+    await here.flush()
+    await asyncio.sleep(0.01)
+
+    assert [typer["username"] for typer in listener.events[-1]["data"]["typers"]] == ["alice", "bob"]
@@ -0,0 +1,147 @@
+import asyncio
+import uuid
+import pytest
+from app.utils.websocket_manager import (
+    CONTROL_CHANNEL,
+    get_worker_channel,
+    pack_envelope,
+    unpack_envelope,
+)
+from app.utils.presence import get_presence_key, get_worker_presence_key
+
+
+@pytest.mark.asyncio
+async def test_send_to_users_publishes_one_envelope_per_worker(manager, fake_redis):
+    user_ids = [uuid.uuid4() for _ in range(50)]
+    pubsubs = {}
+    for i, user_id in enumerate(user_ids):
+        worker_id = f"worker-{i % 3}"
+        await fake_redis.hset(get_presence_key(str(user_id)), worker_id, 1)
+        if worker_id not in pubsubs:
+            await fake_redis.set(get_worker_presence_key(worker_id), 1, ex=60)
+            pubsubs[worker_id] = fake_redis.pubsub()
+            await pubsubs[worker_id].subscribe(get_worker_channel(worker_id))
+    fake_redis.round_trips = 0
+    fake_redis.published = 0
+
+    await manager.send_to_users(user_ids + user_ids[:5] + [uuid.uuid4()], "payload")
+
+    # One lookup, one liveness check of the workers found, one pipelined publish
+    assert fake_redis.round_trips == 3
+    assert fake_redis.published == 3
+    received = set()
+    for pubsub in pubsubs.values():
+        recipients, event = unpack_envelope((await pubsub.queue.get())["data"])
+        assert event == "payload"
+        received.update(recipients)
+    assert received == {str(user_id) for user_id in user_ids}
+
+
+@pytest.mark.asyncio
+async def test_send_to_users_with_no_recipients_skips_redis(manager, fake_redis):
+    fake_redis.round_trips = 0
+    await manager.send_to_users([], "payload")
+    assert fake_redis.round_trips == 0
+
+
+@pytest.mark.asyncio
+async def test_offline_users_cost_no_publish(manager, fake_redis):
+    fake_redis.round_trips = 0
+    await manager.send_to_users([uuid.uuid4() for _ in range(10)], "payload")
+    assert fake_redis.round_trips == 1
+    assert fake_redis.published == 0
+
+
+def test_envelope_round_trip():
+    message = '{"type":"new_message","data":{"content":"a,b\\nc"}}'
+    assert unpack_envelope(pack_envelope(["u1", "u2"], message)) == (["u1", "u2"], message)
+
+
+@pytest.mark.asyncio
+async def test_second_socket_does_not_replace_the_first(manager, make_websocket):
+    user_id = uuid.uuid4()
+    first, second = make_websocket(), make_websocket()
+    await manager.connect(first, user_id)
+    await manager.connect(second, user_id)
+
+    await manager.send_personal_message(user_id, "hello")
+    await asyncio.sleep(0.01)
+
+    assert first.sent == ["hello"]
+    assert second.sent == ["hello"]
+
+
+@pytest.mark.asyncio
+async def test_user_stays_online_until_last_socket_disconnects(manager, make_websocket):
+    user_id = uuid.uuid4()
+    first, second = make_websocket(), make_websocket()
+    await manager.connect(first, user_id)
+    await manager.connect(second, user_id)
+    await manager.join_room(user_id, room_id := uuid.uuid4())
+    await manager.join_room(user_id, room_id)
+
+    await manager.disconnect(user_id, first)
+    await manager.leave_room(user_id, room_id)
+    await manager.broadcast_to_room(room_id, "still here")
+    await asyncio.sleep(0.01)
+
+    assert await manager.are_online([user_id]) == {user_id}
+    assert second.sent == ["still here"]
+
+    await manager.disconnect(user_id, second)
+
+    assert await manager.are_online([user_id]) == set()
+    assert manager.local_room_members == {}
+
+
+@pytest.mark.asyncio
+async def test_stalled_client_does_not_block_room_fan_out(manager, make_websocket):
+    room_id, slow_user, fast_user = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    fast = make_websocket()
+    await manager.connect(make_websocket(stalled=True), slow_user)
+    await manager.connect(fast, fast_user)
+    await manager.join_room(slow_user, room_id)
+    await manager.join_room(fast_user, room_id)
+
+    for i in range(3):
+        await manager.broadcast_to_room(room_id, f"m{i}")
+    await asyncio.sleep(0.01)
+
+    assert fast.sent == ["m0", "m1", "m2"]
+    depths = {stats["user_id"]: stats["depth"] for stats in manager.connection_stats()}
+    assert depths[str(slow_user)] == 2
+
+
+@pytest.mark.asyncio
+async def test_connections_never_change_the_subscriptions(manager, make_websocket):
+    channels = {CONTROL_CHANNEL, get_worker_channel(manager.worker_id)}
+    assert manager.pubsub.channels == channels
+
+    user_ids = [uuid.uuid4() for _ in range(3)]
+    websockets = [make_websocket() for _ in user_ids]
+    for user_id, websocket in zip(user_ids, websockets):
+        await manager.connect(websocket, user_id)
+    assert manager.pubsub.channels == channels
+
+    for user_id, websocket in zip(user_ids, websockets):
+        await manager.disconnect(user_id, websocket)
+    assert manager.pubsub.channels == channels
+
+
+@pytest.mark.asyncio
+async def test_events_reach_users_on_other_workers(make_manager, fake_redis, make_websocket):
+    local, remote = await make_manager(), await make_manager()
+    here, there, both = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    sockets = {name: make_websocket() for name in ("here", "there", "both_local", "both_remote")}
+    await local.connect(sockets["here"], here)
+    await remote.connect(sockets["there"], there)
+    await local.connect(sockets["both_local"], both)
+    await remote.connect(sockets["both_remote"], both)
+    fake_redis.published = 0
+
+    await local.send_to_users([here, there, both], "hello")
+    await asyncio.sleep(0.01)
+
+    assert all(websocket.sent == ["hello"] for websocket in sockets.values())
+    # Local recipients are queued directly; the remote worker gets one envelope
+    assert fake_redis.published == 1
@@ -0,0 +1,73 @@
+import pytest
+from websockets.extensions.permessage_deflate import PerMessageDeflate
+from websockets.frames import TEXT, Frame
+
+from app.utils.ws_compression import (
+    CompressionStats,
+    MeteredPerMessageDeflate,
+    TunedPerMessageDeflateFactory,
+    deflate_memory_usage,
+    inflate_memory_usage,
+    window_bits_for_memory,
+)
+
+
+def _pair(min_size: int, stats: CompressionStats, context_takeover: bool = True):
+    no_takeover = not context_takeover
+    server = MeteredPerMessageDeflate(False, no_takeover, 12, 12, {"memLevel": 5}, min_size=min_size, stats=stats)
+    client = PerMessageDeflate(no_takeover, False, 12, 12)
+    return server, client
+
+
+def test_memory_cap_picks_the_largest_window_that_fits():
+    window_bits, mem_level = window_bits_for_memory(64 * 1024)
+
+    assert deflate_memory_usage(window_bits, mem_level) + inflate_memory_usage(window_bits) <= 64 * 1024
+    assert deflate_memory_usage(window_bits + 1, mem_level + 1) + inflate_memory_usage(window_bits + 1) > 64 * 1024
+
+
+def test_contexts_without_takeover_do_not_count_towards_the_cap():
+    assert window_bits_for_memory(64 * 1024, server_context_takeover=False, client_context_takeover=False)[0] == 15
+    with pytest.raises(ValueError):
+        window_bits_for_memory(1024)
+
+
+def test_messages_below_threshold_are_sent_uncompressed():
+    stats = CompressionStats()
+    server, client = _pair(min_size=256, stats=stats)
+
+    frame = server.encode(Frame(TEXT, b'{"type":"typing_indicator"}'))
+
+    assert frame.rsv1 is False
+    assert client.decode(frame).data == b'{"type":"typing_indicator"}'
+    assert stats.messages_skipped == 1
+    assert stats.messages_compressed == 0
+
+
+@pytest.mark.parametrize("context_takeover", [True, False])
+def test_large_messages_are_compressed_and_metered(context_takeover):
+    stats = CompressionStats()
+    server, client = _pair(min_size=256, stats=stats, context_takeover=context_takeover)
+    payload = b'{"type":"new_message","data":{"content":"' + b"deploy finished " * 40 + b'"}}'
+
+    for _ in range(3):
+        frame = server.encode(Frame(TEXT, payload))
+        assert frame.rsv1 is True
+        assert client.decode(frame).data == payload
+
+    snapshot = stats.snapshot()
+    assert snapshot["messages_compressed"] == 3
+    assert snapshot["bytes_in"] == 3 * len(payload)
+    assert snapshot["ratio"] < 0.2
+
+
+def test_factory_negotiates_capped_windows_and_returns_metered_extension():
+    factory = TunedPerMessageDeflateFactory(min_size=128, client_context_takeover=False, memory_limit_bytes=64 * 1024)
+
+    response, extension = factory.process_request_params([("client_max_window_bits", None)], [])
+
+    assert isinstance(extension, MeteredPerMessageDeflate)
+    assert extension.min_size == 128
+    assert extension.remote_no_context_takeover is True
+    assert ("client_no_context_takeover", None) in response
+    assert extension.local_max_window_bits == window_bits_for_memory(64 * 1024, True, False)[0]